@@ -0,0 +1,105 @@
+"""
+会话级文档上下文
+每个分析会话（LangGraph thread_id）绑定自己加载的财报，避免并发请求互相覆盖；
+已加载的财报按缓存键共享，空闲文档按 LRU 淘汰，限制常驻内存的报告数量
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from langchain_community.vectorstores import FAISS
+
+from monitoring.metrics import record_cache
+
+# 空闲状态下最多常驻内存的财报数量
+MAX_RESIDENT_DOCUMENTS = int(os.environ.get("MAX_RESIDENT_DOCUMENTS", "8"))
+# 最多跟踪的会话数量（防止未正常释放的会话无限累积）
+MAX_SESSIONS = int(os.environ.get("MAX_DOCUMENT_SESSIONS", "1024"))
+
+
+@dataclass
+class DocumentContext:
+    """一份已加载财报的全部内存状态"""
+    cache_key: str
+    pdf_path: str
+    vectorstore: FAISS
+    pages: List[str]
+    num_chunks: int
+    # 由各工具写入的派生结果（如提取的财务指标），随文档一起缓存
+    extras: dict = field(default_factory=dict)
+
+
+_documents: "OrderedDict[str, DocumentContext]" = OrderedDict()
+_sessions: "OrderedDict[str, DocumentContext]" = OrderedDict()
+# 缓存键 -> [加载锁, 持有或等待该锁的请求数]，最后一个请求结束时删除
+_loading_locks: dict = {}
+_lock = threading.Lock()
+
+
+def get_or_load_document(cache_key: str, loader: Callable[[], DocumentContext]) -> DocumentContext:
+    """
+    获取常驻内存的文档，不存在时调用 loader 加载
+    同一份文档并发加载时只有一个请求真正执行 loader
+
+    Args:
+        cache_key: 文档缓存键
+        loader: 加载文档的函数
+
+    Returns:
+        文档上下文
+    """
+    with _lock:
+        ctx = _documents.get(cache_key)
+        record_cache("document", ctx is not None)
+        if ctx is not None:
+            _documents.move_to_end(cache_key)
+            return ctx
+        entry = _loading_locks.setdefault(cache_key, [threading.Lock(), 0])
+        entry[1] += 1
+
+    try:
+        with entry[0]:
+            with _lock:
+                ctx = _documents.get(cache_key)
+            if ctx is None:
+                ctx = loader()
+                _put_document(ctx)
+    finally:
+        with _lock:
+            entry[1] -= 1
+            # 还有请求在等待时保留锁，否则新来的请求会拿到另一把锁而重复加载
+            if entry[1] == 0:
+                del _loading_locks[cache_key]
+    return ctx
+
+
+def _put_document(ctx: DocumentContext) -> None:
+    with _lock:
+        _documents[ctx.cache_key] = ctx
+        _documents.move_to_end(ctx.cache_key)
+        while len(_documents) > MAX_RESIDENT_DOCUMENTS:
+            _documents.popitem(last=False)
+
+
+def bind_session(session_id: str, ctx: DocumentContext) -> None:
+    """将文档绑定到会话，会话存续期间文档不会因 LRU 淘汰而失效"""
+    with _lock:
+        _sessions[session_id] = ctx
+        _sessions.move_to_end(session_id)
+        while len(_sessions) > MAX_SESSIONS:
+            _sessions.popitem(last=False)
+
+
+def get_session_document(session_id: str) -> Optional[DocumentContext]:
+    """获取会话当前绑定的文档，未加载时返回 None"""
+    with _lock:
+        return _sessions.get(session_id)
+
+
+def release_session(session_id: str) -> None:
+    """会话结束时解除绑定，文档仍保留在 LRU 中供后续请求复用"""
+    with _lock:
+        _sessions.pop(session_id, None)
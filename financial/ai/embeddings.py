@@ -0,0 +1,64 @@
+"""
+进程级共享的中文 Embedding 模型
+模型权重约 400MB，只在进程内加载一次，由 FastAPI 启动时预热，所有工具复用同一个实例
+"""
+
+import threading
+import time
+from typing import Optional
+
+from langchain_huggingface import HuggingFaceEmbeddings
+
+# 中文 Embedding 模型
+EMBEDDING_MODEL_NAME = "BAAI/bge-base-zh-v1.5"
+
+_embeddings: Optional[HuggingFaceEmbeddings] = None
+_lock = threading.Lock()
+
+# 模型加载指标
+_stats = {
+    "model_name": EMBEDDING_MODEL_NAME,
+    "loaded": False,
+    "load_seconds": None,
+    "loaded_at": None,
+}
+
+
+def get_embeddings() -> HuggingFaceEmbeddings:
+    """
+    获取共享的 Embedding 实例（首次调用时加载模型）
+
+    Returns:
+        HuggingFaceEmbeddings 实例
+    """
+    global _embeddings
+
+    if _embeddings is not None:
+        return _embeddings
+
+    with _lock:
+        # 双重检查，避免并发请求重复加载模型
+        if _embeddings is None:
+            print("🔧 正在加载中文 Embedding 模型（首次运行会自动下载）...")
+            start = time.perf_counter()
+            _embeddings = HuggingFaceEmbeddings(
+                model_name=EMBEDDING_MODEL_NAME,  # 专门的中文 Embedding 模型
+                model_kwargs={'device': 'cpu'},  # 使用 CPU，如有 GPU 可改为 'cuda'
+                encode_kwargs={'normalize_embeddings': True}
+            )
+            _stats["load_seconds"] = round(time.perf_counter() - start, 3)
+            _stats["loaded_at"] = time.time()
+            _stats["loaded"] = True
+            print(f"✓ Embedding 模型加载完成，耗时 {_stats['load_seconds']}s")
+
+    return _embeddings
+
+
+def warm_up() -> None:
+    """预热模型：加载权重并执行一次编码，避免首个请求承担初始化开销"""
+    get_embeddings().embed_query("预热")
+
+
+def embedding_stats() -> dict:
+    """返回模型加载指标（模型名、是否已加载、加载耗时）"""
+    return dict(_stats)
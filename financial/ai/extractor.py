@@ -0,0 +1,185 @@
+"""
+财务指标单遍提取器
+所有指标的匹配模式在模块加载时预编译，并按关键字前缀建立锚点；
+提取时只对全文做一次线性扫描，在锚点位置尝试对应的模式
+"""
+
+import re
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Dict, List
+
+# 财务指标名称（顺序即输出顺序）
+METRIC_NAMES = {
+    'operating_income': '归属于上市公司股东的扣除非经常性损益的净利润',
+    'revenue': '营业收入',
+    'net_income': '净利润',
+    'total_assets': '总资产',
+    'total_liabilities': '总负债',
+    'equity': '股东权益',
+    'current_assets': '流动资产',
+    'current_liabilities': '流动负债',
+    'cash': '货币资金',
+    'inventory': '存货',
+    'total_profit': '利润总额',
+    'interest_expense': '利息费用',
+}
+
+# 财务指标的匹配模式，同一指标内靠前的模式优先
+METRIC_PATTERNS = {
+    'revenue': [
+        r'营业收入[：:]\s*([\d,，.]+)',
+        r'营业总收入[：:]\s*([\d,，.]+)',
+        r'一、营业总收入\s+([\d,，.]+)',
+    ],
+    'net_income': [
+        r'净利润[：:]\s*([\d,，.]+)',
+        r'归属于.*净利润[：:]\s*([\d,，.]+)',
+        r'四、净利润.*\s+([\d,，.]+)',
+    ],
+    'total_assets': [
+        r'资产总计[：:]\s*([\d,，.]+)',
+        r'总资产[：:]\s*([\d,，.]+)',
+    ],
+    'total_liabilities': [
+        r'负债合计[：:]\s*([\d,，.]+)',
+        r'负债总计[：:]\s*([\d,，.]+)',
+    ],
+    'equity': [
+        r'所有者权益.*合计[：:]\s*([\d,，.]+)',
+        r'股东权益合计[：:]\s*([\d,，.]+)',
+    ],
+    'current_assets': [
+        r'流动资产合计[：:]\s*([\d,，.]+)',
+    ],
+    'current_liabilities': [
+        r'流动负债合计[：:]\s*([\d,，.]+)',
+    ],
+    'cash': [
+        r'货币资金[：:]\s*([\d,，.]+)',
+        r'现金及现金等价物[：:]\s*([\d,，.]+)',
+    ],
+    'operating_income': [
+        r'归属于上市公司股东的扣除非经常性损益的净利润[：:]\s*([\d,，.]+)',
+        r'非经常性损益净利润[：:]\s*([\d,，.]+)',
+    ],
+    'inventory': [
+        r'存货[：:]\s*([\d,，.]+)',
+    ],
+    'total_profit': [
+        r'利润总额[：:]\s*([\d,，.]+)',
+    ],
+    'interest_expense': [
+        r'利息费用[：:]\s*([\d,，.]+)',
+    ],
+}
+
+_REGEX_META = set('.^$*+?{}[]\\|()')
+
+
+@dataclass(frozen=True)
+class MetricMatch:
+    """提取到的单个财务指标"""
+    metric: str
+    value: float
+    page: int      # 所在页码（从 1 开始）
+    offset: int    # 在全文中的字符偏移
+
+
+@dataclass(frozen=True)
+class _Rule:
+    metric: str
+    priority: int
+    prefix: str
+    regex: "re.Pattern"
+
+
+def _literal_prefix(pattern: str) -> str:
+    """取出模式开头的字面量部分，作为扫描锚点"""
+    prefix = []
+    for ch in pattern:
+        if ch in _REGEX_META:
+            break
+        prefix.append(ch)
+    if not prefix:
+        raise ValueError(f"匹配模式必须以字面量开头: {pattern}")
+    return ''.join(prefix)
+
+
+def _compile_rules() -> Dict[str, List[_Rule]]:
+    """预编译全部模式，并按锚点首字符分组"""
+    rules_by_char: Dict[str, List[_Rule]] = {}
+    for metric, patterns in METRIC_PATTERNS.items():
+        for priority, pattern in enumerate(patterns):
+            prefix = _literal_prefix(pattern)
+            rule = _Rule(metric, priority, prefix, re.compile(pattern))
+            rules_by_char.setdefault(prefix[0], []).append(rule)
+    return rules_by_char
+
+
+_RULES_BY_CHAR = _compile_rules()
+# 所有锚点的联合模式（长前缀优先）
+_ANCHOR_RE = re.compile('|'.join(
+    re.escape(prefix)
+    for prefix in sorted({r.prefix for rules in _RULES_BY_CHAR.values() for r in rules}, key=len, reverse=True)
+))
+
+
+def _parse_number(number_str: str):
+    """清理数字格式，无法解析时返回 None"""
+    try:
+        return float(number_str.replace(',', '').replace('，', ''))
+    except ValueError:
+        return None
+
+
+def extract_metrics(pages: List[str]) -> Dict[str, MetricMatch]:
+    """
+    单遍扫描文档，提取全部财务指标
+
+    Args:
+        pages: 按页拆分的文档文本（全文按 "\\n\\n" 拼接）
+
+    Returns:
+        指标键 -> MetricMatch，未匹配到的指标不出现在结果中
+    """
+    text = "\n\n".join(pages)
+
+    # 每页在全文中的起始偏移，用于定位页码
+    page_starts = []
+    offset = 0
+    for page in pages:
+        page_starts.append(offset)
+        offset += len(page) + 2
+
+    best: Dict[str, tuple] = {}
+    pos = 0
+    while True:
+        anchor = _ANCHOR_RE.search(text, pos)
+        if anchor is None:
+            break
+        start = anchor.start()
+        for rule in _RULES_BY_CHAR[text[start]]:
+            current = best.get(rule.metric)
+            # 已有同级或更高优先级的更早匹配
+            if current is not None and current[0] <= rule.priority:
+                continue
+            if not text.startswith(rule.prefix, start):
+                continue
+            m = rule.regex.match(text, start)
+            if m is None:
+                continue
+            value = _parse_number(m.group(1))
+            if value is not None:
+                best[rule.metric] = (rule.priority, value, start)
+
+        # 所有指标都已命中最高优先级模式，提前结束
+        if len(best) == len(METRIC_PATTERNS) and all(b[0] == 0 for b in best.values()):
+            break
+        # 锚点之间可能重叠（如「流动负债合计」包含「负债合计」），逐字符前进
+        pos = start + 1
+
+    return {
+        metric: MetricMatch(metric, value, bisect_right(page_starts, start), start)
+        for metric, (_, value, start) in best.items()
+    }
@@ -4,21 +4,45 @@
 """
 
 import os
-import re
 import sys
+import time
+import fitz
 from pathlib import Path
-from typing import Optional, Generator
+from typing import Optional, Generator, AsyncGenerator
+from uuid import uuid4
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.tools import tool
-from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.messages import SystemMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.prebuilt import create_react_agent
-from langchain_community.document_loaders import PyMuPDFLoader
+from langchain_core.documents import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
+
+from monitoring.metrics import observe_stage, record_cache, record_error, record_tokens, timed
+
+from .document_store import (
+    DocumentContext,
+    bind_session,
+    get_or_load_document,
+    get_session_document,
+    release_session,
+)
+from .embeddings import EMBEDDING_MODEL_NAME, get_embeddings
+from .extractor import METRIC_NAMES, extract_metrics
+from .index_cache import file_sha256, index_cache_key, load_cached_index, save_index
+from .statements import (
+    STATEMENT_TITLES,
+    extract_statements,
+    format_statement,
+    statement_metrics,
+    statements_from_json,
+    statements_to_json,
+)
 
 # 获取当前脚本所在目录的绝对路径
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -43,9 +67,33 @@ if not DEEPSEEK_API_KEY:
     print("请在项目目录下创建 .env 文件并添加：")
     print("DEEPSEEK_API_KEY=your_api_key_here\n")
 
-# 全局变量：存储加载的PDF向量数据库
-pdf_vectorstore = None
-pdf_content = None
+# 对话模型
+LLM_MODEL_NAME = "deepseek-chat"
+# 提示词版本，修改提示词或分析步骤的含义时递增，使缓存的分析结果失效
+PROMPT_SET_VERSION = 1
+
+# 文本分割参数（同时参与向量索引缓存键的计算）
+SPLITTER_PARAMS = {
+    "chunk_size": 500,  # 中文字符密度大，适当减小
+    "chunk_overlap": 100,
+    "separators": [
+        "\n\n",    # 段落
+        "\n",      # 换行
+        "。",      # 中文句号
+        "！",      # 中文感叹号
+        "？",      # 中文问号
+        "；",      # 中文分号（财务报表常用）
+        "，",      # 中文逗号
+        ".",       # 英文句号
+        "!",       # 英文感叹号
+        "?",       # 英文问号
+        " ",       # 空格
+        ""         # 字符级别
+    ],
+}
+
+# 未指定 thread_id 时使用的默认会话
+DEFAULT_SESSION_ID = "default"
 
 
 # 定义财务分析工具
@@ -228,8 +276,118 @@ def analyze_leverage(total_assets: float, total_liabilities: float,
     return analysis
 
 
+class EmbeddingError(RuntimeError):
+    """Embedding 模型加载或向量化失败"""
+
+
+def _session_id(config: RunnableConfig) -> str:
+    """从 LangGraph 运行配置中取出会话 ID（thread_id）"""
+    return (config or {}).get("configurable", {}).get("thread_id", DEFAULT_SESSION_ID)
+
+
+def _build_document(pdf_path: str, cache_key: str, timings: dict) -> DocumentContext:
+    """从磁盘缓存加载文档，未命中时解析 PDF 并构建向量索引，各阶段耗时写入 timings"""
+    # 使用进程内共享的中文 Embedding 模型（查询时同样需要）
+    try:
+        embeddings = get_embeddings()
+    except Exception as emb_error:
+        raise EmbeddingError(str(emb_error)) from emb_error
+
+    cached = load_cached_index(cache_key, embeddings)
+    record_cache("faiss_index", cached is not None)
+    if cached is not None:
+        vectorstore, meta = cached
+        print(f"✓ 命中向量索引缓存: {cache_key[:12]}")
+        ctx = DocumentContext(cache_key, pdf_path, vectorstore, meta["pages"], meta["num_chunks"])
+        ctx.extras["statements"] = statements_from_json(meta["statements"])
+        return ctx
+
+    with timed("pdf_parse", timings):
+        # 使用 PyMuPDF 打开PDF（对中文支持更好），页面文本和报表表格都基于同一个文档对象
+        print("📂 正在加载PDF文件...")
+        with fitz.open(pdf_path) as pdf:
+            documents = [
+                Document(
+                    page_content=page.get_text(),
+                    metadata={"source": pdf_path, "file_path": pdf_path, "page": i, "total_pages": len(pdf)},
+                )
+                for i, page in enumerate(pdf)
+            ]
+            print(f"✓ 已加载 {len(documents)} 页")
+
+            # 保存原始内容（报表定位复用已提取的页面文本）
+            pages = [doc.page_content for doc in documents]
+
+            # 解析三大合并报表的表格
+            print("📑 正在解析合并报表...")
+            statements = extract_statements(pdf, pages)
+            print(f"✓ 已解析报表: {', '.join(STATEMENT_TITLES[k] for k in statements) or '无'}")
+
+        # 中文优化的文本分割
+        print("📝 正在分割文本...")
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=SPLITTER_PARAMS["chunk_size"],
+            chunk_overlap=SPLITTER_PARAMS["chunk_overlap"],
+            separators=SPLITTER_PARAMS["separators"],
+            length_function=len,
+        )
+        splits = text_splitter.split_documents(documents)
+        print(f"✓ 已分割为 {len(splits)} 个文本块")
+
+    # 创建向量存储（向量化与建索引分开计时）
+    try:
+        print("🔍 正在创建向量索引...")
+        texts = [split.page_content for split in splits]
+        with timed("embedding", timings):
+            vectors = embeddings.embed_documents(texts)
+        with timed("faiss_build", timings):
+            vectorstore = FAISS.from_embeddings(
+                list(zip(texts, vectors)), embeddings, metadatas=[split.metadata for split in splits]
+            )
+        print("✓ 向量索引创建完成")
+    except Exception as emb_error:
+        raise EmbeddingError(str(emb_error)) from emb_error
+
+    # 写入磁盘缓存，缓存失败不影响本次分析
+    try:
+        save_index(cache_key, vectorstore, {
+            "pages": pages,
+            "num_pages": len(documents),
+            "num_chunks": len(splits),
+            "model_name": EMBEDDING_MODEL_NAME,
+            "statements": statements_to_json(statements),
+        })
+        print(f"✓ 向量索引已缓存: {cache_key[:12]}")
+    except Exception as cache_error:
+        print(f"⚠️ 向量索引缓存写入失败: {cache_error}")
+
+    ctx = DocumentContext(cache_key, pdf_path, vectorstore, pages, len(splits))
+    ctx.extras["statements"] = statements
+    return ctx
+
+
+def load_document(pdf_path: str, pdf_hash: Optional[str] = None, timings: Optional[dict] = None) -> DocumentContext:
+    """
+    加载财报文档（优先复用内存中和磁盘缓存的结果）
+
+    Args:
+        pdf_path: PDF文件的路径
+        pdf_hash: 已知的 PDF 内容 SHA-256（如 pdf_cache 的文件名），提供时不再读取整个文件计算
+        timings: 本次调用实际解析和构建索引时，pdf_parse / embedding / faiss_build 耗时写入该字典
+            （命中缓存或由并发的其他请求构建时不写入；每个请求传入自己的字典，互不影响）
+
+    Returns:
+        文档上下文
+    """
+    # 以 PDF 内容 + 分割参数 + 模型名 计算缓存键，命中时跳过解析和向量化
+    cache_key = index_cache_key(pdf_hash or file_sha256(pdf_path), SPLITTER_PARAMS, EMBEDDING_MODEL_NAME)
+    if timings is None:
+        timings = {}
+    return get_or_load_document(cache_key, lambda: _build_document(pdf_path, cache_key, timings))
+
+
 @tool
-def load_financial_pdf(pdf_path: str) -> str:
+def load_financial_pdf(pdf_path: str, config: RunnableConfig) -> str:
     """
     加载并处理财务报表PDF文件（中文优化版）
     
@@ -239,79 +397,46 @@ def load_financial_pdf(pdf_path: str) -> str:
     Returns:
         加载状态信息
     """
-    global pdf_vectorstore, pdf_content
-    
     try:
-        # 使用 PyMuPDF 加载PDF（对中文支持更好）
-        print("📂 正在加载PDF文件...")
-        # load_fn = PyMuPDFLoader if is_online else OnlinePDFLoader
-        loader = PyMuPDFLoader(pdf_path)
-        documents = loader.load()
-        print(f"✓ 已加载 {len(documents)} 页")
-        
-        # 保存原始内容
-        pdf_content = "\n\n".join([doc.page_content for doc in documents])
-        
-        # 中文优化的文本分割
-        print("📝 正在分割文本...")
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=500,  # 中文字符密度大，适当减小
-            chunk_overlap=100,
-            separators=[
-                "\n\n",    # 段落
-                "\n",      # 换行
-                "。",      # 中文句号
-                "！",      # 中文感叹号
-                "？",      # 中文问号
-                "；",      # 中文分号（财务报表常用）
-                "，",      # 中文逗号
-                ".",       # 英文句号
-                "!",       # 英文感叹号
-                "?",       # 英文问号
-                " ",       # 空格
-                ""         # 字符级别
-            ],
-            length_function=len,
-        )
-        splits = text_splitter.split_documents(documents)
-        print(f"✓ 已分割为 {len(splits)} 个文本块")
-        
-        # 使用本地中文 Embedding 模型创建向量存储
-        try:
-            print("🔧 正在加载中文 Embedding 模型（首次运行会自动下载）...")
-            embeddings = HuggingFaceEmbeddings(
-                model_name="BAAI/bge-base-zh-v1.5",  # 专门的中文 Embedding 模型
-                model_kwargs={'device': 'cpu'},  # 使用 CPU，如有 GPU 可改为 'cuda'
-                encode_kwargs={'normalize_embeddings': True}
-            )
-            
-            print("🔍 正在创建向量索引...")
-            pdf_vectorstore = FAISS.from_documents(splits, embeddings)
-            print("✓ 向量索引创建完成")
-            
-            return f"""✅ 成功加载中文PDF文件！
+        # 分析入口已知文件哈希、需要构建耗时时通过运行配置传入（agent 传入的路径与之一致时才使用）
+        configurable = (config or {}).get("configurable", {})
+        if configurable.get("pdf_path") == pdf_path:
+            ctx = load_document(pdf_path, configurable.get("pdf_hash"), configurable.get("build_timings"))
+        else:
+            ctx = load_document(pdf_path)
+        bind_session(_session_id(config), ctx)
+        return _load_success_message(len(ctx.pages), ctx.num_chunks)
+
+    except EmbeddingError as emb_error:
+        return _embedding_error_message(emb_error)
+    except Exception as e:
+        return f"❌ 加载PDF文件失败: {str(e)}\n\n💡 提示：请确保PDF文件路径正确，且文件未损坏。"
+
+
+def _load_success_message(num_pages: int, num_chunks: int) -> str:
+    """生成 PDF 加载成功的提示信息"""
+    return f"""✅ 成功加载中文PDF文件！
 📊 文档信息：
-  - 文档页数: {len(documents)}
-  - 文本块数: {len(splits)}
-  - Embedding模型: BAAI/bge-base-zh-v1.5（中文优化）
+  - 文档页数: {num_pages}
+  - 文本块数: {num_chunks}
+  - Embedding模型: {EMBEDDING_MODEL_NAME}（中文优化）
   - 向量数据库: FAISS
   
 ✨ 已建立向量索引，可以开始查询分析财务数据！"""
-            
-        except Exception as emb_error:
-            return f"""❌ 创建向量索引失败: {str(emb_error)}
+
+
+def _embedding_error_message(emb_error: Exception) -> str:
+    """生成向量索引创建失败的提示信息"""
+    return f"""❌ 创建向量索引失败: {str(emb_error)}
 
 💡 解决方案：
 1. 请确保已安装依赖：pip install sentence-transformers
 2. 首次运行会自动下载模型（约400MB），请确保网络连接正常
 3. 如果下载失败，可以尝试手动设置镜像源或使用代理"""
-    
-    except Exception as e:
-        return f"❌ 加载PDF文件失败: {str(e)}\n\n💡 提示：请确保PDF文件路径正确，且文件未损坏。"
 
 
 @tool
-def search_financial_info(query: str) -> str:
+def search_financial_info(query: str, config: RunnableConfig) -> str:
     """
     从已加载的财务报表PDF中检索相关信息
     
@@ -321,14 +446,14 @@ def search_financial_info(query: str) -> str:
     Returns:
         检索到的相关信息
     """
-    global pdf_vectorstore
+    ctx = get_session_document(_session_id(config))
     
-    if pdf_vectorstore is None:
+    if ctx is None:
         return "❌ 请先使用 load_financial_pdf 工具加载PDF文件"
     
     try:
         # 检索相关文档
-        docs = pdf_vectorstore.similarity_search(query, k=3)
+        docs = ctx.vectorstore.similarity_search(query, k=3)
         
         if not docs:
             return f"未找到关于'{query}'的相关信息"
@@ -344,8 +469,97 @@ def search_financial_info(query: str) -> str:
         return f"❌ 检索失败: {str(e)}"
 
 
+def _document_metrics(ctx: DocumentContext) -> tuple:
+    """返回 (报表表格指标, 正文匹配指标)，正文匹配结果随文档缓存"""
+    # 单遍提取全部指标，结果随文档缓存
+    metrics = ctx.extras.get("metrics")
+    if metrics is None:
+        metrics = ctx.extras["metrics"] = extract_metrics(ctx.pages)
+    return statement_metrics(ctx.extras.get("statements", {})), metrics
+
+
+def collect_metric_records(ctx: DocumentContext) -> list:
+    """
+    汇总文档中的关键财务指标（本期数值）及其来源，合并报表表格中的数据优先于正文匹配
+
+    Args:
+        ctx: 文档上下文
+
+    Returns:
+        [{'metric', 'value', 'source_page', 'source'}]，source 为 'statement'（报表表格）或 'text'（正文匹配）
+    """
+    table_metrics, metrics = _document_metrics(ctx)
+    records = []
+    for key in METRIC_NAMES:
+        row = table_metrics.get(key)
+        if row is not None:
+            records.append({'metric': key, 'value': row.current, 'source_page': row.page, 'source': 'statement'})
+        elif key in metrics and metrics[key].value:
+            match = metrics[key]
+            records.append({'metric': key, 'value': match.value, 'source_page': match.page, 'source': 'text'})
+    return records
+
+
+def collect_financial_values(ctx: DocumentContext) -> dict:
+    """
+    汇总文档中的关键财务指标（本期数值），合并报表表格中的数据优先于正文匹配
+
+    Args:
+        ctx: 文档上下文
+
+    Returns:
+        指标键 -> 数值
+    """
+    return {record['metric']: record['value'] for record in collect_metric_records(ctx)}
+
+
+def format_financial_data(ctx: DocumentContext, data_type: str) -> str:
+    """
+    将文档中提取的财务数据格式化为文本
+
+    Args:
+        ctx: 文档上下文
+        data_type: 指标键，或 'all' 表示全部指标
+
+    Returns:
+        提取的财务数据
+    """
+    table_metrics, metrics = _document_metrics(ctx)
+    
+    # 合并报表表格中的数据优先于正文匹配
+    def describe(key: str) -> Optional[str]:
+        row = table_metrics.get(key)
+        if row is not None:
+            prior = f"，上期 {row.prior:,.2f}" if row.prior is not None else ""
+            return f"{METRIC_NAMES[key]}: {row.current:,.2f}{prior}（报表第 {row.page} 页）"
+        match = metrics.get(key)
+        if match and match.value:
+            return f"{METRIC_NAMES[key]}: {match.value:,.2f}（第 {match.page} 页）"
+        return None
+    
+    if data_type == 'all':
+        # 提取所有指标
+        result = "📊 提取的财务数据：\n\n"
+        for key in METRIC_NAMES:
+            line = describe(key)
+            if line:
+                result += f"- {line}\n"
+        
+        return result
+    
+    elif data_type in METRIC_NAMES:
+        line = describe(data_type)
+        if line:
+            return line
+        else:
+            return f"未能从PDF中提取到'{data_type}'相关数据"
+    
+    else:
+        return f"不支持的数据类型: {data_type}"
+
+
 @tool
-def extract_financial_data(data_type: str) -> str:
+def extract_financial_data(data_type: str, config: RunnableConfig) -> str:
     """
     从PDF中提取特定的财务数据
     
@@ -360,142 +574,52 @@ def extract_financial_data(data_type: str) -> str:
             - 'current_liabilities': 流动负债
             - 'cash': 现金及现金等价物
             - 'operating_income': 归属于上市公司股东的扣除非经常性损益的净利润
+            - 'inventory': 存货
+            - 'total_profit': 利润总额
+            - 'interest_expense': 利息费用
             - 'all': 提取所有关键财务指标
     
     Returns:
         提取的财务数据
     """
-    global pdf_content
+    ctx = get_session_document(_session_id(config))
     
-    if pdf_content is None:
+    if ctx is None:
         return "❌ 请先使用 load_financial_pdf 工具加载PDF文件"
     
-    # 定义财务指标的匹配模式
-    patterns = {
-        'revenue': [
-            r'营业收入[：:]\s*([\d,，.]+)',
-            r'营业总收入[：:]\s*([\d,，.]+)',
-            r'一、营业总收入\s+([\d,，.]+)',
-        ],
-        'net_income': [
-            r'净利润[：:]\s*([\d,，.]+)',
-            r'归属于.*净利润[：:]\s*([\d,，.]+)',
-            r'四、净利润.*\s+([\d,，.]+)',
-        ],
-        'total_assets': [
-            r'资产总计[：:]\s*([\d,，.]+)',
-            r'总资产[：:]\s*([\d,，.]+)',
-        ],
-        'total_liabilities': [
-            r'负债合计[：:]\s*([\d,，.]+)',
-            r'负债总计[：:]\s*([\d,，.]+)',
-        ],
-        'equity': [
-            r'所有者权益.*合计[：:]\s*([\d,，.]+)',
-            r'股东权益合计[：:]\s*([\d,，.]+)',
-        ],
-        'current_assets': [
-            r'流动资产合计[：:]\s*([\d,，.]+)',
-        ],
-        'current_liabilities': [
-            r'流动负债合计[：:]\s*([\d,，.]+)',
-        ],
-        'cash': [
-            r'货币资金[：:]\s*([\d,，.]+)',
-            r'现金及现金等价物[：:]\s*([\d,，.]+)',
-        ],
-        'operating_income': [
-            r'归属于上市公司股东的扣除非经常性损益的净利润[：:]\s*([\d,，.]+)',
-            r'非经常性损益净利润[：:]\s*([\d,，.]+)',
-        ],
-    }
-    
-    def extract_number(text, pattern_list):
-        """从文本中提取数字"""
-        for pattern in pattern_list:
-            matches = re.findall(pattern, text)
-            if matches:
-                # 清理数字格式
-                number_str = matches[0].replace(',', '').replace('，', '')
-                try:
-                    return float(number_str)
-                except:
-                    continue
-        return None
-    
-    if data_type == 'all':
-        # 提取所有指标
-        result = "📊 提取的财务数据：\n\n"
-        data_names = {
-            'operating_income': '归属于上市公司股东的扣除非经常性损益的净利润',
-            'revenue': '营业收入',
-            'net_income': '净利润',
-            'total_assets': '总资产',
-            'total_liabilities': '总负债',
-            'equity': '股东权益',
-            'current_assets': '流动资产',
-            'current_liabilities': '流动负债',
-            'cash': '货币资金',
-        }
-        
-        for key, name in data_names.items():
-            value = extract_number(pdf_content, patterns.get(key, []))
-            if value:
-                result += f"- {name}: {value:,.2f}\n"
-        
-        return result
-    
-    elif data_type in patterns:
-        value = extract_number(pdf_content, patterns[data_type])
-        if value:
-            data_names = {
-                'operating_income': '归属于上市公司股东的扣除非经常性损益的净利润',
-                'revenue': '营业收入',
-                'net_income': '净利润',
-                'total_assets': '总资产',
-                'total_liabilities': '总负债',
-                'equity': '股东权益',
-                'current_assets': '流动资产',
-                'current_liabilities': '流动负债',
-                'cash': '货币资金',
-            }
-            return f"{data_names[data_type]}: {value:,.2f}"
-        else:
-            return f"未能从PDF中提取到'{data_type}'相关数据"
-    
-    else:
-        return f"不支持的数据类型: {data_type}"
+    return format_financial_data(ctx, data_type)
 
 
-def create_financial_agent():
-    """创建财务分析智能体"""
+@tool
+def get_financial_statement(statement: str, config: RunnableConfig) -> str:
+    """
+    获取已加载PDF中的合并报表（逐行给出本期和上期金额）
     
-    # 初始化 DeepSeek 模型
-    # 说明：DeepSeek 提供 OpenAI 兼容的 API，所以使用 ChatOpenAI 类
-    # 只需将 openai_api_base 设置为 DeepSeek 的 API 地址即可
-    llm = ChatOpenAI(
-        model="deepseek-chat",
-        openai_api_key=DEEPSEEK_API_KEY,  # 使用 DeepSeek API Key
-        openai_api_base="https://api.deepseek.com",  # DeepSeek API 地址
-        temperature=0,
-    )
+    Args:
+        statement: 报表类型，可选值包括：
+            - 'balance_sheet': 合并资产负债表
+            - 'income_statement': 合并利润表
+            - 'cash_flow': 合并现金流量表
     
-    # 定义工具列表
-    tools = [
-        load_financial_pdf,
-        search_financial_info,
-        extract_financial_data,
-        calculate_financial_ratio,
-        analyze_profitability,
-        analyze_liquidity,
-        analyze_leverage,
-    ]
+    Returns:
+        报表内容
+    """
+    ctx = get_session_document(_session_id(config))
     
-    # 创建内存保存器
-    memory = MemorySaver()
+    if ctx is None:
+        return "❌ 请先使用 load_financial_pdf 工具加载PDF文件"
     
-    # 创建系统提示（使用 SystemMessage 对象）
-    system_message = SystemMessage(content="""你是一位专业的财务分析师助手，擅长分析企业财务报表。
+    if statement not in STATEMENT_TITLES:
+        return f"不支持的报表类型: {statement}"
+    
+    rows = ctx.extras.get("statements", {}).get(statement)
+    if not rows:
+        return f"未能从PDF中定位到{STATEMENT_TITLES[statement]}，请使用 search_financial_info 检索"
+    
+    return format_statement(statement, rows)
+
+
+AGENT_SYSTEM_PROMPT = """你是一位专业的财务分析师助手，擅长分析企业财务报表。
 
 你的职责包括：
 1. 加载和读取PDF格式的财务报表
@@ -511,6 +635,7 @@ def create_financial_agent():
 - load_financial_pdf: 加载PDF财务报表文件
 - search_financial_info: 从PDF中检索特定信息
 - extract_financial_data: 自动提取财务数据（营业收入、净利润等）
+- get_financial_statement: 获取完整的合并资产负债表、利润表或现金流量表
 - calculate_financial_ratio: 计算财务比率
 - analyze_profitability: 分析盈利能力
 - analyze_liquidity: 分析流动性
@@ -528,7 +653,89 @@ def create_financial_agent():
 - 避免过度使用工具，每个任务只调用必要的工具
 - 使用中文回答
 
-如果用户提供了财务数据或PDF文件，请根据用户的具体要求使用相应的工具。""")
+如果用户提供了财务数据或PDF文件，请根据用户的具体要求使用相应的工具。"""
+
+# agent 模式的三步分析查询
+ANALYSIS_QUERIES = [
+    "请加载这个PDF文件：{pdf_path}",
+    "从PDF中提取所有关键财务数据",
+    "基于提取的数据，分析这家公司的整体财务状况",
+]
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """记录每次 LLM 调用的耗时、token 用量和错误（agent、流水线和对比分析共用）"""
+
+    def __init__(self):
+        self._started = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        start = self._started.pop(run_id, None)
+        if start is not None:
+            observe_stage("llm", time.perf_counter() - start)
+
+        # 非流式调用在 llm_output 中返回用量，流式调用只在消息的 usage_metadata 中（服务端返回时）
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage:
+            record_tokens(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+            return
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                record_tokens(metadata.get("input_tokens", 0), metadata.get("output_tokens", 0))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
+        record_error("llm")
+
+
+_llm_metrics = LLMMetricsHandler()
+
+
+def create_llm(streaming: bool = False) -> ChatOpenAI:
+    """创建 DeepSeek 对话模型"""
+    # 说明：DeepSeek 提供 OpenAI 兼容的 API，所以使用 ChatOpenAI 类
+    # 只需将 openai_api_base 设置为 DeepSeek 的 API 地址即可
+    return ChatOpenAI(
+        model=LLM_MODEL_NAME,
+        openai_api_key=DEEPSEEK_API_KEY,  # 使用 DeepSeek API Key
+        openai_api_base="https://api.deepseek.com",  # DeepSeek API 地址
+        temperature=0,
+        streaming=streaming,
+        # 流式输出时也在最后一个分块中返回 token 用量，供 LLMMetricsHandler 统计
+        stream_usage=True,
+        callbacks=[_llm_metrics],
+    )
+
+
+def create_financial_agent():
+    """创建财务分析智能体"""
+    
+    llm = create_llm()
+    
+    # 定义工具列表
+    tools = [
+        load_financial_pdf,
+        search_financial_info,
+        extract_financial_data,
+        get_financial_statement,
+        calculate_financial_ratio,
+        analyze_profitability,
+        analyze_liquidity,
+        analyze_leverage,
+    ]
+    
+    # 创建内存保存器
+    memory = MemorySaver()
+    
+    # 创建系统提示（使用 SystemMessage 对象）
+    system_message = SystemMessage(content=AGENT_SYSTEM_PROMPT)
     
     # 创建 ReAct agent
     agent = create_react_agent(llm, tools, checkpointer=memory)
@@ -580,8 +787,9 @@ def main():
     #     print(f"🤖 AI: {last_message.content}\n")
 
 
-def main_with_pdf(pdf_path: str) -> Generator:
-    """运行带PDF分析的示例 - 流式版本"""
+def _prepare_pdf_analysis(pdf_path: str, thread_id: Optional[str], pdf_hash: Optional[str] = None,
+                          build_timings: Optional[dict] = None) -> tuple:
+    """创建 agent 并准备三步分析的查询和运行配置"""
     print("="*60)
     print("🏢 财务报表PDF分析示例")
     print("="*60)
@@ -590,52 +798,124 @@ def main_with_pdf(pdf_path: str) -> Generator:
     agent, system_message = create_financial_agent()
     
     # 测试查询
-    test_queries = [
-        f"请加载这个PDF文件：{pdf_path}",
-        "从PDF中提取所有关键财务数据",
-        "基于提取的数据，分析这家公司的整体财务状况",
-    ]
+    test_queries = [query.format(pdf_path=pdf_path) for query in ANALYSIS_QUERIES]
     
-    thread_id = "pdf_analysis_session"
+    thread_id = thread_id or f"pdf_analysis_{uuid4().hex}"
     config = {
-        "configurable": {"thread_id": thread_id},
+        "configurable": {"thread_id": thread_id, "pdf_path": pdf_path, "pdf_hash": pdf_hash,
+                         "build_timings": build_timings},
         "recursion_limit": 100000
     }
-    
-    for i, query in enumerate(test_queries, 1):
-        # 第一次对话时包含系统消息
-        if i == 1:
-            messages = [system_message, HumanMessage(content=query)]
-        else:
-            messages = [HumanMessage(content=query)]
 
-        # 返回流
-        stream = agent.stream(
-            {"messages": messages},
-            config=config,
-            stream_mode="values"
-        )
-        
-        # 使用生成器逐个产生事件
-        for chunk in stream:
-            latest_message = chunk["messages"][-1]
-            
-            if latest_message.content:
-                yield {
-                    "type": "message",
-                    "step": i,
-                    "content": latest_message.content
-                }
-            elif hasattr(latest_message, 'tool_calls') and latest_message.tool_calls:
-                tools = [tc['name'] for tc in latest_message.tool_calls]
-                yield {
-                    "type": "tool_call",
-                    "step": i,
-                    "tools": tools
-                }
+    # 第一次对话时包含系统消息
+    inputs = [
+        {"messages": [system_message, HumanMessage(content=query)] if i == 1 else [HumanMessage(content=query)]}
+        for i, query in enumerate(test_queries, 1)
+    ]
+    return agent, inputs, config, thread_id
+
+
+def main_with_pdf(pdf_path: str, thread_id: Optional[str] = None, stream_tokens: bool = False,
+                  pdf_hash: Optional[str] = None, build_timings: Optional[dict] = None) -> Generator:
+    """
+    运行带PDF分析的示例 - 流式版本
+
+    Args:
+        pdf_path: PDF文件的路径
+        thread_id: 会话 ID，同时用于 LangGraph 检查点和文档上下文隔离，默认每次调用生成新的会话
+        stream_tokens: 为 True 时按 token 产出增量文本（messages 模式），
+            否则每次状态变化产出完整的最新消息（values 模式）
+        pdf_hash: 已知的 PDF 内容 SHA-256，加载文档时不再重新计算
+        build_timings: 本次分析构建文档时，解析和建索引各阶段的耗时写入该字典
+    """
+    agent, inputs, config, thread_id = _prepare_pdf_analysis(pdf_path, thread_id, pdf_hash, build_timings)
+    stream_mode = "messages" if stream_tokens else "values"
+    
+    try:
+        for i, agent_input in enumerate(inputs, 1):
+            # 使用生成器逐个产生事件
+            for chunk in agent.stream(agent_input, config=config, stream_mode=stream_mode):
+                yield from _stream_events(chunk, i, stream_tokens)
+    finally:
+        # 会话结束后释放文档绑定，文档本身保留在 LRU 中供后续请求复用
+        release_session(thread_id)
     
     # 分析完成
     yield {
         "type": "complete",
         "message": "分析完成"
-    }
\ No newline at end of file
+    }
+
+
+async def amain_with_pdf(pdf_path: str, thread_id: Optional[str] = None, stream_tokens: bool = False,
+                         pdf_hash: Optional[str] = None, build_timings: Optional[dict] = None) -> AsyncGenerator:
+    """main_with_pdf 的异步版本（使用 agent.astream，同步工具由 LangGraph 放入线程池执行）"""
+    agent, inputs, config, thread_id = _prepare_pdf_analysis(pdf_path, thread_id, pdf_hash, build_timings)
+    stream_mode = "messages" if stream_tokens else "values"
+
+    try:
+        for i, agent_input in enumerate(inputs, 1):
+            async for chunk in agent.astream(agent_input, config=config, stream_mode=stream_mode):
+                for event in _stream_events(chunk, i, stream_tokens):
+                    yield event
+    finally:
+        release_session(thread_id)
+
+    # 分析完成
+    yield {
+        "type": "complete",
+        "message": "分析完成"
+    }
+
+
+def _stream_events(chunk, step: int, stream_tokens: bool) -> list:
+    """将 agent 流中的一个 chunk 转换为事件列表"""
+    if stream_tokens:
+        message, metadata = chunk
+        return _message_delta_events(message, metadata, step)
+
+    latest_message = chunk["messages"][-1]
+    if latest_message.content:
+        return [{
+            "type": "message",
+            "step": step,
+            "content": latest_message.content
+        }]
+    elif hasattr(latest_message, 'tool_calls') and latest_message.tool_calls:
+        tools = [tc['name'] for tc in latest_message.tool_calls]
+        return [{
+            "type": "tool_call",
+            "step": step,
+            "tools": tools
+        }]
+    return []
+
+
+def _message_delta_events(message, metadata: dict, step: int) -> list:
+    """messages 模式：逐 token 产出模型输出，并标注工具调用和工具结果"""
+    if isinstance(message, ToolMessage):
+        return [{
+            "type": "tool_result",
+            "step": step,
+            "tool": message.name,
+            "content": message.content
+        }]
+
+    events = []
+    # 工具调用的参数会分多个 chunk 到达，只在带有工具名的首个 chunk 上通知
+    tools = [tc["name"] for tc in getattr(message, "tool_call_chunks", None) or [] if tc.get("name")]
+    if tools:
+        events.append({
+            "type": "tool_call",
+            "step": step,
+            "tools": tools
+        })
+
+    if message.content:
+        events.append({
+            "type": "token",
+            "step": step,
+            "node": metadata.get("langgraph_node"),
+            "content": message.content
+        })
+    return events
@@ -0,0 +1,130 @@
+"""
+FAISS 向量索引磁盘缓存
+以「PDF 内容哈希 + 文本分割参数 + Embedding 模型名」为键保存向量索引和文本块元数据，
+同一份财报再次分析时直接从磁盘映射加载，跳过 PDF 解析与向量化
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from typing import Optional, Tuple
+
+import faiss
+from langchain_community.vectorstores import FAISS
+
+# 获取当前脚本所在目录的绝对路径
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# 索引缓存目录（可通过环境变量覆盖）
+INDEX_CACHE_DIR = os.environ.get("FAISS_INDEX_CACHE_DIR", os.path.join(SCRIPT_DIR, '..', 'index_cache'))
+
+# 缓存格式版本，修改存储结构时递增，使旧缓存自动失效
+CACHE_FORMAT_VERSION = 2
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "index.pkl"
+META_FILE = "meta.json"
+
+
+def file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """分块计算文件的 SHA-256，避免一次性读入整个 PDF"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def index_cache_key(pdf_hash: str, splitter_params: dict, model_name: str) -> str:
+    """
+    生成索引缓存键
+
+    Args:
+        pdf_hash: PDF 文件内容的 SHA-256
+        splitter_params: 文本分割参数（chunk_size、chunk_overlap、separators）
+        model_name: Embedding 模型名称
+
+    Returns:
+        缓存键（十六进制字符串）
+    """
+    payload = json.dumps({
+        "version": CACHE_FORMAT_VERSION,
+        "pdf": pdf_hash,
+        "splitter": splitter_params,
+        "model": model_name,
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _cache_path(key: str) -> str:
+    return os.path.join(INDEX_CACHE_DIR, key)
+
+
+def _read_index(index_path: str):
+    """优先以内存映射方式只读加载索引，当前 faiss 版本不支持时退回普通读取"""
+    try:
+        return faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        return faiss.read_index(index_path)
+
+
+def load_cached_index(key: str, embeddings) -> Optional[Tuple[FAISS, dict]]:
+    """
+    从磁盘加载缓存的向量索引
+
+    Args:
+        key: index_cache_key 生成的缓存键
+        embeddings: 用于查询向量化的 Embedding 实例
+
+    Returns:
+        (向量数据库, 元数据)，未命中或缓存损坏时返回 None
+    """
+    cache_path = _cache_path(key)
+    if not os.path.exists(os.path.join(cache_path, META_FILE)):
+        return None
+
+    try:
+        with open(os.path.join(cache_path, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        index = _read_index(os.path.join(cache_path, INDEX_FILE))
+        with open(os.path.join(cache_path, DOCSTORE_FILE), 'rb') as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+    except Exception as e:
+        print(f"⚠️ 索引缓存损坏，将重新构建: {e}")
+        shutil.rmtree(cache_path, ignore_errors=True)
+        return None
+
+    vectorstore = FAISS(embeddings, index, docstore, index_to_docstore_id)
+    return vectorstore, meta
+
+
+def save_index(key: str, vectorstore: FAISS, meta: dict) -> None:
+    """
+    将向量索引和元数据写入磁盘缓存
+    先写入临时目录再整体重命名，避免并发请求读到写了一半的缓存
+
+    Args:
+        key: index_cache_key 生成的缓存键
+        vectorstore: 已构建的 FAISS 向量数据库
+        meta: 元数据（页面文本、分块数等）
+    """
+    os.makedirs(INDEX_CACHE_DIR, exist_ok=True)
+    cache_path = _cache_path(key)
+    tmp_path = tempfile.mkdtemp(prefix=f".{key}.", dir=INDEX_CACHE_DIR)
+
+    try:
+        # save_local 写出 index.faiss 和 index.pkl
+        vectorstore.save_local(tmp_path)
+        with open(os.path.join(tmp_path, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        try:
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            # 其他请求已经写入了相同的缓存
+            shutil.rmtree(tmp_path, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
@@ -0,0 +1,165 @@
+"""
+确定性财报分析流水线
+加载、指标提取和比率分析直接在 Python 中按固定顺序执行，
+只有最终的分析结论由一次流式 LLM 调用生成，不经过 ReAct agent 的多轮工具调用
+"""
+
+import asyncio
+from typing import AsyncGenerator, Optional
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from .extractor import METRIC_NAMES
+from .index import (
+    analyze_leverage,
+    analyze_liquidity,
+    analyze_profitability,
+    collect_financial_values,
+    create_llm,
+    format_financial_data,
+    load_document,
+)
+
+PIPELINE_SYSTEM_PROMPT = """你是一位专业的财务分析师，擅长分析企业财务报表。
+用户会提供从财务报表中提取的关键数据和比率分析结果，请基于这些数据：
+1. 评估企业的盈利能力、流动性和偿债能力、资本结构
+2. 指出数据中的主要风险和亮点
+3. 给出整体财务状况的结论和建议
+
+⚠️ 重要规则：
+- 只依据提供的数据进行分析，数据缺失时明确说明，不要编造数字
+- 提供真实客观的分析，不能故意说好话
+- 使用中文回答"""
+
+# 比率分析工具 -> 所需指标（缺少任一指标时跳过该项分析）
+RATIO_ANALYSES = [
+    (analyze_profitability, ('revenue', 'net_income', 'total_assets', 'operating_income')),
+    (analyze_liquidity, ('current_assets', 'current_liabilities', 'cash', 'inventory')),
+    (analyze_leverage, ('total_assets', 'total_liabilities', 'equity')),
+]
+
+
+def run_ratio_analyses(values: dict) -> list:
+    """
+    使用提取的指标直接调用比率分析工具
+
+    Args:
+        values: 指标键 -> 数值
+
+    Returns:
+        [(工具名, 分析结果)]
+    """
+    results = []
+    for ratio_tool, required in RATIO_ANALYSES:
+        missing = [METRIC_NAMES[key] for key in required if key not in values]
+        if missing:
+            results.append((ratio_tool.name, f"数据不足，跳过（缺少: {'、'.join(missing)}）"))
+            continue
+
+        args = {key: values[key] for key in required}
+        if ratio_tool is analyze_leverage:
+            # 息税前利润 = 利润总额 + 利息费用
+            interest_expense = values.get('interest_expense', 0.0)
+            args['interest_expense'] = interest_expense
+            args['ebit'] = values.get('total_profit', 0.0) + interest_expense
+        results.append((ratio_tool.name, ratio_tool.invoke(args)))
+    return results
+
+
+def analysis_inputs(ctx) -> tuple:
+    """
+    提取关键财务数据并执行比率分析
+
+    Returns:
+        (财务数据文本, [(工具名, 分析结果)])
+    """
+    financial_data = format_financial_data(ctx, 'all')
+    ratio_results = run_ratio_analyses(collect_financial_values(ctx))
+    return financial_data, ratio_results
+
+
+def format_ratio_results(ratio_results: list) -> str:
+    return "\n\n".join(f"【{name}】\n{result}" for name, result in ratio_results)
+
+
+def _prepare_analysis(ctx, company_name: Optional[str]) -> tuple:
+    """执行提取和比率分析，返回 (进度事件列表, 生成结论的 LLM 消息)"""
+    # 2. 提取关键财务数据  3. 比率分析
+    financial_data, ratio_results = analysis_inputs(ctx)
+
+    events = [
+        {
+            "type": "message",
+            "step": 2,
+            "content": financial_data
+        },
+        {
+            "type": "tool_call",
+            "step": 3,
+            "tools": [name for name, _ in ratio_results]
+        },
+    ]
+
+    ratio_text = format_ratio_results(ratio_results)
+    subject = f"「{company_name}」" if company_name else "这家公司"
+    messages = [
+        SystemMessage(content=PIPELINE_SYSTEM_PROMPT),
+        HumanMessage(content=f"""以下是从{subject}财务报表中提取的数据和比率分析结果，请分析其整体财务状况。
+
+{financial_data}
+
+{ratio_text}"""),
+    ]
+    return events, messages
+
+
+def _load_event(ctx) -> dict:
+    return {
+        "type": "message",
+        "step": 1,
+        "content": f"✅ 已加载财务报表：{len(ctx.pages)} 页，{ctx.num_chunks} 个文本块"
+    }
+
+
+def _token_event(chunk) -> Optional[dict]:
+    if not chunk.content:
+        return None
+    return {
+        "type": "token",
+        "step": 3,
+        "content": chunk.content
+    }
+
+
+async def arun_pipeline(pdf_path: str, company_name: Optional[str] = None, pdf_hash: Optional[str] = None,
+                        build_timings: Optional[dict] = None) -> AsyncGenerator:
+    """
+    以确定性流水线分析财报 - 流式版本
+    产出的事件格式与 amain_with_pdf 一致，最终结论以 token 事件逐段产出；
+    解析、向量化等 CPU 密集步骤放入线程执行，LLM 使用 astream
+
+    Args:
+        pdf_path: PDF文件的路径
+        company_name: 公司名称（用于提示词）
+        pdf_hash: 已知的 PDF 内容 SHA-256，加载文档时不再重新计算
+        build_timings: 本次分析构建文档时，解析和建索引各阶段的耗时写入该字典
+    """
+    # 1. 加载文档
+    ctx = await asyncio.to_thread(load_document, pdf_path, pdf_hash, build_timings)
+    yield _load_event(ctx)
+
+    events, messages = await asyncio.to_thread(_prepare_analysis, ctx, company_name)
+    for event in events:
+        yield event
+
+    # 一次流式 LLM 调用生成结论
+    async for chunk in create_llm(streaming=True).astream(messages):
+        event = _token_event(chunk)
+        if event:
+            yield event
+
+    # 分析完成
+    yield {
+        "type": "complete",
+        "message": "分析完成"
+    }
@@ -0,0 +1,227 @@
+"""
+合并财务报表表格提取
+在 PyMuPDF 文档中定位 合并资产负债表 / 合并利润表 / 合并现金流量表 所在页，
+将表格解析为「项目 -> (本期, 上期)」映射，替代对行内文本的正则匹配
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# 报表键 -> 报表标题
+STATEMENT_TITLES = {
+    'balance_sheet': '合并资产负债表',
+    'income_statement': '合并利润表',
+    'cash_flow': '合并现金流量表',
+}
+
+# 出现这些标题说明当前报表已经结束
+_SECTION_END_TITLES = (
+    '合并资产负债表', '合并利润表', '合并现金流量表',
+    '母公司资产负债表', '母公司利润表', '母公司现金流量表',
+    '合并所有者权益变动表', '合并股东权益变动表',
+)
+
+# 单张报表最多跨越的页数
+MAX_STATEMENT_PAGES = 4
+# 只在页面开头若干行内查找报表标题，避免把附注、审计报告中的引用当作报表
+_TITLE_SEARCH_LINES = 10
+
+# 财务指标 -> (报表, 候选项目名)，候选项目名按优先级排列
+STATEMENT_METRICS = {
+    'revenue': ('income_statement', ['营业总收入', '营业收入']),
+    'net_income': ('income_statement', ['净利润']),
+    'total_assets': ('balance_sheet', ['资产总计']),
+    'total_liabilities': ('balance_sheet', ['负债合计']),
+    'equity': ('balance_sheet', ['所有者权益合计', '股东权益合计']),
+    'current_assets': ('balance_sheet', ['流动资产合计']),
+    'current_liabilities': ('balance_sheet', ['流动负债合计']),
+    'cash': ('balance_sheet', ['货币资金']),
+    'inventory': ('balance_sheet', ['存货']),
+    'total_profit': ('income_statement', ['利润总额']),
+    'interest_expense': ('income_statement', ['利息费用']),
+}
+
+_AMOUNT_RE = re.compile(r'^[-－−]?\(?[\d,]+(?:\.\d+)?\)?$')
+_NOTE_RE = re.compile(r'^[一二三四五六七八九十]+[、.．]?[\d()（）]*$|^[\d.、()（）]+$')
+_LABEL_PREFIX_RE = re.compile(r'^(?:[一二三四五六七八九十]+、|[（(][一二三四五六七八九十\d]+[)）]|[加减]：|其中：)+')
+_PARENTHETICAL_RE = re.compile(r'[（(][^）)]*[）)]')
+_EMPTY_AMOUNTS = ('-', '－', '—', '--')
+
+
+@dataclass(frozen=True)
+class StatementRow:
+    """报表中的一行"""
+    label: str
+    current: Optional[float]  # 本期（期末）金额
+    prior: Optional[float]    # 上期（期初）金额
+    page: int                 # 所在页码（从 1 开始）
+
+
+def parse_amount(text: Optional[str]) -> Optional[float]:
+    """解析报表金额，支持千分位、负号和括号表示的负数"""
+    if not text:
+        return None
+    s = re.sub(r'\s', '', text)
+    if not _AMOUNT_RE.match(s):
+        return None
+    negative = s[0] in '-－−' or s.startswith('(')
+    s = s.strip('-－−()').replace(',', '')
+    try:
+        value = float(s)
+    except ValueError:
+        return None
+    return -value if negative else value
+
+
+def normalize_label(text: str) -> str:
+    """规范化项目名：去掉空白、序号、「加：」「其中：」前缀以及括号说明"""
+    label = re.sub(r'\s', '', text)
+    label = _LABEL_PREFIX_RE.sub('', label)
+    return _PARENTHETICAL_RE.sub('', label)
+
+
+def _is_label(text: str) -> bool:
+    return bool(text) and text not in _EMPTY_AMOUNTS and parse_amount(text) is None and not _NOTE_RE.match(text)
+
+
+def _head_lines(text: str) -> List[str]:
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    return lines[:_TITLE_SEARCH_LINES]
+
+
+def find_statement_pages(pages: List[str]) -> Dict[str, List[int]]:
+    """
+    定位各合并报表所在的页（从 0 开始的页索引）
+
+    Args:
+        pages: 各页文本
+
+    Returns:
+        报表键 -> 页索引列表
+    """
+    starts = {}
+    for index, text in enumerate(pages):
+        head = _head_lines(text)
+        for key, title in STATEMENT_TITLES.items():
+            if key in starts:
+                continue
+            # 目录页中的标题后面跟着 "....." 和页码
+            if any(line.startswith(title) and '..' not in line and '…' not in line for line in head):
+                starts[key] = index
+        if len(starts) == len(STATEMENT_TITLES):
+            break
+
+    result = {}
+    for key, start in starts.items():
+        indexes = [start]
+        for index in range(start + 1, min(start + MAX_STATEMENT_PAGES, len(pages))):
+            head = _head_lines(pages[index])
+            if any(line.startswith(end) for line in head for end in _SECTION_END_TITLES):
+                break
+            indexes.append(index)
+        result[key] = indexes
+    return result
+
+
+def _rows_from_tables(page, page_no: int) -> List[StatementRow]:
+    """使用 PyMuPDF 表格识别解析行：首个文本单元格为项目，最后两列为本期、上期"""
+    rows = []
+    for table in page.find_tables().tables:
+        for cells in table.extract():
+            cells = [(c or '').strip() for c in cells]
+            if len(cells) < 3 or not _is_label(cells[0]):
+                continue
+            current, prior = parse_amount(cells[-2]), parse_amount(cells[-1])
+            if current is None and prior is None:
+                continue
+            rows.append(StatementRow(normalize_label(cells[0]), current, prior, page_no))
+    return rows
+
+
+def _rows_from_text(text: str, page_no: int) -> List[StatementRow]:
+    """表格识别失败时按文本行解析：项目名之后的金额依次为本期、上期"""
+    rows = []
+    label, amounts = None, []
+    for line in text.splitlines() + ['']:
+        line = line.strip()
+        amount = parse_amount(line)
+        # 「-」表示该期金额为空，需要占位以保持本期、上期的列顺序
+        if amount is not None or line in _EMPTY_AMOUNTS:
+            amounts.append(amount)
+            continue
+        if _NOTE_RE.match(line):
+            continue
+        if label and any(a is not None for a in amounts[:2]):
+            rows.append(StatementRow(normalize_label(label), amounts[0], amounts[1] if len(amounts) > 1 else None, page_no))
+        label, amounts = line, []
+    return rows
+
+
+def extract_statements(doc, pages: Optional[List[str]] = None) -> Dict[str, Dict[str, StatementRow]]:
+    """
+    提取三大合并报表
+
+    Args:
+        doc: PyMuPDF 文档对象（load_financial_pdf 中已打开的文档）
+        pages: 已提取的各页文本，不传时从 doc 重新提取
+
+    Returns:
+        报表键 -> {项目名: StatementRow}，同名项目保留首次出现的行
+    """
+    if pages is None:
+        pages = [page.get_text() for page in doc]
+    statements = {}
+    for key, page_indexes in find_statement_pages(pages).items():
+        rows: Dict[str, StatementRow] = {}
+        for index in page_indexes:
+            page = doc[index]
+            try:
+                page_rows = _rows_from_tables(page, index + 1)
+            except Exception:
+                page_rows = []
+            if not page_rows:
+                page_rows = _rows_from_text(pages[index], index + 1)
+            for row in page_rows:
+                rows.setdefault(row.label, row)
+        statements[key] = rows
+    return statements
+
+
+def statement_metrics(statements: Dict[str, Dict[str, StatementRow]]) -> Dict[str, StatementRow]:
+    """按 STATEMENT_METRICS 从报表中取出关键财务指标"""
+    result = {}
+    for metric, (key, labels) in STATEMENT_METRICS.items():
+        rows = statements.get(key, {})
+        for label in labels:
+            row = rows.get(label)
+            if row is not None and row.current is not None:
+                result[metric] = row
+                break
+    return result
+
+
+def statements_to_json(statements: Dict[str, Dict[str, StatementRow]]) -> dict:
+    """序列化报表，便于随向量索引一起缓存"""
+    return {
+        key: [[row.label, row.current, row.prior, row.page] for row in rows.values()]
+        for key, rows in statements.items()
+    }
+
+
+def statements_from_json(data: dict) -> Dict[str, Dict[str, StatementRow]]:
+    """反序列化 statements_to_json 的结果"""
+    return {
+        key: {row[0]: StatementRow(*row) for row in rows}
+        for key, rows in data.items()
+    }
+
+
+def format_statement(key: str, rows: Dict[str, StatementRow]) -> str:
+    """将报表格式化为文本，供 LLM 一次性读取"""
+    lines = [f"📑 {STATEMENT_TITLES[key]}（项目: 本期 | 上期）"]
+    for row in rows.values():
+        current = f"{row.current:,.2f}" if row.current is not None else "-"
+        prior = f"{row.prior:,.2f}" if row.prior is not None else "-"
+        lines.append(f"- {row.label}: {current} | {prior}")
+    return "\n".join(lines)
@@ -0,0 +1,251 @@
+"""
+批量预取定期报告
+对一批股票并发执行 爬取 -> 下载 -> 建立向量索引，进度写入 financial_report_progress，
+用于在财报季提前把报告和索引准备好，/analyze 请求直接命中缓存
+
+用法:
+    python batch.py --fiscal-year 2025 --period-type 3 --universe ../demo-tool/szse_stock.json
+    python batch.py --fiscal-year 2025 --period-type 3 --codes SZ:000001 SH:600000 --workers 8
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+
+import httpx
+
+from ai.index import collect_metric_records, load_document
+from browser.pool import close_browser_pool
+from crawler_website.run_browser import async_run_browser
+from db.metrics import save_metrics_async
+from db.progress import find_progress_many_async, record_progress_async
+from db.report_cache import report_key
+from db.save_company_info import save_company_info_async
+from db.search_SQL import search_SQL_async, search_SQL_many_async
+from download_pdf import pdf_cache
+from download_pdf.auth_download import async_auth_download
+import response_cache
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+# 巨潮资讯的全市场股票列表（与 /get_company_info 相同）
+CNINFO_STOCK_URL = "http://www.cninfo.com.cn/new/data/szse_stock.json"
+# 默认并发数
+DEFAULT_WORKERS = int(os.environ.get("BATCH_WORKERS", "4"))
+# 每个交易所两次请求之间的最小间隔（秒）
+DEFAULT_EXCHANGE_INTERVAL = float(os.environ.get("BATCH_EXCHANGE_INTERVAL", "1.0"))
+
+
+class RateLimiter:
+    """按交易所限速：同一交易所的请求之间至少间隔 interval 秒"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._locks = {}
+        self._last = {}
+
+    async def wait(self, key: str) -> None:
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            delay = self._last.get(key, 0) + self.interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._last[key] = time.monotonic()
+
+
+def exchange_of(code: str):
+    """根据股票代码判断交易所，无法判断时返回 None"""
+    if code.startswith('6'):
+        return 'SH'
+    if code.startswith(('0', '3')):
+        return 'SZ'
+    if code.startswith(('4', '8', '92')):
+        return 'BJ'
+    return None
+
+
+def load_universe(source: str) -> list:
+    """
+    读取股票池
+
+    Args:
+        source: 巨潮 szse_stock.json 格式的文件路径或 URL（{"stockList": [{"code", "category", ...}]}）
+
+    Returns:
+        [(交易所代码, 股票代码)]，只保留 A 股
+    """
+    if source.startswith(('http://', 'https://')):
+        response = httpx.get(source, timeout=30)
+        response.raise_for_status()
+        data = response.json()
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+    stocks = data.get('stockList', []) if isinstance(data, dict) else data
+    universe = []
+    for stock in stocks:
+        code = stock.get('code', '')
+        exchange_code = exchange_of(code)
+        if exchange_code and stock.get('category', 'A股') == 'A股':
+            universe.append((exchange_code, code))
+    return universe
+
+
+def parse_codes(codes: list) -> list:
+    """解析命令行中的 SZ:000001 形式的股票代码"""
+    universe = []
+    for item in codes:
+        exchange_code, _, code = item.partition(':')
+        if not code:
+            exchange_code, code = exchange_of(item), item
+        if exchange_code:
+            universe.append((exchange_code.upper(), code))
+        else:
+            logging.warning(f"无法识别交易所，已跳过: {item}")
+    return universe
+
+
+async def _record_status(exchange_code, stock_code, fiscal_year, period_type, status, file_url=None, error=None):
+    try:
+        await record_progress_async(exchange_code, stock_code, fiscal_year, period_type, status, file_url, error)
+    except Exception as e:
+        # 进度记录失败不影响预取本身
+        logging.warning(f"记录进度失败 {exchange_code}-{stock_code}: {e}")
+
+
+async def prefetch_report(exchange_code, stock_code, fiscal_year, period_type, limiter: RateLimiter,
+                          build_index: bool = True, progress: dict = None) -> str:
+    """
+    预取单只股票的报告
+
+    Args:
+        progress: 该报表已有的处理进度（financial_report_progress 的行）
+
+    Returns:
+        最终状态：'indexed' | 'downloaded' | 'skipped'
+    """
+    file = await search_SQL_async(exchange_code, stock_code, fiscal_year, period_type)
+    finished = ('indexed',) if build_index else ('downloaded', 'indexed')
+    # 报告更正后 file_url 变化，之前的进度对应旧文件，需要重新处理
+    if file and progress and progress.get('status') in finished and progress.get('file_url') == file[0]['file_url']:
+        return 'skipped'
+
+    if not file:
+        await limiter.wait(exchange_code)
+        file = await async_run_browser(exchange_code, stock_code, fiscal_year, period_type)
+        if not file:
+            raise ValueError("未找到定期报告")
+        await save_company_info_async(file[0]['file_url'], exchange_code, stock_code, fiscal_year, period_type,
+                                      file[0]['company_name'])
+        await _record_status(exchange_code, stock_code, fiscal_year, period_type, 'crawled', file[0]['file_url'])
+
+    file_url, company_name = file[0]['file_url'], file[0]['company_name']
+    pdf_path = await pdf_cache.lookup_async(file_url)
+    if not pdf_path:
+        await limiter.wait(exchange_code)
+        downloaded_path, validators = await async_auth_download(file_url, company_name)
+        pdf_path = await asyncio.to_thread(pdf_cache.store, file_url, downloaded_path, **validators)
+        # 新摄入的 PDF 与之前的内容不同时，删除该报告期旧的分析结果缓存
+        await asyncio.to_thread(response_cache.invalidate_stale, exchange_code, stock_code, fiscal_year,
+                                period_type, pdf_cache.cached_sha256(pdf_path))
+    await _record_status(exchange_code, stock_code, fiscal_year, period_type, 'downloaded', file_url)
+
+    if not build_index:
+        return 'downloaded'
+    # 解析和向量化是 CPU 密集操作，放入线程执行；结果写入磁盘索引缓存
+    pdf_hash = pdf_cache.cached_sha256(pdf_path)
+    records = await asyncio.to_thread(lambda: collect_metric_records(load_document(pdf_path, pdf_hash)))
+    await save_metrics_async(exchange_code, stock_code, fiscal_year, period_type, company_name, records)
+    await _record_status(exchange_code, stock_code, fiscal_year, period_type, 'indexed', file_url)
+    return 'indexed'
+
+
+async def run_batch(universe: list, fiscal_year: int, period_type: int, workers: int = DEFAULT_WORKERS,
+                    interval: float = DEFAULT_EXCHANGE_INTERVAL, build_index: bool = True) -> dict:
+    """
+    以有界的 worker 池并发预取整个股票池
+
+    Returns:
+        各状态的数量统计
+    """
+    queue = asyncio.Queue()
+    for item in universe:
+        queue.put_nowait(item)
+
+    # 一次批量查询预热缓存，之后每只股票的 search_SQL_async 直接命中
+    keys = [(ex, code, fiscal_year, period_type) for ex, code in universe]
+    try:
+        await search_SQL_many_async(keys)
+    except Exception as e:
+        logging.warning(f"批量查询报表失败，改为逐个查询: {e}")
+    try:
+        progress = await find_progress_many_async(keys)
+    except Exception as e:
+        logging.warning(f"查询处理进度失败，全部重新处理: {e}")
+        progress = {}
+
+    limiter = RateLimiter(interval)
+    summary = {'indexed': 0, 'downloaded': 0, 'skipped': 0, 'failed': 0}
+    total = len(universe)
+
+    async def worker():
+        while True:
+            try:
+                exchange_code, stock_code = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            key = report_key(exchange_code, stock_code, fiscal_year, period_type)
+            try:
+                status = await prefetch_report(exchange_code, stock_code, fiscal_year, period_type, limiter,
+                                               build_index, progress.get(key))
+            except Exception as e:
+                status = 'failed'
+                logging.error(f"预取失败 {exchange_code}-{stock_code}: {e}")
+                # 报表可能还没有入库（爬取失败、未找到报告），进度表按键写入，不依赖报表行
+                await _record_status(exchange_code, stock_code, fiscal_year, period_type, 'failed', error=str(e))
+            summary[status] += 1
+            done = sum(summary.values())
+            logging.info(f"[{done}/{total}] {exchange_code}-{stock_code}: {status}")
+
+    await asyncio.gather(*(worker() for _ in range(max(1, workers))))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量预取定期报告并建立索引")
+    parser.add_argument('--fiscal-year', type=int, required=True, help="财政年份")
+    parser.add_argument('--period-type', type=int, default=4, help="报表期间类型（1-4）")
+    parser.add_argument('--universe', default=CNINFO_STOCK_URL, help="szse_stock.json 文件路径或 URL")
+    parser.add_argument('--codes', nargs='*', help="只预取指定股票，如 SZ:000001 SH:600000")
+    parser.add_argument('--exchange', choices=['SH', 'SZ', 'BJ'], help="只预取指定交易所")
+    parser.add_argument('--limit', type=int, help="最多预取的股票数")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="并发数")
+    parser.add_argument('--interval', type=float, default=DEFAULT_EXCHANGE_INTERVAL,
+                        help="同一交易所两次请求的最小间隔（秒）")
+    parser.add_argument('--no-index', action='store_true', help="只下载，不建立向量索引")
+    args = parser.parse_args()
+
+    universe = parse_codes(args.codes) if args.codes else load_universe(args.universe)
+    if args.exchange:
+        universe = [item for item in universe if item[0] == args.exchange]
+    if args.limit:
+        universe = universe[:args.limit]
+
+    logging.info(f"开始批量预取: {len(universe)} 只股票，fiscal_year={args.fiscal_year}，季度={args.period_type}")
+    try:
+        summary = asyncio.run(run_batch(universe, args.fiscal_year, args.period_type, args.workers,
+                                        args.interval, not args.no_index))
+        logging.info(f"批量预取完成: {summary}")
+    finally:
+        close_browser_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+共享的无头浏览器池
+进程内只启动一个常驻的 Chromium，在独立线程的事件循环中运行；
+爬虫和 PDF 下载以「任务」形式提交，复用空闲的浏览器上下文，
+并通过信号量限制同时打开的上下文数量
+
+同步调用方使用 run_sync，异步调用方（FastAPI）使用 run
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from playwright.async_api import async_playwright, BrowserContext
+
+T = TypeVar("T")
+
+# 同时打开的浏览器上下文上限
+MAX_CONTEXTS = int(os.environ.get("BROWSER_POOL_SIZE", "4"))
+# 默认无头运行，调试时可设置 BROWSER_HEADLESS=0 查看浏览器界面
+HEADLESS = os.environ.get("BROWSER_HEADLESS", "1") != "0"
+# 页面操作和导航的默认超时（毫秒）
+DEFAULT_TIMEOUT_MS = 60000
+
+
+class BrowserPool:
+    """常驻浏览器 + 可复用上下文池"""
+
+    def __init__(self, max_contexts: int = MAX_CONTEXTS, headless: bool = HEADLESS):
+        self.max_contexts = max_contexts
+        self.headless = headless
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="browser-pool", daemon=True)
+        self._thread.start()
+        self._playwright = None
+        self._browser = None
+        self._idle_contexts = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._launch_lock: Optional[asyncio.Lock] = None
+        self._stats = {"launches": 0, "jobs": 0, "failures": 0, "last_launch_at": None}
+
+    # ---------- 对外接口 ----------
+
+    def run_sync(self, job: Callable[[BrowserContext], Awaitable[T]], timeout: Optional[float] = None) -> T:
+        """在浏览器池中执行任务并阻塞等待结果（供同步代码调用）"""
+        return asyncio.run_coroutine_threadsafe(self._run(job), self._loop).result(timeout)
+
+    async def run(self, job: Callable[[BrowserContext], Awaitable[T]]) -> T:
+        """在浏览器池中执行任务（供其他事件循环中的异步代码调用）"""
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._run(job), self._loop))
+
+    def health(self) -> dict:
+        """返回浏览器池状态"""
+        connected = bool(self._browser and self._browser.is_connected())
+        return {
+            "connected": connected,
+            "headless": self.headless,
+            "max_contexts": self.max_contexts,
+            "idle_contexts": len(self._idle_contexts),
+            **self._stats,
+        }
+
+    def close(self) -> None:
+        """关闭浏览器并停止事件循环线程"""
+        if self._loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(30)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        self._loop.close()
+
+    # ---------- 事件循环线程内部 ----------
+
+    async def _ensure_browser(self):
+        """健康检查：浏览器未启动或已断开时重新启动"""
+        if self._launch_lock is None:
+            self._launch_lock = asyncio.Lock()
+            self._semaphore = asyncio.Semaphore(self.max_contexts)
+
+        async with self._launch_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+
+            if self._browser is not None:
+                logging.warning("浏览器连接已断开，正在重新启动")
+            self._idle_contexts.clear()
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=self.headless, timeout=400000)
+            self._stats["launches"] += 1
+            self._stats["last_launch_at"] = time.time()
+            logging.info(f"浏览器池已启动 Chromium（headless={self.headless}）")
+            return self._browser
+
+    async def _acquire_context(self) -> BrowserContext:
+        browser = await self._ensure_browser()
+        while self._idle_contexts:
+            context = self._idle_contexts.pop()
+            if context.browser is browser:
+                return context
+        # 允许下载：直接访问 PDF 链接时浏览器会把响应转为下载
+        return await browser.new_context(accept_downloads=True)
+
+    async def _release_context(self, context: BrowserContext, healthy: bool) -> None:
+        # 关闭任务打开的页面，保留上下文中的 cookies 供下次复用
+        try:
+            for page in list(context.pages):
+                await page.close()
+        except Exception:
+            healthy = False
+
+        if healthy and self._browser is not None and self._browser.is_connected():
+            self._idle_contexts.append(context)
+        else:
+            try:
+                await context.close()
+            except Exception:
+                pass
+
+    async def _run(self, job: Callable[[BrowserContext], Awaitable[T]]) -> T:
+        await self._ensure_browser()
+        async with self._semaphore:
+            context = await self._acquire_context()
+            context.set_default_timeout(DEFAULT_TIMEOUT_MS)
+            context.set_default_navigation_timeout(DEFAULT_TIMEOUT_MS)
+            healthy = True
+            self._stats["jobs"] += 1
+            try:
+                return await job(context)
+            except Exception:
+                self._stats["failures"] += 1
+                healthy = False
+                raise
+            finally:
+                await self._release_context(context, healthy)
+
+    async def _shutdown(self) -> None:
+        for context in self._idle_contexts:
+            try:
+                await context.close()
+            except Exception:
+                pass
+        self._idle_contexts.clear()
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """获取进程内共享的浏览器池（首次调用时创建）"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = BrowserPool()
+    return _pool
+
+
+def browser_pool_health() -> dict:
+    """返回共享浏览器池的状态；尚未创建时不会为了健康检查而启动浏览器"""
+    pool = _pool
+    if pool is None:
+        return {"status": "not started"}
+    return {"status": "running", **pool.health()}
+
+
+def close_browser_pool() -> None:
+    """关闭共享的浏览器池（服务退出时调用）"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
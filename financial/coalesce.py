@@ -0,0 +1,105 @@
+"""
+请求合并（single-flight）
+相同 key 的并发调用只执行一次生产者，产出的事件依次分发给所有订阅者，
+后加入的订阅者先补发已产生的事件，结束时共享同一份结果；
+生产者失败时每个订阅者各自收到一个 SharedStreamError（__cause__ 为原始异常），
+所有订阅者都离开时取消生产者
+"""
+
+import asyncio
+import logging
+from typing import AsyncGenerator, Callable, Dict
+
+
+class SharedStreamError(RuntimeError):
+    """合并执行的生产者失败，消息与原始异常相同，原始异常见 __cause__"""
+
+
+class _Flight:
+    """一次正在执行的生产者：事件列表 + 结果"""
+
+    def __init__(self):
+        self.events = []
+        self.result = {}
+        self.error = None
+        self.done = False
+        self.subscribers = 0
+        self.task = None
+        self._changed = asyncio.Condition()
+
+    async def run(self, producer: AsyncGenerator) -> None:
+        try:
+            async for event in producer:
+                self.events.append(event)
+                async with self._changed:
+                    self._changed.notify_all()
+        except asyncio.CancelledError:
+            self.error = RuntimeError("请求已取消")
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            async with self._changed:
+                self._changed.notify_all()
+
+    async def subscribe(self) -> AsyncGenerator:
+        seq = 0
+        while True:
+            while seq < len(self.events):
+                seq += 1
+                yield self.events[seq - 1]
+            if self.done:
+                return
+            async with self._changed:
+                if seq >= len(self.events) and not self.done:
+                    await self._changed.wait()
+
+
+_inflight: Dict[tuple, _Flight] = {}
+
+
+async def shared_stream(key: tuple, factory: Callable[[dict], AsyncGenerator], result: dict) -> AsyncGenerator:
+    """
+    合并相同 key 的并发调用
+
+    Args:
+        key: 合并键，执行期间相同 key 的调用共享一次执行
+        factory: factory(result) 返回事件异步生成器，并在结束前把结果写入 result
+        result: 调用方的结果字典，结束后写入共享的结果
+
+    生产者在独立的任务中运行，某个订阅者断开不会影响其他订阅者
+    """
+    flight = _inflight.get(key)
+    if flight is None:
+        flight = _Flight()
+        _inflight[key] = flight
+
+        async def run():
+            try:
+                await flight.run(factory(flight.result))
+            finally:
+                if _inflight.get(key) is flight:
+                    del _inflight[key]
+
+        flight.task = asyncio.create_task(run())
+    else:
+        logging.info(f"合并到正在执行的请求: {key}（当前 {flight.subscribers + 1} 个订阅者）")
+
+    flight.subscribers += 1
+    try:
+        async for event in flight.subscribe():
+            yield event
+    finally:
+        flight.subscribers -= 1
+        if flight.subscribers == 0 and not flight.done:
+            # 没有订阅者等待结果，停止生产者；之后相同 key 的调用重新执行
+            logging.info(f"所有订阅者已离开，取消请求: {key}")
+            if _inflight.get(key) is flight:
+                del _inflight[key]
+            flight.task.cancel()
+
+    if flight.error is not None:
+        # 每个订阅者抛出新的异常实例，各自的 traceback 不会互相叠加
+        raise SharedStreamError(str(flight.error)) from flight.error
+    result.update(flight.result)
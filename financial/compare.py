@@ -0,0 +1,172 @@
+"""
+多公司对比分析
+各公司的 查询 -> 爬取 -> 下载 -> 解析/提取 并发执行（共享 PDF、索引和数据库缓存），
+进度事件合并为一条事件流（以 stock 字段区分公司），最后一次 LLM 调用生成对比结论
+"""
+
+import asyncio
+import logging
+import os
+from typing import AsyncGenerator, List, Tuple
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from ai.index import create_llm, load_document
+from ai.pipeline import analysis_inputs, format_ratio_results
+from index import acquire_report, record_metrics
+
+# 单次对比的公司数量上限
+MAX_COMPARE_STOCKS = int(os.environ.get("MAX_COMPARE_STOCKS", "8"))
+
+COMPARE_SYSTEM_PROMPT = """你是一位专业的财务分析师，擅长同行业公司的横向对比分析。
+用户会提供多家公司从财务报表中提取的关键数据和比率分析结果，请基于这些数据：
+1. 逐项对比各公司的盈利能力、流动性和偿债能力、资本结构
+2. 指出各公司相对同行的优势和主要风险
+3. 给出整体排序或结论，并说明依据
+
+⚠️ 重要规则：
+- 只依据提供的数据进行分析，数据缺失时明确说明，不要编造数字
+- 注意各公司的报表口径和规模差异，优先比较比率而非绝对值
+- 使用中文回答"""
+
+# 单个公司处理结束的标记
+_DONE = object()
+
+
+async def _prepare_company(exchange_code, stock_code, fiscal_year, period_type, queue: asyncio.Queue) -> dict:
+    """获取并解析一家公司的报表，进度事件写入 queue"""
+    stock = f"{exchange_code}-{stock_code}"
+    report = {}
+    async for event in acquire_report(exchange_code, stock_code, fiscal_year, period_type, report):
+        await queue.put({**event, "stock": stock})
+    company_name, pdf_path, pdf_hash = report["company_name"], report["pdf_path"], report["pdf_hash"]
+
+    await queue.put({
+        "status": "progress",
+        "step": "extract",
+        "stock": stock,
+        "message": f"正在提取 {company_name} 的财务数据..."
+    })
+    # 解析、向量化和比率计算是 CPU 密集操作，放入线程执行
+    financial_data, ratio_results = await asyncio.to_thread(
+        lambda: analysis_inputs(load_document(pdf_path, pdf_hash)))
+    await record_metrics(exchange_code, stock_code, fiscal_year, period_type, company_name, pdf_path, pdf_hash)
+
+    await queue.put({
+        "status": "progress",
+        "step": "extracted",
+        "stock": stock,
+        "message": f"{company_name} 的财务数据提取完成",
+        "data": financial_data
+    })
+    return {
+        "stock": stock,
+        "company_name": company_name,
+        "financial_data": financial_data,
+        "ratio_text": format_ratio_results(ratio_results),
+    }
+
+
+def _compare_messages(companies: List[dict]) -> list:
+    sections = "\n\n".join(
+        f"### {c['company_name']}（{c['stock']}）\n\n{c['financial_data']}\n\n{c['ratio_text']}"
+        for c in companies
+    )
+    names = "、".join(f"「{c['company_name']}」" for c in companies)
+    return [
+        SystemMessage(content=COMPARE_SYSTEM_PROMPT),
+        HumanMessage(content=f"以下是{names}财务报表中提取的数据和比率分析结果，请进行对比分析。\n\n{sections}"),
+    ]
+
+
+async def acompare(stocks: List[Tuple[str, str]], fiscal_year, period_type=3) -> AsyncGenerator:
+    """
+    对比分析多家公司 - 返回异步生成器用于流式处理
+
+    Args:
+        stocks: [(exchange_code, stock_code)]
+        fiscal_year: 财政年份
+        period_type: 报告期（1-4）
+    """
+    tasks = []
+    try:
+        # 去重并保持顺序
+        stocks = list(dict.fromkeys((exchange_code, str(stock_code)) for exchange_code, stock_code in stocks))
+        if not stocks:
+            raise ValueError("请至少提供一家公司")
+        if len(stocks) > MAX_COMPARE_STOCKS:
+            raise ValueError(f"单次最多对比 {MAX_COMPARE_STOCKS} 家公司")
+        logging.info(f"开始对比分析: {stocks}, fiscal_year={fiscal_year}, 季度={period_type}")
+
+        queue = asyncio.Queue()
+
+        async def run(exchange_code, stock_code):
+            try:
+                return await _prepare_company(exchange_code, stock_code, fiscal_year, period_type, queue)
+            except Exception as e:
+                # 单个公司失败不影响其他公司
+                logging.error(f"{exchange_code}-{stock_code} 处理失败: {str(e)}", exc_info=True)
+                await queue.put({
+                    "status": "error",
+                    "stock": f"{exchange_code}-{stock_code}",
+                    "message": str(e)
+                })
+                return None
+            finally:
+                await queue.put(_DONE)
+
+        tasks = [asyncio.create_task(run(exchange_code, stock_code)) for exchange_code, stock_code in stocks]
+
+        # 合并各公司的进度事件
+        pending = len(tasks)
+        while pending:
+            event = await queue.get()
+            if event is _DONE:
+                pending -= 1
+                continue
+            yield event
+
+        companies = [task.result() for task in tasks if task.result()]
+        failed = [f"{exchange_code}-{stock_code}" for (exchange_code, stock_code), task in zip(stocks, tasks)
+                  if not task.result()]
+        if not companies:
+            raise ValueError("没有可用于对比的财务报表")
+
+        yield {
+            "status": "progress",
+            "step": "analyze_start",
+            "message": f"开始对比分析 {'、'.join(c['company_name'] for c in companies)} 的财务报表..."
+        }
+
+        # 一次流式 LLM 调用生成对比结论
+        async for chunk in create_llm(streaming=True).astream(_compare_messages(companies)):
+            if chunk.content:
+                yield {
+                    "status": "analyzing",
+                    "step": "analysis_delta",
+                    "data": chunk.content
+                }
+
+        logging.info("对比分析完成")
+        yield {
+            "status": "complete",
+            "message": "对比分析完成",
+            "data": {
+                "companies": [{"stock": c["stock"], "company_name": c["company_name"]} for c in companies],
+                "failed": failed,
+                "fiscal_year": fiscal_year,
+                "period_type": period_type
+            }
+        }
+
+    except Exception as e:
+        logging.error(f"对比分析出错: {str(e)}", exc_info=True)
+        yield {
+            "status": "error",
+            "message": str(e)
+        }
+    finally:
+        # 客户端断开时取消仍在进行的任务
+        for task in tasks:
+            if not task.done():
+                task.cancel()
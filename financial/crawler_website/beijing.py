@@ -1,2 +1,31 @@
-def beijing_browser(page,searchWord):
-    pass
\ No newline at end of file
+"""
+北京证券交易所定期报告爬虫模块
+北交所的披露列表页由 infoResult.do 接口提供数据；浏览器回退路径先打开披露页面拿到站点 cookies，
+再通过页面共享的请求上下文调用同一个接口
+"""
+
+from .http_crawler import BSE_API_URL, BSE_HEADERS, bse_form, parse_bse
+
+# 北交所信息披露页面
+DISCLOSURE_URL = "https://www.bse.cn/disclosure/announcement.html"
+
+
+async def beijing_browser_async(page, searchWord):
+    """
+    在北交所网站查询定期报告
+
+    Args:
+        page: Playwright 的 Page 对象（async_api）
+        searchWord: 股票代码
+
+    Returns:
+        list: 报告条目（见 reports.make_report），没有结果时返回空列表
+    """
+    await page.goto(DISCLOSURE_URL)
+    await page.wait_for_load_state("domcontentloaded")
+
+    response = await page.request.post(BSE_API_URL, form=bse_form(searchWord),
+                                       headers={'Referer': BSE_HEADERS['Referer']})
+    res = parse_bse(await response.text())
+    print(f"获取到的链接: {res[:1]}")
+    return res
@@ -0,0 +1,296 @@
+"""
+交易所披露查询接口爬虫
+深交所、上交所、北交所的定期报告列表页面背后都是 JSON 接口，直接请求接口即可拿到报告链接，
+不需要启动浏览器；接口不可用时由 run_browser 回退到 Playwright 页面爬取
+"""
+
+import json
+import time
+from datetime import date, timedelta
+
+import httpx
+import requests
+
+from .reports import make_report, select_report
+
+# 深交所公告查询接口与文件下载域名
+SZSE_API_URL = "https://www.szse.cn/api/disc/announcement/annList"
+SZSE_STATIC_URL = "https://disc.static.szse.cn"
+# 上交所公告查询接口与文件下载域名
+SSE_API_URL = "https://query.sse.com.cn/security/stock/queryCompanyBulletin.do"
+SSE_STATIC_URL = "https://static.sse.com.cn"
+# 北交所信息披露查询接口（JSONP）与文件下载域名
+BSE_API_URL = "https://www.bse.cn/disclosureInfoController/infoResult.do"
+BSE_STATIC_URL = "https://www.bse.cn"
+
+# 单次请求超时（秒）
+HTTP_TIMEOUT = 10
+PAGE_SIZE = 30
+# 按财政年份查询单只股票时最多翻页数
+MAX_REPORT_PAGES = 10
+# 单日披露无法再缩小查询区间，单独查询该日时最多翻页数（年报季单日约 1000 余条）
+MAX_DAY_PAGES = 200
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/json, text/javascript, */*; q=0.01',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+}
+SZSE_HEADERS = {
+    **HEADERS,
+    'Content-Type': 'application/json',
+    'Referer': 'https://www.szse.cn/disclosure/listed/fixed/index.html',
+}
+# 上交所接口会校验 Referer
+SSE_HEADERS = {
+    **HEADERS,
+    'Referer': 'https://www.sse.com.cn/',
+}
+BSE_HEADERS = {
+    **HEADERS,
+    'Referer': 'https://www.bse.cn/disclosure/announcement.html',
+}
+
+_session = requests.Session()
+
+
+def _szse_payload(stock_code='', begin_date='', end_date='', page=1):
+    return {
+        'seDate': [begin_date, end_date],
+        'stock': [stock_code] if stock_code else [],
+        'channelCode': ['fixed_disc'],  # 定期报告
+        'pageSize': PAGE_SIZE,
+        'pageNum': page,
+    }
+
+
+def _sse_params(stock_code='', begin_date='', end_date='', page=1):
+    return {
+        'isPagination': 'true',
+        'productId': stock_code,
+        'securityType': '0101,120100,020100,020200,120200',
+        'reportType2': 'DQBG',  # 定期报告
+        'reportType': 'ALL',
+        'beginDate': begin_date,
+        'endDate': end_date,
+        'pageHelp.pageSize': PAGE_SIZE,
+        'pageHelp.pageNo': page,
+        'pageHelp.beginPage': page,
+        'pageHelp.cacheSize': 1,
+        'pageHelp.endPage': page,
+        '_': int(time.time() * 1000),
+    }
+
+
+def bse_form(stock_code='', begin_date='', end_date='', page=1):
+    """北交所查询接口的表单参数（浏览器回退路径 beijing.py 共用）"""
+    return {
+        'disclosureType[]': 5,  # 定期报告
+        'page': page - 1,  # 北交所页码从 0 开始
+        'companyCd': stock_code,
+        'isNewThree': 1,
+        'startTime': begin_date,
+        'endTime': end_date,
+        'keyword': '',
+        'xxfcbj[]': 2,
+        'sortfield': 'publishDate',
+        'sorttype': 'desc',
+    }
+
+
+def _parse_szse(data):
+    reports = []
+    for item in data.get('data') or []:
+        attach_path = item.get('attachPath')
+        if not attach_path:
+            continue
+        sec_codes = item.get('secCode') or ['']
+        sec_names = item.get('secName') or ['']
+        reports.append(make_report(sec_names[0], f"{SZSE_STATIC_URL}{attach_path}",
+                                   item.get('title', ''), item.get('publishTime'), sec_codes[0]))
+    return reports
+
+
+def _parse_sse(data):
+    rows = data.get('result') or (data.get('pageHelp') or {}).get('data') or []
+    reports = []
+    for item in rows:
+        url = item.get('URL')
+        if not url:
+            continue
+        reports.append(make_report(item.get('SECURITY_NAME', ''), f"{SSE_STATIC_URL}{url}",
+                                   item.get('TITLE', ''), item.get('SSEDATE'), item.get('SECURITY_CODE')))
+    return reports
+
+
+def parse_bse(text):
+    """解析北交所接口返回的 JSONP：callback([{"listInfo": {"content": [...]}}])（beijing.py 共用）"""
+    body = text.strip()
+    if not body.startswith(('[', '{')):
+        body = body[body.find('(') + 1:body.rfind(')')]
+    data = json.loads(body)
+    if isinstance(data, list):
+        data = data[0] if data else {}
+    reports = []
+    for item in (data.get('listInfo') or {}).get('content') or []:
+        path = item.get('destFilePath')
+        if not path:
+            continue
+        reports.append(make_report(item.get('companyName', ''), f"{BSE_STATIC_URL}{path}",
+                                   item.get('disclosureTitle', ''), item.get('publishDate'), item.get('companyCd')))
+    return reports
+
+
+def _request_reports(exchange_code, stock_code='', begin_date='', end_date='', page=1):
+    args = (stock_code, begin_date, end_date, page)
+    match exchange_code:
+        case 'SZ':
+            response = _session.post(SZSE_API_URL, json=_szse_payload(*args),
+                                     headers=SZSE_HEADERS, timeout=HTTP_TIMEOUT)
+            response.raise_for_status()
+            return _parse_szse(response.json())
+        case 'SH':
+            response = _session.get(SSE_API_URL, params=_sse_params(*args),
+                                    headers=SSE_HEADERS, timeout=HTTP_TIMEOUT)
+            response.raise_for_status()
+            return _parse_sse(response.json())
+        case 'BJ':
+            response = _session.post(BSE_API_URL, data=bse_form(*args),
+                                     headers=BSE_HEADERS, timeout=HTTP_TIMEOUT)
+            response.raise_for_status()
+            return parse_bse(response.text)
+        case _:
+            return []
+
+
+async def _request_reports_async(client, exchange_code, stock_code='', begin_date='', end_date='', page=1):
+    args = (stock_code, begin_date, end_date, page)
+    match exchange_code:
+        case 'SZ':
+            response = await client.post(SZSE_API_URL, json=_szse_payload(*args), headers=SZSE_HEADERS)
+            response.raise_for_status()
+            return _parse_szse(response.json())
+        case 'SH':
+            response = await client.get(SSE_API_URL, params=_sse_params(*args), headers=SSE_HEADERS)
+            response.raise_for_status()
+            return _parse_sse(response.json())
+        case 'BJ':
+            response = await client.post(BSE_API_URL, data=bse_form(*args), headers=BSE_HEADERS)
+            response.raise_for_status()
+            return parse_bse(response.text)
+        case _:
+            return []
+
+
+def report_date_range(fiscal_year):
+    """
+    财政年份对应的披露日期区间：季报、半年报在当年披露，年报及其更正在次年披露
+
+    Returns:
+        (begin_date, end_date)，fiscal_year 为 None 时不限日期（返回空字符串）
+    """
+    if fiscal_year is None:
+        return '', ''
+    fiscal_year = int(fiscal_year)
+    return f"{fiscal_year}-01-01", f"{fiscal_year + 1}-12-31"
+
+
+def fetch_reports(exchange_code, stock_code, fiscal_year=None, period_type=None):
+    """
+    通过交易所接口查询定期报告
+    指定财政年份时按披露日期区间查询并翻页直到没有结果，不受第一页条数的限制
+
+    Args:
+        exchange_code: 交易所代码（SH / SZ / BJ）
+        stock_code: 股票代码
+        fiscal_year: 财政年份，None 表示不限（只查询最新一页）
+        period_type: 报告期（1-4），None 表示不限
+
+    Returns:
+        list: 报告条目（见 reports.make_report），与年份、报告期一致的正式报告在前；
+              不支持的交易所或没有匹配时返回空列表
+    """
+    begin_date, end_date = report_date_range(fiscal_year)
+    max_pages = MAX_REPORT_PAGES if fiscal_year is not None else 1
+    reports = []
+    for page in range(1, max_pages + 1):
+        page_reports = _request_reports(exchange_code, stock_code, begin_date, end_date, page)
+        if not page_reports:
+            break
+        reports.extend(page_reports)
+    return select_report(reports, fiscal_year, period_type)
+
+
+async def fetch_reports_async(exchange_code, stock_code, fiscal_year=None, period_type=None):
+    """fetch_reports 的异步版本"""
+    begin_date, end_date = report_date_range(fiscal_year)
+    max_pages = MAX_REPORT_PAGES if fiscal_year is not None else 1
+    reports = []
+    async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
+        for page in range(1, max_pages + 1):
+            page_reports = await _request_reports_async(client, exchange_code, stock_code, begin_date, end_date, page)
+            if not page_reports:
+                break
+            reports.extend(page_reports)
+    return select_report(reports, fiscal_year, period_type)
+
+
+async def fetch_disclosures_async(exchange_code, begin_date, end_date, max_pages=20):
+    """
+    查询全市场在某个日期区间内披露的定期报告（披露监听使用）
+
+    接口按披露时间从新到旧返回。翻到 max_pages 页仍有数据时缩小查询区间继续：
+    - 已取到更早的日期：结束日期改为取到的最早日期（该日期可能只取到一部分，重新查询并按 URL 去重）
+    - 整页都是结束日期当天：单独查询该日并翻到底（最多 MAX_DAY_PAGES 页），结束日期改为前一天
+    直到取完整个区间，不会因为页数上限漏掉更早的披露
+
+    Args:
+        exchange_code: 交易所代码（SH / SZ / BJ）
+        begin_date: 开始日期 YYYY-MM-DD（含）
+        end_date: 结束日期 YYYY-MM-DD（含）
+        max_pages: 每个查询区间最多翻页数
+
+    Returns:
+        (reports, incomplete_date): 报告条目（含 stock_code，按 URL 去重）；
+        incomplete_date 为单日披露超过 MAX_DAY_PAGES 页、没有取完的最早日期，都取完时为 None
+    """
+    reports, seen_urls = [], set()
+
+    def collect(page_reports):
+        for report in page_reports:
+            if report['url'] not in seen_urls:
+                seen_urls.add(report['url'])
+                reports.append(report)
+
+    incomplete_date = None
+    window_end = end_date
+    async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
+        while window_end >= begin_date:
+            window_dates = []
+            for page in range(1, max_pages + 1):
+                page_reports = await _request_reports_async(client, exchange_code, '', begin_date, window_end, page)
+                if not page_reports:
+                    return reports, incomplete_date
+                window_dates.extend(report['publish_date'] or window_end for report in page_reports)
+                collect(page_reports)
+
+            oldest = min(window_dates)
+            if oldest < window_end:
+                window_end = oldest
+                continue
+            # 整个区间都是同一天，无法再缩小：单独查询该日并翻到底
+            for page in range(1, MAX_DAY_PAGES + 1):
+                page_reports = await _request_reports_async(client, exchange_code, '', window_end, window_end, page)
+                if not page_reports:
+                    break
+                collect(page_reports)
+            else:
+                incomplete_date = window_end
+            window_end = (date.fromisoformat(window_end) - timedelta(days=1)).isoformat()
+    return reports, incomplete_date
+
+
+if __name__ == "__main__":
+    print(fetch_reports('SZ', '000001', 2024, 4))
+    print(fetch_reports('SH', '600000', 2024, 4))
+    print(fetch_reports('BJ', '830799', 2024, 4))
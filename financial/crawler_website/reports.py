@@ -0,0 +1,118 @@
+"""
+定期报告条目
+各交易所爬虫返回统一结构的报告列表，并按财政年份和报告期挑选出要分析的那一份
+"""
+
+import re
+
+# 报告期类型（与 financial_reports.period_type 一致）
+PERIOD_TYPES = {
+    1: '第一季度报告',
+    2: '半年度报告',
+    3: '第三季度报告',
+    4: '年度报告',
+}
+
+_YEAR_RE = re.compile(r'(20\d{2})\s*年')
+# 顺序敏感：「半年度报告」包含「年度报告」，需要先判断
+_PERIOD_KEYWORDS = [
+    (1, ('第一季度', '一季度')),
+    (3, ('第三季度', '三季度')),
+    (2, ('半年度', '半年报', '中期报告')),
+    (4, ('年度报告', '年报')),
+]
+
+
+def parse_report_title(title: str):
+    """
+    从报告标题解析财政年份和报告期
+
+    Args:
+        title: 如「2024年第三季度报告」「平安银行：2023年年度报告摘要」
+
+    Returns:
+        (fiscal_year, period_type)，无法识别时对应项为 None
+    """
+    year_match = _YEAR_RE.search(title)
+    fiscal_year = int(year_match.group(1)) if year_match else None
+    period_type = None
+    for period, keywords in _PERIOD_KEYWORDS:
+        if any(keyword in title for keyword in keywords):
+            period_type = period
+            break
+    return fiscal_year, period_type
+
+
+# 更正或修订后重新披露的报告全文，如「2023年年度报告（更正后）」「2024年半年度报告（修订版）」
+_REVISED_RE = re.compile(r'更正后|修订版|修订稿|更新后')
+# 更正公告本身不是报告全文，如「关于2023年年度报告的更正公告」
+_CORRECTION_NOTICE_RE = re.compile(r'更正公告|关于.*更正')
+
+
+def is_revised_report(report: dict) -> bool:
+    """是否为更正或修订后的报告全文（取代同一报告期的原报告）"""
+    return bool(_REVISED_RE.search(report.get('title', '')))
+
+
+def is_full_report(report: dict) -> bool:
+    """排除摘要、英文版、更正公告、已被取代的更正前版本等非正式报告全文"""
+    title = report.get('title', '')
+    if any(word in title for word in ('摘要', '英文', 'English', '取消', '更正前')):
+        return False
+    return not _CORRECTION_NOTICE_RE.search(title)
+
+
+def make_report(company_name: str, url: str, title: str, publish_date: str = None, stock_code: str = None) -> dict:
+    """
+    构造一条报告条目
+
+    Returns:
+        dict: company_name、file_url（兼容旧字段）以及
+              report_type、fiscal_year、period_type、publish_date、title、url、stock_code
+    """
+    fiscal_year, period_type = parse_report_title(title)
+    return {
+        'company_name': company_name,
+        'stock_code': stock_code,
+        'file_url': url,
+        'report_type': PERIOD_TYPES.get(period_type),
+        'fiscal_year': fiscal_year,
+        'period_type': period_type,
+        'publish_date': (publish_date or '')[:10] or None,
+        'title': title,
+        'url': url,
+    }
+
+
+def annotate_reports(reports: list) -> list:
+    """为只有 company_name / file_url / title 的条目（浏览器爬取结果）补充结构化字段"""
+    return [
+        report if 'period_type' in report else {
+            **make_report(report['company_name'], report['file_url'], report.get('title', '')),
+            **report,
+        }
+        for report in reports
+    ]
+
+
+def select_report(reports: list, fiscal_year=None, period_type=None) -> list:
+    """
+    挑选与财政年份、报告期一致的报告
+
+    Args:
+        reports: 报告条目列表
+        fiscal_year: 财政年份，None 表示不限
+        period_type: 报告期（1-4），None 表示不限
+
+    Returns:
+        匹配的报告：正式报告全文在前，其中更正 / 修订后的版本排在原报告之前，
+        同类按发布日期从新到旧；没有匹配时返回空列表
+    """
+    matched = [
+        report for report in reports
+        if (fiscal_year is None or report.get('fiscal_year') == int(fiscal_year))
+        and (period_type is None or report.get('period_type') == int(period_type))
+    ]
+    matched.sort(key=lambda report: report.get('publish_date') or '', reverse=True)
+    matched.sort(key=lambda report: (not is_full_report(report), not is_revised_report(report)))
+    return matched
@@ -1,32 +1,60 @@
-from playwright.sync_api import sync_playwright
-from .shanghai import shanghai_browser
-from .beijing import beijing_browser
-from .shengzhen import shengzhen_browser
+import httpx
+import requests
+
+from browser.pool import get_browser_pool
+from .http_crawler import fetch_reports, fetch_reports_async
+from .reports import annotate_reports, select_report
+from .shanghai import shanghai_browser_async
+from .beijing import beijing_browser_async
+from .shengzhen import shengzhen_browser_async
+
+
+async def _crawl(context, exchange_code, stock_code, fiscal_year, period_type):
+    """在浏览器池提供的上下文中打开页面并执行对应交易所的爬虫，只返回与年份、报告期一致的报告"""
+    # 上下文已设置全局超时时间（所有操作默认 60 秒）
+    page = await context.new_page()
+
+    match exchange_code:
+        case 'SH':
+            reports = await shanghai_browser_async(page, stock_code)
+        case 'SZ':
+            reports = await shengzhen_browser_async(page, stock_code, fiscal_year, period_type)
+        case 'BJ':
+            reports = await beijing_browser_async(page, stock_code)
+        case _:
+            raise ValueError(f"不支持的交易所: {exchange_code}")
+    return select_report(annotate_reports(reports or []), fiscal_year, period_type)
+
 
 def run_browser(exchange_code, stock_code, fiscal_year, period_type):
-    res = []
-    with sync_playwright() as p:
-        # 启动浏览器
-        browser = p.chromium.launch(headless=False, timeout=400000)  # headless=False 表示可以看到浏览器界面
-        
-        # 创建新页面
-        page = browser.new_page()
-        
-        # 设置全局超时时间（毫秒）
-        page.set_default_timeout(60000)  # 所有操作默认 60 秒
-        page.set_default_navigation_timeout(60000)  # 导航操作默认 60 秒
-        
-        match exchange_code:
-            case 'SH':
-                res = shanghai_browser(page, stock_code)
-            case 'SZ':
-                res = shengzhen_browser(page, stock_code)
-            case 'BJ':
-                res = beijing_browser(page, stock_code)
-            case _:
-                raise ValueError(f"不支持的交易所: {exchange_code}")
-   
-    return res
+    """
+    爬取定期报告链接（同步接口）：优先请求交易所接口，接口失败或没有匹配的报告时使用共享的无头浏览器池
+
+    Returns:
+        list: 与 fiscal_year、period_type 一致的报告条目（见 reports.make_report），没有匹配时为空列表
+    """
+    try:
+        reports = fetch_reports(exchange_code, stock_code, fiscal_year, period_type)
+        if reports:
+            return reports
+        print("接口未查到匹配的报告，改用浏览器爬取")
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"接口查询失败，改用浏览器爬取: {e}")
+    return get_browser_pool().run_sync(
+        lambda context: _crawl(context, exchange_code, stock_code, fiscal_year, period_type))
+
+
+async def async_run_browser(exchange_code, stock_code, fiscal_year, period_type):
+    """run_browser 的异步版本，不占用线程池线程"""
+    try:
+        reports = await fetch_reports_async(exchange_code, stock_code, fiscal_year, period_type)
+        if reports:
+            return reports
+        print("接口未查到匹配的报告，改用浏览器爬取")
+    except (httpx.HTTPError, ValueError) as e:
+        print(f"接口查询失败，改用浏览器爬取: {e}")
+    return await get_browser_pool().run(
+        lambda context: _crawl(context, exchange_code, stock_code, fiscal_year, period_type))
 
 if __name__ == "__main__":
-    run_browser('')
\ No newline at end of file
+    run_browser('')
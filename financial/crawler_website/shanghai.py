@@ -50,7 +50,8 @@ def shanghai_browser(page,searchWord):
                 href = link.get_attribute('href')
                 res.append({
                     'company_name': f"{searchWord}{text}",
-                    'file_url': f"https://static.sse.com.cn{href}"
+                    'file_url': f"https://static.sse.com.cn{href}",
+                    'title': text
                 })
                 print(f"链接 {i + 1}: {text}")
                 print(f"链接地址: {href}\n")
@@ -58,4 +59,58 @@ def shanghai_browser(page,searchWord):
 
     except Exception as e:
         print(f"发生错误: {e}")
-        return []
\ No newline at end of file
+        return []
+
+
+async def shanghai_browser_async(page, searchWord):
+    """shanghai_browser 的异步版本（page 为 playwright.async_api 的 Page）"""
+    try:
+        response = await page.goto('https://www.sse.com.cn/disclosure/listedinfo/regular/')
+        res = []
+        if response is not None:
+            print(f"页面加载状态码: {response.status}")
+
+        # 等待页面加载
+        await page.wait_for_load_state('networkidle')
+        await page.wait_for_timeout(2000)  # 等待2秒，确保页面完全加载
+        loading_locator = page.locator(".loading")
+        try:
+            await loading_locator.wait_for(state="hidden", timeout=10000)
+        except Exception:
+            # 作为后备，使用全局 JS 表达式检测样式隐藏
+            await page.wait_for_function("() => document.querySelector('.loading')?.getAttribute('style') === 'display: none;'")
+
+        search_input = await page.wait_for_selector(".sse_searchInput > input")
+        if search_input:
+            # 清空并输入内容
+            await search_input.fill('')
+            await search_input.fill(searchWord)
+
+            search_button = page.locator('span.search_btn.bi-search')
+            await search_button.click()
+            print("点击搜索按钮成功")
+
+            # 等待搜索结果加载
+            await page.wait_for_load_state('networkidle')
+            await page.wait_for_timeout(2000)
+            _ = await page.wait_for_selector(".table-responsive")
+
+            all_links_locator = page.locator(".table-responsive a.table_titlewrap")
+            all_links_count = await all_links_locator.count()
+
+            for i in range(all_links_count):
+                link = all_links_locator.nth(i)
+                text = await link.inner_text()
+                href = await link.get_attribute('href')
+                res.append({
+                    'company_name': f"{searchWord}{text}",
+                    'file_url': f"https://static.sse.com.cn{href}",
+                    'title': text
+                })
+                print(f"链接 {i + 1}: {text}")
+                print(f"链接地址: {href}\n")
+            return res
+
+    except Exception as e:
+        print(f"发生错误: {e}")
+        return []
@@ -7,6 +7,8 @@ from urllib.parse import urljoin
 
 from playwright.sync_api import sync_playwright
 
+from .reports import make_report, select_report
+
 # 深交所基础 URL
 BASE_URL = "https://www.szse.cn"
 
@@ -57,7 +59,9 @@ def shengzhen_browser(page, searchWord):
     print(f"获取到的公司名称: {company_name}")
     
     # 7. 获取第一行的下载链接
-    title_span = page.locator(".disclosure-tbody .annon-title-link").first.get_attribute("href")
+    title_link = page.locator(".disclosure-tbody .annon-title-link").first
+    title = title_link.inner_text().strip()
+    title_span = title_link.get_attribute("href")
     print(f"获取到的链接: {title_span}")
     page.goto("https://www.szse.cn" + title_span)
     
@@ -69,7 +73,8 @@ def shengzhen_browser(page, searchWord):
     res = []
     res.append({
         'company_name': company_name,
-        'file_url': pdf_url.replace('/download', '')
+        'file_url': pdf_url.replace('/download', ''),
+        'title': title
     })
     print(f"获取到的链接: {res}")
     return res
@@ -79,6 +84,59 @@ def shengzhen_browser(page, searchWord):
     # return download_link.get_attribute("href")
 
 
+async def shengzhen_browser_async(page, searchWord, fiscal_year=None, period_type=None):
+    """
+    shengzhen_browser 的异步版本
+    列出结果表格中的所有报告，按财政年份和报告期筛选后只打开匹配报告的详情页获取 PDF 链接
+    
+    Args:
+        page: Playwright 的 Page 对象（async_api）
+        searchWord: 搜索关键字（股票代码/简称/拼音/标题关键字）
+        fiscal_year: 财政年份，None 表示不限
+        period_type: 报告期（1-4），None 表示不限
+
+    Returns:
+        list: [{company_name, file_url, title}]，匹配的正式报告在前
+    """
+    await page.goto("https://www.szse.cn/disclosure/listed/fixed/index.html")
+    await page.wait_for_load_state("networkidle")
+
+    # 在搜索框中输入搜索关键字
+    await page.locator("#input_code").fill(searchWord)
+
+    await page.locator(".c-loading-overlay").wait_for(state="detached", timeout=6000)
+    await page.locator("#query-btn").click()
+    print("点击查询按钮成功")
+
+    # 等待表格数据加载
+    await page.locator(".c-loading-overlay").wait_for(state="detached", timeout=6000)
+
+    company_link = page.locator(".disclosure-tbody .title-name a").first
+    company_name = await company_link.get_attribute("title")
+    print(f"获取到的公司名称: {company_name}")
+
+    # 列出所有行（标题 + 详情页链接）
+    title_links = page.locator(".disclosure-tbody .annon-title-link")
+    rows = []
+    for i in range(await title_links.count()):
+        title_link = title_links.nth(i)
+        title = (await title_link.inner_text()).strip()
+        rows.append(make_report(company_name, await title_link.get_attribute("href"), title))
+
+    res = []
+    for row in select_report(rows, fiscal_year, period_type):
+        print(f"获取到的链接: {row['url']}")
+        await page.goto(BASE_URL + row['url'])
+        await page.wait_for_load_state("networkidle")
+        pdf_url = await page.locator("#annouceDownloadBtn").get_attribute("href")
+        res.append({
+            'company_name': company_name,
+            'file_url': pdf_url.replace('/download', ''),
+            'title': row['title']
+        })
+    print(f"获取到的链接: {res}")
+    return res
+
 
 def main():
     with sync_playwright() as p:
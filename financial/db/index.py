@@ -1,6 +1,5 @@
 import os
 from dotenv import load_dotenv
-from supabase import create_client, Client
 
 # 加载 .env 文件中的环境变量
 _ = load_dotenv()
@@ -9,8 +8,35 @@ _ = load_dotenv()
 url: str | None = os.environ.get("SUPABASE_URL")
 key: str | None = os.environ.get("SUPABASE_KEY") # 使用 service_role key 可以绕过 RLS 权限
 
-# 2. 初始化客户端
-if not url or not key:
-    raise ValueError("SUPABASE_URL 和 SUPABASE_KEY 环境变量未设置")
-supabase: Client = create_client(url, key)
+# 2. 客户端在首次使用时创建：使用本地 SQLite 存储时不需要 Supabase 配置和依赖
+_supabase = None
+_async_supabase = None
 
+
+def supabase_configured() -> bool:
+    return bool(url and key)
+
+
+def _check_config() -> None:
+    if not supabase_configured():
+        raise ValueError("SUPABASE_URL 和 SUPABASE_KEY 环境变量未设置")
+
+
+def get_supabase():
+    """获取共享的同步 Supabase 客户端"""
+    global _supabase
+    if _supabase is None:
+        _check_config()
+        from supabase import create_client
+        _supabase = create_client(url, key)
+    return _supabase
+
+
+async def get_async_supabase():
+    """获取共享的异步 Supabase 客户端"""
+    global _async_supabase
+    if _async_supabase is None:
+        _check_config()
+        from supabase import acreate_client
+        _async_supabase = await acreate_client(url, key)
+    return _async_supabase
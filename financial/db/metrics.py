@@ -0,0 +1,66 @@
+"""
+财务指标时间序列
+每次解析财报后把关键指标写入 financial_metrics，
+查询公司历史走势时直接读库，不需要重新下载和解析各期 PDF
+"""
+
+import logging
+
+from .repository import get_repository
+
+
+def _metric_rows(exchange_code, stock_code, fiscal_year, period_type, company_name, records) -> list:
+    return [
+        {
+            "exchange_code": exchange_code,
+            "stock_code": str(stock_code),
+            "fiscal_year": int(fiscal_year),
+            "period_type": int(period_type),
+            "company_name": company_name,
+            "metric": record["metric"],
+            "value": record["value"],
+            "source_page": record.get("source_page"),
+            "source": record.get("source"),
+        }
+        for record in records
+    ]
+
+
+async def save_metrics_async(exchange_code: str, stock_code: str, fiscal_year: int, period_type: int,
+                             company_name: str, records: list):
+    """
+    保存一份报表的财务指标（同一报表的同一指标覆盖写入）
+
+    Args:
+        records: ai.index.collect_metric_records 的结果
+    """
+    rows = _metric_rows(exchange_code, stock_code, fiscal_year, period_type, company_name, records)
+    saved = await get_repository().aupsert_metrics(rows)
+    logging.info(f"财务指标保存成功: {exchange_code}-{stock_code} {fiscal_year}/{period_type}，{len(rows)} 项")
+    return saved
+
+
+def _group_history(rows) -> dict:
+    history = {}
+    for row in rows:
+        history.setdefault(row["metric"], []).append({
+            "fiscal_year": row["fiscal_year"],
+            "period_type": row["period_type"],
+            "value": row["value"],
+            "source_page": row.get("source_page"),
+            "source": row.get("source"),
+        })
+    return history
+
+
+async def get_metric_history_async(exchange_code: str, stock_code: str, metrics: list = None) -> dict:
+    """
+    查询公司的财务指标历史
+
+    Args:
+        metrics: 只返回这些指标，None 表示全部
+
+    Returns:
+        dict: 指标键 -> [{fiscal_year, period_type, value, source_page, source}]，按报告期升序
+    """
+    return _group_history(await get_repository().afind_metrics(exchange_code, stock_code, metrics))
@@ -0,0 +1,58 @@
+"""
+批量预取的处理进度
+进度单独存放在 financial_report_progress，爬取失败、未找到报告等报表尚未入库的情况也能记录；
+每条进度记录处理时的 file_url，报告更正（file_url 变化）后旧进度不再有效
+"""
+
+import logging
+
+from .report_cache import report_key
+from .repository import get_repository
+
+# 批量查询时每次请求的最大键数（避免 URL 过长）
+BATCH_SIZE = 100
+
+
+async def record_progress_async(exchange_code: str, stock_code: str, fiscal_year: int, period_type: int,
+                                status: str, file_url: str = None, error: str = None):
+    """
+    写入一份报表的处理进度（覆盖之前的进度）
+
+    Args:
+        status: 'crawled' | 'downloaded' | 'indexed' | 'failed'
+        file_url: 处理的报告文件 URL，报告尚未找到时为 None
+        error: 失败原因
+    """
+    row = {
+        "exchange_code": exchange_code,
+        "stock_code": str(stock_code),
+        "fiscal_year": int(fiscal_year),
+        "period_type": int(period_type),
+        "file_url": file_url,
+        "status": status,
+        "error": error,
+    }
+    return await get_repository().aupsert_progress([row])
+
+
+async def find_progress_many_async(keys) -> dict:
+    """
+    批量查询处理进度
+
+    Args:
+        keys: [(exchange_code, stock_code, fiscal_year, period_type)]
+
+    Returns:
+        dict: 规范化的键 -> 进度行，没有进度的键不在结果中
+    """
+    keys = list(dict.fromkeys(report_key(*key) for key in keys))
+    progress = {}
+    for i in range(0, len(keys), BATCH_SIZE):
+        batch = set(keys[i:i + BATCH_SIZE])
+        for row in await get_repository().afind_progress_many(list(batch)):
+            key = report_key(row['exchange_code'], row['stock_code'], row['fiscal_year'], row['period_type'])
+            # 各列分别过滤时结果可能多于请求的键
+            if key in batch:
+                progress[key] = row
+    logging.info(f"查询到处理进度: {len(progress)} 条")
+    return progress
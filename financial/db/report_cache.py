@@ -0,0 +1,60 @@
+"""
+financial_reports 查询的进程内缓存
+以 (exchange_code, stock_code, fiscal_year, period_type) 为键缓存查询结果，
+查到数据的结果缓存 REPORT_CACHE_TTL 秒，查不到的结果（负缓存）缓存 NEGATIVE_CACHE_TTL 秒，
+写入数据库时同步更新缓存
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# 命中结果的缓存时间（秒）
+REPORT_CACHE_TTL = float(os.environ.get("REPORT_CACHE_TTL", "300"))
+# 未命中结果的缓存时间（秒），较短以便新入库的报告尽快可见
+NEGATIVE_CACHE_TTL = float(os.environ.get("REPORT_NEGATIVE_CACHE_TTL", "30"))
+# 最多缓存的键数量
+MAX_CACHE_ENTRIES = int(os.environ.get("REPORT_CACHE_SIZE", "4096"))
+
+MISSING = object()
+_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def report_key(exchange_code, stock_code, fiscal_year, period_type) -> tuple:
+    return (exchange_code, str(stock_code), int(fiscal_year), int(period_type))
+
+
+def get_cached(key: tuple):
+    """返回缓存的查询结果（可能是 None 表示负缓存）；未缓存或已过期时返回 MISSING"""
+    with _lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return MISSING
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del _cache[key]
+            return MISSING
+        _cache.move_to_end(key)
+        return value
+
+
+def set_cached(key: tuple, value) -> None:
+    """缓存查询结果，value 为 None 时按负缓存的 TTL 保存"""
+    ttl = REPORT_CACHE_TTL if value else NEGATIVE_CACHE_TTL
+    with _lock:
+        _cache[key] = (time.monotonic() + ttl, value)
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_CACHE_ENTRIES:
+            _cache.popitem(last=False)
+
+
+def invalidate(key: tuple) -> None:
+    with _lock:
+        _cache.pop(key, None)
+
+
+def clear() -> None:
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,119 @@
+"""
+financial_reports 存储接口
+search_SQL / save_company_info 通过 ReportRepository 访问数据，
+可以使用 Supabase（多节点共享）或本地 SQLite（单节点部署、测试，无外部依赖）
+
+后端由 FINANCIAL_DB_BACKEND 选择（supabase / sqlite），
+未设置时配置了 SUPABASE_URL 和 SUPABASE_KEY 则使用 Supabase，否则使用 SQLite
+"""
+
+import asyncio
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+from .index import supabase_configured
+
+TABLE_NAME = "financial_reports"
+# 报表的唯一键
+KEY_COLUMNS = ("exchange_code", "stock_code", "fiscal_year", "period_type")
+
+# 财务指标时间序列，每个报表的每个指标一行
+METRICS_TABLE_NAME = "financial_metrics"
+METRIC_KEY_COLUMNS = KEY_COLUMNS + ("metric",)
+
+# 批量预取的处理进度，每个报表一行；报表尚未入库（如爬取失败）时也能记录失败原因
+PROGRESS_TABLE_NAME = "financial_report_progress"
+
+
+class ReportRepository(ABC):
+    """
+    financial_reports、financial_metrics 及 financial_report_progress 的读写接口，报表的键为 (exchange_code, stock_code, fiscal_year, period_type)
+
+    异步方法默认在线程池中调用同步实现（本地存储的阻塞 IO 不占用事件循环），网络存储应覆盖为真正的异步实现
+    """
+
+    @abstractmethod
+    def find(self, key: tuple) -> List[dict]:
+        """查询一个键对应的行"""
+
+    @abstractmethod
+    def find_many(self, keys: List[tuple]) -> List[dict]:
+        """查询多个键对应的全部行"""
+
+    @abstractmethod
+    def insert(self, row: dict) -> List[dict]:
+        """插入一行，返回写入的行"""
+
+    @abstractmethod
+    def upsert(self, rows: List[dict]) -> List[dict]:
+        """按唯一键批量插入或更新，返回写入的行"""
+
+    @abstractmethod
+    def upsert_progress(self, rows: List[dict]) -> List[dict]:
+        """按报表键批量写入处理进度"""
+
+    @abstractmethod
+    def find_progress_many(self, keys: List[tuple]) -> List[dict]:
+        """查询多个报表键的处理进度"""
+
+    @abstractmethod
+    def upsert_metrics(self, rows: List[dict]) -> List[dict]:
+        """按 (报表键, metric) 批量写入财务指标"""
+
+    @abstractmethod
+    def find_metrics(self, exchange_code: str, stock_code: str, metrics: Optional[List[str]] = None) -> List[dict]:
+        """查询公司的财务指标，按 fiscal_year、period_type 升序"""
+
+    async def afind(self, key: tuple) -> List[dict]:
+        return await asyncio.to_thread(self.find, key)
+
+    async def afind_many(self, keys: List[tuple]) -> List[dict]:
+        return await asyncio.to_thread(self.find_many, keys)
+
+    async def ainsert(self, row: dict) -> List[dict]:
+        return await asyncio.to_thread(self.insert, row)
+
+    async def aupsert(self, rows: List[dict]) -> List[dict]:
+        return await asyncio.to_thread(self.upsert, rows)
+
+    async def aupsert_progress(self, rows: List[dict]) -> List[dict]:
+        return await asyncio.to_thread(self.upsert_progress, rows)
+
+    async def afind_progress_many(self, keys: List[tuple]) -> List[dict]:
+        return await asyncio.to_thread(self.find_progress_many, keys)
+
+    async def aupsert_metrics(self, rows: List[dict]) -> List[dict]:
+        return await asyncio.to_thread(self.upsert_metrics, rows)
+
+    async def afind_metrics(self, exchange_code: str, stock_code: str,
+                            metrics: Optional[List[str]] = None) -> List[dict]:
+        return await asyncio.to_thread(self.find_metrics, exchange_code, stock_code, metrics)
+
+
+_repository: Optional[ReportRepository] = None
+_repository_lock = threading.Lock()
+
+
+def _create_repository() -> ReportRepository:
+    backend = os.environ.get("FINANCIAL_DB_BACKEND") or ("supabase" if supabase_configured() else "sqlite")
+    match backend:
+        case "supabase":
+            from .supabase_repository import SupabaseReportRepository
+            return SupabaseReportRepository()
+        case "sqlite":
+            from .sqlite_repository import SQLiteReportRepository
+            return SQLiteReportRepository()
+        case _:
+            raise ValueError(f"不支持的存储后端: {backend}")
+
+
+def get_repository() -> ReportRepository:
+    """获取进程内共享的存储实例（首次调用时按配置创建）"""
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                _repository = _create_repository()
+    return _repository
@@ -1,5 +1,6 @@
 from datetime import datetime
-from .index import supabase
+from .report_cache import report_key, set_cached
+from .repository import get_repository
 import logging
 
 def save_company_info(url: str, exchange_code: str, stock_code: str, fiscal_year: int, period_type: int, company_name: str):
@@ -14,18 +15,58 @@ def save_company_info(url: str, exchange_code: str, stock_code: str, fiscal_year
         period_type: 报表期间类型 (1-4 表示四个季度)
     """
     try:
-        data = {
-            "file_url": url,
-            "exchange_code": exchange_code,
-            "stock_code": stock_code,
-            "fiscal_year": fiscal_year,
-            "period_type": period_type,
-            "company_name": company_name
-        }
-        
-        response = supabase.table("financial_reports").insert(data).execute()
-        logging.info(f"公司信息保存成功: {response.data}")
-        return response.data
+        data = _report_row(url, exchange_code, stock_code, fiscal_year, period_type, company_name)
+        # 按唯一键写入：其他请求、监听或批量任务可能已先写入同一报告期
+        rows = get_repository().upsert([data])
+        logging.info(f"公司信息保存成功: {rows}")
+        _cache_rows(rows)
+        return rows
     except Exception as e:
         logging.error(f"保存公司信息失败: {str(e)}", exc_info=True)
-        raise
\ No newline at end of file
+        raise
+
+
+async def save_company_info_async(url: str, exchange_code: str, stock_code: str, fiscal_year: int, period_type: int, company_name: str):
+    """save_company_info 的异步版本"""
+    try:
+        data = _report_row(url, exchange_code, stock_code, fiscal_year, period_type, company_name)
+        rows = await get_repository().aupsert([data])
+        logging.info(f"公司信息保存成功: {rows}")
+        _cache_rows(rows)
+        return rows
+    except Exception as e:
+        logging.error(f"保存公司信息失败: {str(e)}", exc_info=True)
+        raise
+
+
+async def upsert_company_infos_async(rows: list):
+    """
+    批量写入报表信息（批量任务、披露监听使用），已存在的 (交易所, 股票, 年份, 报告期) 更新为新数据
+
+    Args:
+        rows: _report_row 构造的行列表
+    """
+    if not rows:
+        return []
+    saved = await get_repository().aupsert(rows)
+    logging.info(f"批量保存公司信息成功: {len(saved)} 条")
+    _cache_rows(saved)
+    return saved
+
+
+def _cache_rows(data) -> None:
+    """写入成功后更新查询缓存，覆盖之前的负缓存"""
+    for row in data or []:
+        set_cached(report_key(row['exchange_code'], row['stock_code'], row['fiscal_year'], row['period_type']), [row])
+
+
+def _report_row(url, exchange_code, stock_code, fiscal_year, period_type, company_name) -> dict:
+    """构造 financial_reports 表的一行数据"""
+    return {
+        "file_url": url,
+        "exchange_code": exchange_code,
+        "stock_code": stock_code,
+        "fiscal_year": fiscal_year,
+        "period_type": period_type,
+        "company_name": company_name
+    }
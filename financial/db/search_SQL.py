@@ -1,11 +1,83 @@
-from .index import supabase
-def search_SQL(exchange_code, stock_code, fiscal_year, period_type):
-    query = supabase.table('financial_reports').select('*').eq('exchange_code', exchange_code).eq('stock_code', stock_code).eq('fiscal_year', fiscal_year).eq('period_type', period_type)
-    response = query.execute()
-    # 判断 response.data 是否为数组，为数组则返回第一个元素，否则返回 None
-    if isinstance(response.data, list) and len(response.data) > 0:
-        return response.data
+from monitoring.metrics import record_cache
+
+from .report_cache import MISSING, get_cached, report_key, set_cached
+from .repository import get_repository
+
+# 批量查询时每次请求的最大键数（避免 URL 过长）
+BATCH_SIZE = 100
+
+
+def _rows_or_none(data):
+    # 判断 data 是否为非空数组，否则返回 None
+    if isinstance(data, list) and len(data) > 0:
+        return data
     return None
 
+
+def search_SQL(exchange_code, stock_code, fiscal_year, period_type):
+    key = report_key(exchange_code, stock_code, fiscal_year, period_type)
+    cached = get_cached(key)
+    record_cache("report_query", cached is not MISSING)
+    if cached is not MISSING:
+        return cached
+
+    rows = _rows_or_none(get_repository().find(key))
+    set_cached(key, rows)
+    return rows
+
+
+async def search_SQL_async(exchange_code, stock_code, fiscal_year, period_type):
+    """search_SQL 的异步版本"""
+    key = report_key(exchange_code, stock_code, fiscal_year, period_type)
+    cached = get_cached(key)
+    record_cache("report_query", cached is not MISSING)
+    if cached is not MISSING:
+        return cached
+
+    rows = _rows_or_none(await get_repository().afind(key))
+    set_cached(key, rows)
+    return rows
+
+
+def _split_misses(keys):
+    """返回 (已缓存的结果, 需要查询的键)"""
+    results, misses = {}, []
+    for key in dict.fromkeys(keys):
+        cached = get_cached(key)
+        if cached is MISSING:
+            misses.append(key)
+        else:
+            results[key] = cached
+    return results, misses
+
+
+def _store_batch(results, batch, data):
+    """按完整的键匹配查询结果并写入缓存"""
+    grouped = {}
+    for row in data or []:
+        row_key = report_key(row['exchange_code'], row['stock_code'], row['fiscal_year'], row['period_type'])
+        grouped.setdefault(row_key, []).append(row)
+    for key in batch:
+        rows = grouped.get(key)
+        set_cached(key, rows)
+        results[key] = rows
+
+
+async def search_SQL_many_async(keys):
+    """
+    批量查询报表（批量任务、披露监听使用）
+
+    Args:
+        keys: [(exchange_code, stock_code, fiscal_year, period_type)]
+
+    Returns:
+        dict: 规范化的键 -> 查询结果（同 search_SQL，未找到为 None）
+    """
+    results, misses = _split_misses([report_key(*key) for key in keys])
+    for i in range(0, len(misses), BATCH_SIZE):
+        batch = misses[i:i + BATCH_SIZE]
+        _store_batch(results, batch, await get_repository().afind_many(batch))
+    return results
+
 # if __name__ == "__main__":
-    # search_SQL('SH', '600000', 2023, 1)
\ No newline at end of file
+    # search_SQL('SH', '600000', 2023, 1)
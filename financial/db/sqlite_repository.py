@@ -0,0 +1,171 @@
+"""
+本地 SQLite 存储实现
+(exchange_code, stock_code, fiscal_year, period_type) 上建有唯一索引，查询走索引，
+每个线程使用独立连接，WAL 模式下读写互不阻塞
+"""
+
+import os
+import sqlite3
+import threading
+from typing import List
+
+from .repository import (
+    KEY_COLUMNS,
+    METRIC_KEY_COLUMNS,
+    METRICS_TABLE_NAME,
+    PROGRESS_TABLE_NAME,
+    TABLE_NAME,
+    ReportRepository,
+)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SQLITE_PATH = os.environ.get("FINANCIAL_SQLITE_PATH", os.path.join(SCRIPT_DIR, 'financial.db'))
+
+# 可写入的列（与 Supabase 的 financial_reports 表一致）
+COLUMNS = ("file_url", "exchange_code", "stock_code", "fiscal_year", "period_type", "company_name")
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file_url TEXT NOT NULL,
+    exchange_code TEXT NOT NULL,
+    stock_code TEXT NOT NULL,
+    fiscal_year INTEGER NOT NULL,
+    period_type INTEGER NOT NULL,
+    company_name TEXT,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_{TABLE_NAME}_key ON {TABLE_NAME} ({", ".join(KEY_COLUMNS)});
+
+CREATE TABLE IF NOT EXISTS {METRICS_TABLE_NAME} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    exchange_code TEXT NOT NULL,
+    stock_code TEXT NOT NULL,
+    fiscal_year INTEGER NOT NULL,
+    period_type INTEGER NOT NULL,
+    company_name TEXT,
+    metric TEXT NOT NULL,
+    value REAL,
+    source_page INTEGER,
+    source TEXT,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_{METRICS_TABLE_NAME}_key ON {METRICS_TABLE_NAME} ({", ".join(METRIC_KEY_COLUMNS)});
+
+CREATE TABLE IF NOT EXISTS {PROGRESS_TABLE_NAME} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    exchange_code TEXT NOT NULL,
+    stock_code TEXT NOT NULL,
+    fiscal_year INTEGER NOT NULL,
+    period_type INTEGER NOT NULL,
+    file_url TEXT,
+    status TEXT NOT NULL,
+    error TEXT,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_{PROGRESS_TABLE_NAME}_key ON {PROGRESS_TABLE_NAME} ({", ".join(KEY_COLUMNS)});
+"""
+
+# financial_metrics 可写入的列
+METRIC_COLUMNS = METRIC_KEY_COLUMNS + ("company_name", "value", "source_page", "source")
+# financial_report_progress 可写入的列
+PROGRESS_COLUMNS = KEY_COLUMNS + ("file_url", "status", "error")
+
+
+class SQLiteReportRepository(ReportRepository):
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _select(self, keys: List[tuple], table: str = TABLE_NAME) -> List[dict]:
+        if not keys:
+            return []
+        values = ", ".join(["(?, ?, ?, ?)"] * len(keys))
+        sql = f"SELECT * FROM {table} WHERE ({', '.join(KEY_COLUMNS)}) IN (VALUES {values})"
+        params = [value for key in keys for value in key]
+        return [dict(row) for row in self._connect().execute(sql, params)]
+
+    def find(self, key):
+        return self._select([key])
+
+    def find_many(self, keys):
+        return self._select(keys)
+
+    def insert(self, row):
+        columns = [column for column in COLUMNS if column in row]
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT INTO {TABLE_NAME} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [row[column] for column in columns],
+            )
+        return self.find(tuple(row[column] for column in KEY_COLUMNS))
+
+    def upsert(self, rows):
+        if not rows:
+            return []
+        with self._connect() as conn:
+            for row in rows:
+                columns = [column for column in COLUMNS if column in row]
+                updates = [f"{column} = excluded.{column}" for column in columns if column not in KEY_COLUMNS]
+                conn.execute(
+                    f"INSERT INTO {TABLE_NAME} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                    f"ON CONFLICT ({', '.join(KEY_COLUMNS)}) DO UPDATE SET " + ", ".join(updates),
+                    [row[column] for column in columns],
+                )
+        return self.find_many([tuple(row[column] for column in KEY_COLUMNS) for row in rows])
+
+    def upsert_metrics(self, rows):
+        if not rows:
+            return []
+        updates = [column for column in METRIC_COLUMNS if column not in METRIC_KEY_COLUMNS]
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT INTO {METRICS_TABLE_NAME} ({', '.join(METRIC_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(METRIC_COLUMNS))}) "
+                f"ON CONFLICT ({', '.join(METRIC_KEY_COLUMNS)}) DO UPDATE SET "
+                + ", ".join(f"{column} = excluded.{column}" for column in updates)
+                + ", updated_at = CURRENT_TIMESTAMP",
+                [[row.get(column) for column in METRIC_COLUMNS] for row in rows],
+            )
+        return rows
+
+    def upsert_progress(self, rows):
+        if not rows:
+            return []
+        updates = [column for column in PROGRESS_COLUMNS if column not in KEY_COLUMNS]
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT INTO {PROGRESS_TABLE_NAME} ({', '.join(PROGRESS_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(PROGRESS_COLUMNS))}) "
+                f"ON CONFLICT ({', '.join(KEY_COLUMNS)}) DO UPDATE SET "
+                + ", ".join(f"{column} = excluded.{column}" for column in updates)
+                + ", updated_at = CURRENT_TIMESTAMP",
+                [[row.get(column) for column in PROGRESS_COLUMNS] for row in rows],
+            )
+        return rows
+
+    def find_progress_many(self, keys):
+        return self._select(keys, PROGRESS_TABLE_NAME)
+
+    def find_metrics(self, exchange_code, stock_code, metrics=None):
+        sql = f"SELECT * FROM {METRICS_TABLE_NAME} WHERE exchange_code = ? AND stock_code = ?"
+        params = [exchange_code, stock_code]
+        if metrics:
+            sql += f" AND metric IN ({', '.join('?' * len(metrics))})"
+            params += list(metrics)
+        sql += " ORDER BY fiscal_year, period_type, metric"
+        return [dict(row) for row in self._connect().execute(sql, params)]
@@ -0,0 +1,111 @@
+"""Supabase 存储实现"""
+
+from typing import List
+
+from .index import get_async_supabase, get_supabase
+from .repository import (
+    KEY_COLUMNS,
+    METRIC_KEY_COLUMNS,
+    METRICS_TABLE_NAME,
+    PROGRESS_TABLE_NAME,
+    TABLE_NAME,
+    ReportRepository,
+)
+
+# 批量写入的冲突键（需要 financial_reports / financial_report_progress / financial_metrics 上对应的唯一约束）
+CONFLICT_COLUMNS = ",".join(KEY_COLUMNS)
+METRIC_CONFLICT_COLUMNS = ",".join(METRIC_KEY_COLUMNS)
+
+
+def _filter_key(query, key: tuple):
+    for column, value in zip(KEY_COLUMNS, key):
+        query = query.eq(column, value)
+    return query
+
+
+def _filter_keys(query, keys: List[tuple]):
+    """各列用 in 过滤（结果可能多于请求的键，由调用方按完整的键匹配）"""
+    for i, column in enumerate(KEY_COLUMNS):
+        query = query.in_(column, sorted({k[i] for k in keys}))
+    return query
+
+
+def _metrics_query(client, exchange_code, stock_code, metrics):
+    query = client.table(METRICS_TABLE_NAME).select('*').eq('exchange_code', exchange_code).eq('stock_code', stock_code)
+    if metrics:
+        query = query.in_('metric', metrics)
+    return query.order('fiscal_year').order('period_type')
+
+
+class SupabaseReportRepository(ReportRepository):
+
+    def find(self, key):
+        return _filter_key(get_supabase().table(TABLE_NAME).select('*'), key).execute().data or []
+
+    def find_many(self, keys):
+        return _filter_keys(get_supabase().table(TABLE_NAME).select('*'), keys).execute().data or []
+
+    def insert(self, row):
+        return get_supabase().table(TABLE_NAME).insert(row).execute().data or []
+
+    def upsert(self, rows):
+        if not rows:
+            return []
+        return get_supabase().table(TABLE_NAME).upsert(rows, on_conflict=CONFLICT_COLUMNS).execute().data or []
+
+    def upsert_progress(self, rows):
+        if not rows:
+            return []
+        return get_supabase().table(PROGRESS_TABLE_NAME).upsert(rows, on_conflict=CONFLICT_COLUMNS).execute().data or []
+
+    def find_progress_many(self, keys):
+        return _filter_keys(get_supabase().table(PROGRESS_TABLE_NAME).select('*'), keys).execute().data or []
+
+    def upsert_metrics(self, rows):
+        if not rows:
+            return []
+        return get_supabase().table(METRICS_TABLE_NAME).upsert(rows, on_conflict=METRIC_CONFLICT_COLUMNS) \
+            .execute().data or []
+
+    def find_metrics(self, exchange_code, stock_code, metrics=None):
+        return _metrics_query(get_supabase(), exchange_code, stock_code, metrics).execute().data or []
+
+    async def afind(self, key):
+        client = await get_async_supabase()
+        return (await _filter_key(client.table(TABLE_NAME).select('*'), key).execute()).data or []
+
+    async def afind_many(self, keys):
+        client = await get_async_supabase()
+        return (await _filter_keys(client.table(TABLE_NAME).select('*'), keys).execute()).data or []
+
+    async def ainsert(self, row):
+        client = await get_async_supabase()
+        return (await client.table(TABLE_NAME).insert(row).execute()).data or []
+
+    async def aupsert(self, rows):
+        if not rows:
+            return []
+        client = await get_async_supabase()
+        return (await client.table(TABLE_NAME).upsert(rows, on_conflict=CONFLICT_COLUMNS).execute()).data or []
+
+    async def aupsert_progress(self, rows):
+        if not rows:
+            return []
+        client = await get_async_supabase()
+        return (await client.table(PROGRESS_TABLE_NAME).upsert(rows, on_conflict=CONFLICT_COLUMNS)
+                .execute()).data or []
+
+    async def afind_progress_many(self, keys):
+        client = await get_async_supabase()
+        return (await _filter_keys(client.table(PROGRESS_TABLE_NAME).select('*'), keys).execute()).data or []
+
+    async def aupsert_metrics(self, rows):
+        if not rows:
+            return []
+        client = await get_async_supabase()
+        return (await client.table(METRICS_TABLE_NAME).upsert(rows, on_conflict=METRIC_CONFLICT_COLUMNS)
+                .execute()).data or []
+
+    async def afind_metrics(self, exchange_code, stock_code, metrics=None):
+        client = await get_async_supabase()
+        return (await _metrics_query(client, exchange_code, stock_code, metrics).execute()).data or []
@@ -1,27 +1,149 @@
-from playwright.sync_api import sync_playwright
-from .download_pdf import download_pdf
+from browser.pool import get_browser_pool
+from .download_pdf import (
+    COOKIE_PATH,
+    cookies_to_dict,
+    download_paths,
+    download_pdf,
+    download_pdf_async,
+    finalize_download,
+    media_type,
+)
+from urllib.parse import urlsplit
+import asyncio
 import json
-def auth_download(url, filename):
-
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)  # 可设为 True
-        context = browser.new_context()
-        page = context.new_page()
-
-        def handle_response(response):
-            # 检查响应是否为 PDF 文件
-            if response.headers.get("content-type") == "application/pdf":
-                with open(f"./cookie.json", "w", encoding='utf-8') as f:
-                    print(context.cookies(), 'context.cookies()')
-                    json.dump(context.cookies(), f, ensure_ascii=False, indent=4)
-                download_pdf(url, filename)
-
-        # 注册响应监听器
-        page.on("response", handle_response)
-        # page.wait_for_load_state("networkidle")
-        # 场景1：直接访问 PDF 链接
-        page.goto(url)  # 替换为你的 PDF URL
-        # 浏览器保持打开状态，等待下载完成
-        page.wait_for_timeout(10000)  # 等待一段时间以确保下载完成
+import os
 
+# 等待 PDF 下载完成的默认超时（秒）
+DOWNLOAD_TIMEOUT = float(os.environ.get("PDF_DOWNLOAD_TIMEOUT", "60"))
 
+
+async def _download_in_browser(context, url, pdf_path, timeout):
+    """
+    在浏览器池的上下文中访问 PDF 链接，直接保存浏览器收到的文件内容
+
+    浏览器可能内联展示 PDF（可以直接读取响应体），也可能转为下载（保存下载文件），
+    两种情况都只传输一次，收到完整文件后立即返回，不再固定等待
+
+    Args:
+        context: 浏览器池提供的 BrowserContext
+        url: PDF 文件地址
+        pdf_path: 保存路径
+        timeout: 等待下载完成的最长秒数
+    """
+    page = await context.new_page()
+    received = asyncio.get_running_loop().create_future()
+
+    async def handle_response(response):
+        # 检查响应是否为 PDF 文件；转为下载的响应读不到响应体，交给下载事件处理
+        if media_type(response.headers) != "application/pdf" or received.done():
+            return
+        try:
+            body = await response.body()
+        except Exception:
+            return
+        if not received.done():
+            received.set_result(("body", body))
+
+    def handle_download(download):
+        if not received.done():
+            received.set_result(("download", download))
+
+    # 注册响应监听器和下载监听器
+    page.on("response", handle_response)
+    page.on("download", handle_download)
+    # 直接访问 PDF 时浏览器转为下载，goto 会报错，结果以监听器为准
+    navigation = asyncio.ensure_future(page.goto(url))
+    navigation.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    tmp_path = f"{pdf_path}.part"
+    try:
+        kind, result = await asyncio.wait_for(received, timeout)
+        if kind == "body":
+            with open(tmp_path, "wb") as f:
+                f.write(result)
+        else:
+            await asyncio.wait_for(result.save_as(tmp_path), timeout)
+            failure = await result.failure()
+            if failure:
+                raise RuntimeError(f"浏览器下载失败: {failure}")
+        # 与直接下载相同的校验（PDF 文件头），通过后原子地移动
+        await asyncio.to_thread(finalize_download, tmp_path, pdf_path, None)
+    finally:
+        if not navigation.done():
+            navigation.cancel()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    # 返回通过校验后的 cookies，之后的下载直接请求复用
+    return await context.cookies()
+
+
+# 站点 -> 浏览器校验后得到的 cookies，直接请求 PDF 时复用
+_site_cookies = {}
+
+
+async def _visit_site(context, url):
+    """在浏览器池的上下文中访问 PDF 所在站点以通过校验，返回上下文的 cookies"""
+    parts = urlsplit(url)
+    page = await context.new_page()
+    try:
+        await page.goto(f"{parts.scheme}://{parts.netloc}/")
+    except Exception:
+        # 站点首页可能不存在，校验用的 cookies 仍会写入上下文
+        pass
+    finally:
+        await page.close()
+    return await context.cookies()
+
+
+def _save_cookies(cookies):
+    with open(COOKIE_PATH, "w", encoding='utf-8') as f:
+        json.dump(cookies, f, ensure_ascii=False, indent=4)
+
+
+def _remember_cookies(url, cookies):
+    _site_cookies[urlsplit(url).netloc] = cookies_to_dict(cookies)
+    _save_cookies(cookies)
+
+
+def auth_download(url, filename, timeout=DOWNLOAD_TIMEOUT):
+    """
+    下载 PDF：复用浏览器校验得到的 cookies 直接流式下载（支持断点续传和文件校验），
+    直接请求被拒绝时再由共享的无头浏览器下载，并刷新 cookies
+
+    Args:
+        url: PDF 文件地址
+        filename: 报告名称（用于日志，文件名由 URL 生成，同一公司的不同报告不会互相覆盖）
+        timeout: 浏览器下载时等待完成的最长秒数
+
+    Returns:
+        (PDF 文件的本地路径, 缓存校验字段 {etag, last_modified})，浏览器下载时校验字段为空
+    """
+    pool = get_browser_pool()
+    site = urlsplit(url).netloc
+    if site not in _site_cookies:
+        _remember_cookies(url, pool.run_sync(lambda context: _visit_site(context, url)))
+    pdf_path, validators = download_pdf(url, filename, _site_cookies[site])
+    if pdf_path:
+        return pdf_path, validators
+
+    pdf_path, _ = download_paths(url)
+    _remember_cookies(url, pool.run_sync(lambda context: _download_in_browser(context, url, pdf_path, timeout)))
+    print(f"PDF 文件已通过浏览器下载并保存为: {filename}")
+    return pdf_path, {}
+
+
+async def async_auth_download(url, filename, timeout=DOWNLOAD_TIMEOUT):
+    """auth_download 的异步版本（直接下载使用 httpx 流式写入）"""
+    pool = get_browser_pool()
+    site = urlsplit(url).netloc
+    if site not in _site_cookies:
+        _remember_cookies(url, await pool.run(lambda context: _visit_site(context, url)))
+    pdf_path, validators = await download_pdf_async(url, filename, _site_cookies[site])
+    if pdf_path:
+        return pdf_path, validators
+
+    pdf_path, _ = download_paths(url)
+    _remember_cookies(url, await pool.run(lambda context: _download_in_browser(context, url, pdf_path, timeout)))
+    print(f"PDF 文件已通过浏览器下载并保存为: {filename}")
+    return pdf_path, {}
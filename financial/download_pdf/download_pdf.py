@@ -1,23 +1,34 @@
+import asyncio
+import hashlib
+import httpx
+import uuid
 import requests
 import time
 import json
 import os
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # 获取当前脚本所在目录的绝对路径
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 # PDF 保存目录（相对于脚本位置的上级目录中的 pdf 文件夹）
 PDF_DIR = os.path.join(SCRIPT_DIR, '..', 'pdf')
+# 浏览器校验得到的 cookies（默认在上级目录，与启动时的工作目录无关）
+COOKIE_PATH = os.environ.get("PDF_COOKIE_PATH", os.path.join(SCRIPT_DIR, '..', 'cookie.json'))
+
+def cookies_to_dict(cookies_list):
+    """将浏览器导出的 cookies 列表（[{name, value, ...}]）转换为请求使用的字典"""
+    cookies_dict = {}
+    for cookie in cookies_list:
+        cookies_dict[cookie['name']] = cookie['value']
+    return cookies_dict
 
 # 从 cookie.json 文件加载 cookies
 def load_cookies_from_file(file_path):
     with open(file_path, "r", encoding='utf-8') as f:
         cookies_list = json.load(f)
     
-    cookies_dict = {}
-    for cookie in cookies_list:
-        cookies_dict[cookie['name']] = cookie['value']
-    
-    return cookies_dict
+    return cookies_to_dict(cookies_list)
 
 # 1. 定义请求头
 custom_headers = {
@@ -30,28 +41,249 @@ custom_headers = {
     # 你可以添加其他任何需要的头，比如接受的语言等
     'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
 }
-def download_pdf(url, filename):
+
+# 分块大小与重试次数
+CHUNK_SIZE = 64 * 1024
+MAX_ATTEMPTS = 3
+# (连接超时, 读取超时) 秒
+REQUEST_TIMEOUT = (10, 60)
+
+
+class DownloadError(Exception):
+    """下载的文件不完整或校验失败"""
+
+
+class NotPdfError(DownloadError):
+    """源站返回的不是 PDF（如需要浏览器校验的页面），重试也不会成功"""
+
+
+def media_type(headers):
+    """Content-Type 中的媒体类型（去掉 charset 等参数，小写），兼容 Playwright 的小写响应头字典"""
+    content_type = headers.get('Content-Type') or headers.get('content-type') or ''
+    return content_type.split(';')[0].strip().lower()
+
+
+def _check_content_type(headers):
+    """源站返回 HTML 等非 PDF 内容（如需要浏览器校验的页面）时不写入文件"""
+    content_type = media_type(headers)
+    if content_type.startswith('text/'):
+        raise NotPdfError(f"响应不是 PDF: {content_type}")
+
+
+def response_validators(headers):
+    """响应中的缓存校验字段（pdf_cache.store 的 etag / last_modified 参数）"""
+    return {'etag': headers.get('ETag'), 'last_modified': headers.get('Last-Modified')}
+
+
+def _retryable(status_code):
+    """4xx（416 之外）重试也不会成功，例如需要重新通过浏览器校验"""
+    return not (400 <= status_code < 500)
+
+
+def _create_session():
+    """创建带连接池和自动重试的 Session，所有下载复用同一组连接"""
+    session = requests.Session()
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+    )
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(custom_headers)
+    return session
+
+
+_session = _create_session()
+
+
+def download_paths(url):
+    """
+    本次下载使用的 (PDF 路径, .part 路径)
+
+    文件名由 URL 的哈希和随机后缀组成：不同报告（即使属于同一公司）不会写入同一个文件，
+    同一 URL 的并发下载也互不干扰；.part 只在本次下载的重试之间续传，不会接上其他 URL 的残留内容
     """
-    从指定 URL 下载 PDF 文件并保存为本地文件。
+    # 确保 pdf 目录存在
+    os.makedirs(PDF_DIR, exist_ok=True)
+    url_hash = hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]
+    pdf_path = os.path.join(PDF_DIR, f"{url_hash}-{uuid.uuid4().hex[:8]}.pdf")
+    return pdf_path, f"{pdf_path}.part"
+
+
+def _discard(part_path):
+    """下载最终失败时删除 .part，避免残留文件累积"""
+    if os.path.exists(part_path):
+        os.remove(part_path)
+
+
+def _default_cookies():
+    return load_cookies_from_file(COOKIE_PATH) if os.path.exists(COOKIE_PATH) else {}
+
+
+def _resume_offset(part_path):
+    """已下载部分的大小，作为断点续传的起始位置"""
+    return os.path.getsize(part_path) if os.path.exists(part_path) else 0
+
+
+def _expected_total(status_code, headers, offset):
+    """
+    根据响应头计算完整文件大小，无法确定时返回 None
+
+    参数:
+    status_code (int): 响应状态码（206 表示服务端接受了 Range 请求）
+    headers: 响应头
+    offset (int): 请求的起始位置
+    """
+    if status_code == 206:
+        # Content-Range: bytes 100-999/1000
+        content_range = headers.get('Content-Range', '')
+        total = content_range.rpartition('/')[2]
+        return int(total) if total.isdigit() else None
+    content_length = headers.get('Content-Length')
+    return int(content_length) if content_length and content_length.isdigit() else None
+
+
+def finalize_download(part_path, pdf_path, total, expected_sha256=None):
+    """
+    校验下载结果（大小、PDF 文件头、SHA-256），通过后原子地移动到 PDF_DIR
+
+    返回:
+    str: 文件的 SHA-256
+    """
+    size = os.path.getsize(part_path)
+    if total is not None and size < total:
+        # 传输中断，保留已下载部分以便续传
+        raise DownloadError(f"文件不完整: {size}/{total} 字节")
+
+    digest = hashlib.sha256()
+    with open(part_path, 'rb') as f:
+        header = f.read(5)
+        digest.update(header)
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    sha256 = digest.hexdigest()
+
+    error = None
+    if total is not None and size > total:
+        error = f"文件大小异常: {size}/{total} 字节"
+    elif header != b'%PDF-':
+        error = "文件不是有效的 PDF"
+    elif expected_sha256 and sha256 != expected_sha256:
+        error = f"SHA-256 不匹配: {sha256}"
+    if error:
+        # 内容已损坏，无法续传，删除后重新下载
+        os.remove(part_path)
+        raise DownloadError(error)
+
+    os.replace(part_path, pdf_path)
+    return sha256
+
+
+def _download_to_part(url, part_path, cookies):
+    """下载（或从断点续传）到 .part 文件，返回 (完整文件大小, 缓存校验字段)"""
+    offset = _resume_offset(part_path)
+    headers = {'Range': f'bytes={offset}-'} if offset else {}
+
+    with _session.get(url, headers=headers, cookies=cookies, stream=True, timeout=REQUEST_TIMEOUT) as response:
+        if response.status_code == 416:
+            # 续传位置超出文件大小，已下载部分无效
+            os.remove(part_path)
+            raise DownloadError("续传位置无效，重新下载")
+        response.raise_for_status()
+        _check_content_type(response.headers)
+        if response.status_code != 206:
+            # 服务端不支持 Range，从头开始
+            offset = 0
+        total = _expected_total(response.status_code, response.headers, offset)
+
+        with open(part_path, 'ab' if offset else 'wb') as file:
+            # 分块写入，避免大文件占用过多内存
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                if chunk:
+                    file.write(chunk)
+    return total, response_validators(response.headers)
+
+
+def download_pdf(url, filename, cookies=None, expected_sha256=None):
+    """
+    从指定 URL 流式下载 PDF 文件并保存为本地文件。
+    先写入 .part 文件，失败时按 Range 断点续传，校验通过后原子地重命名。
     
     参数:
     url (str): PDF 文件的网络地址
-    filename (str): 保存到本地的文件名（例如 'document.pdf'）
-    """
-    try:
-        # 发送 GET 请求
-        parsed_cookies = load_cookies_from_file("./cookie.json")
-        response = requests.get(url, headers=custom_headers, cookies=parsed_cookies)
-        # 以二进制写模式打开文件
-        # 确保 pdf 目录存在
-        os.makedirs(PDF_DIR, exist_ok=True)
-        pdf_path = os.path.join(PDF_DIR, f"{filename}.pdf")
-        with open(pdf_path, 'wb') as file:
-            # 分块写入，避免大文件占用过多内存
-            # for chunk in response.iter_content(chunk_size=8192):
-            file.write(response.content)
-        
-        print(f"PDF 文件已成功下载并保存为: {filename}")
-        
-    except requests.exceptions.RequestException as e:
-        print(f"下载失败: {e}")
+    filename (str): 报告名称（用于日志，文件名由 URL 生成）
+    cookies (dict): 请求使用的 cookies，默认从 cookie.json 读取
+    expected_sha256 (str): 期望的文件 SHA-256，提供时会校验
+
+    返回:
+    tuple: (PDF 文件的本地路径, 缓存校验字段 {etag, last_modified})，下载失败时路径为 None
+    """
+    pdf_path, part_path = download_paths(url)
+    if cookies is None:
+        cookies = _default_cookies()
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            total, validators = _download_to_part(url, part_path, cookies)
+            finalize_download(part_path, pdf_path, total, expected_sha256)
+            print(f"PDF 文件已成功下载并保存为: {filename}")
+            return pdf_path, validators
+        except (requests.exceptions.RequestException, DownloadError) as e:
+            print(f"下载失败（第 {attempt}/{MAX_ATTEMPTS} 次）: {e}")
+            response = getattr(e, 'response', None)
+            if isinstance(e, NotPdfError) or response is not None and not _retryable(response.status_code):
+                break
+    _discard(part_path)
+    return None, {}
+
+
+async def _download_to_part_async(client, url, part_path):
+    """_download_to_part 的异步版本"""
+    offset = _resume_offset(part_path)
+    headers = {'Range': f'bytes={offset}-'} if offset else {}
+
+    async with client.stream("GET", url, headers=headers) as response:
+        if response.status_code == 416:
+            os.remove(part_path)
+            raise DownloadError("续传位置无效，重新下载")
+        response.raise_for_status()
+        _check_content_type(response.headers)
+        if response.status_code != 206:
+            offset = 0
+        total = _expected_total(response.status_code, response.headers, offset)
+
+        with open(part_path, 'ab' if offset else 'wb') as file:
+            async for chunk in response.aiter_bytes(chunk_size=CHUNK_SIZE):
+                file.write(chunk)
+    return total, response_validators(response.headers)
+
+
+async def download_pdf_async(url, filename, cookies=None, expected_sha256=None):
+    """
+    download_pdf 的异步版本，流式写入文件，不阻塞事件循环等待网络
+    
+    参数与返回值同 download_pdf
+    """
+    pdf_path, part_path = download_paths(url)
+    if cookies is None:
+        cookies = _default_cookies()
+
+    async with httpx.AsyncClient(headers=custom_headers, cookies=cookies, follow_redirects=True,
+                                 timeout=httpx.Timeout(REQUEST_TIMEOUT[1], connect=REQUEST_TIMEOUT[0])) as client:
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                total, validators = await _download_to_part_async(client, url, part_path)
+                # 校验需要读完整个文件计算哈希，放入线程执行
+                await asyncio.to_thread(finalize_download, part_path, pdf_path, total, expected_sha256)
+                print(f"PDF 文件已成功下载并保存为: {filename}")
+                return pdf_path, validators
+            except (httpx.HTTPError, DownloadError) as e:
+                print(f"下载失败（第 {attempt}/{MAX_ATTEMPTS} 次）: {e}")
+                if isinstance(e, NotPdfError) or \
+                        isinstance(e, httpx.HTTPStatusError) and not _retryable(e.response.status_code):
+                    break
+    _discard(part_path)
+    return None, {}
@@ -0,0 +1,220 @@
+"""
+本地 PDF 缓存
+以 file_url 为键记录已下载的财报，文件按内容 SHA-256 存放（相同内容只保存一份）；
+命中缓存时按 ETag / Last-Modified 定期向源站确认文件未变化，
+总大小超过上限时按最近使用时间淘汰
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import httpx
+
+from .download_pdf import PDF_DIR, REQUEST_TIMEOUT, custom_headers
+
+# 缓存目录与索引文件
+CACHE_DIR = os.path.join(PDF_DIR, 'cache')
+INDEX_PATH = os.path.join(CACHE_DIR, 'index.json')
+# 缓存总大小上限（字节），默认 2GB
+MAX_CACHE_BYTES = int(os.environ.get("PDF_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+# 距上次确认超过该时间（秒）才向源站重新确认，默认 1 天
+REVALIDATE_INTERVAL = int(os.environ.get("PDF_CACHE_REVALIDATE_SECONDS", "86400"))
+# 最近使用时间的记录精度（秒）：淘汰只需要粗略的先后顺序，命中时不必每次重写索引
+LAST_USED_RESOLUTION = 3600
+
+_lock = threading.Lock()
+
+
+def _load_index() -> dict:
+    if not os.path.exists(INDEX_PATH):
+        return {}
+    try:
+        with open(INDEX_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        logging.warning("PDF 缓存索引损坏，已重置")
+        return {}
+
+
+def _save_index(index: dict) -> None:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{INDEX_PATH}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, INDEX_PATH)
+
+
+def _file_path(sha256: str) -> str:
+    return os.path.join(CACHE_DIR, f"{sha256}.pdf")
+
+
+def cached_sha256(cached_path: str) -> str:
+    """lookup_async / store 返回的缓存文件按内容 SHA-256 命名，直接从路径取得哈希，不需要重新读取文件"""
+    return os.path.splitext(os.path.basename(cached_path))[0]
+
+
+def _cached_entry(url: str):
+    """返回 url 对应的缓存记录，文件已丢失时返回 None"""
+    with _lock:
+        entry = _load_index().get(url)
+    if entry and os.path.exists(_file_path(entry['sha256'])):
+        return entry
+    return None
+
+
+def _revalidation_headers(entry: dict) -> dict:
+    headers = {}
+    if entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+
+def _is_fresh(entry: dict, status_code: int, headers) -> bool:
+    """根据条件请求的响应判断缓存是否仍然有效，并补充记录源站的校验字段"""
+    if status_code == 304:
+        return True
+    if status_code != 200:
+        # 源站拒绝直接访问（如需要浏览器校验）时无法确认，继续使用缓存
+        return True
+
+    etag, last_modified = headers.get('ETag'), headers.get('Last-Modified')
+    if entry.get('etag') and etag and etag != entry['etag']:
+        return False
+    if entry.get('last_modified') and last_modified and last_modified != entry['last_modified']:
+        return False
+    content_length = headers.get('Content-Length')
+    if content_length and content_length.isdigit() and int(content_length) != entry['size']:
+        return False
+
+    entry['etag'] = entry.get('etag') or etag
+    entry['last_modified'] = entry.get('last_modified') or last_modified
+    return True
+
+
+def _touch(url: str, entry: dict, fresh: bool, changed: bool):
+    """
+    更新使用时间；缓存失效时删除记录，没有其他 URL 引用的文件一并删除。返回缓存文件路径或 None
+
+    Args:
+        changed: 记录已被修改（重新确认过），需要写回索引
+    """
+    with _lock:
+        index = _load_index()
+        if not fresh:
+            index.pop(url, None)
+            _save_index(index)
+            if not any(other['sha256'] == entry['sha256'] for other in index.values()):
+                _remove_file(entry['sha256'])
+            logging.info(f"PDF 缓存已失效（源站文件已变化）: {url}")
+            return None
+        now = time.time()
+        if changed or now - entry.get('last_used', 0) > LAST_USED_RESOLUTION:
+            entry['last_used'] = now
+            index[url] = entry
+            _save_index(index)
+    return _file_path(entry['sha256'])
+
+
+def _remove_file(sha256: str) -> None:
+    try:
+        os.remove(_file_path(sha256))
+    except FileNotFoundError:
+        pass
+
+
+async def lookup_async(url: str):
+    """
+    查询本地缓存
+
+    Args:
+        url: 报表文件 URL
+
+    Returns:
+        缓存的 PDF 路径，未命中或已失效时返回 None
+    """
+    # 索引读写在线程中执行，不阻塞事件循环
+    entry = await asyncio.to_thread(_cached_entry, url)
+    if entry is None:
+        return None
+
+    fresh, changed = True, False
+    if time.time() - entry.get('validated_at', 0) > REVALIDATE_INTERVAL:
+        try:
+            async with httpx.AsyncClient(headers=custom_headers, follow_redirects=True,
+                                         timeout=REQUEST_TIMEOUT[1]) as client:
+                response = await client.head(url, headers=_revalidation_headers(entry))
+            fresh = _is_fresh(entry, response.status_code, response.headers)
+            entry['validated_at'] = time.time()
+            changed = True
+        except httpx.HTTPError as e:
+            logging.warning(f"PDF 缓存重新确认失败，继续使用缓存: {e}")
+    return await asyncio.to_thread(_touch, url, entry, fresh, changed)
+
+
+def store(url: str, pdf_path: str, etag: str = None, last_modified: str = None) -> str:
+    """
+    将下载好的 PDF 移入缓存
+
+    Args:
+        url: 报表文件 URL
+        pdf_path: 刚下载的 PDF 路径（会被移动到缓存目录）
+        etag: 源站返回的 ETag
+        last_modified: 源站返回的 Last-Modified
+
+    Returns:
+        缓存中的 PDF 路径
+    """
+    digest = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    sha256 = digest.hexdigest()
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    cached_path = _file_path(sha256)
+    size = os.path.getsize(pdf_path)
+    os.replace(pdf_path, cached_path)
+
+    now = time.time()
+    with _lock:
+        index = _load_index()
+        index[url] = {
+            'sha256': sha256,
+            'size': size,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': now,
+            'validated_at': now,
+            'last_used': now,
+        }
+        _evict(index, keep=sha256)
+        _save_index(index)
+    return cached_path
+
+
+def _evict(index: dict, keep: str) -> None:
+    """总大小超过上限时，按最近使用时间淘汰文件（调用方持有锁）"""
+    files = {}
+    for url, entry in index.items():
+        info = files.setdefault(entry['sha256'], {'size': entry['size'], 'last_used': 0, 'urls': []})
+        info['last_used'] = max(info['last_used'], entry.get('last_used', 0))
+        info['urls'].append(url)
+
+    total = sum(info['size'] for info in files.values())
+    for sha256, info in sorted(files.items(), key=lambda item: item[1]['last_used']):
+        if total <= MAX_CACHE_BYTES:
+            break
+        if sha256 == keep:
+            continue
+        _remove_file(sha256)
+        for url in info['urls']:
+            index.pop(url, None)
+        total -= info['size']
+        logging.info(f"PDF 缓存淘汰: {sha256[:12]}（{info['size']} 字节）")
@@ -1,13 +1,18 @@
-from typing import Any, Generator
+from typing import Any, AsyncGenerator, Generator
 
 
-from crawler_website.run_browser import run_browser
-from download_pdf.auth_download import auth_download
+from crawler_website.run_browser import async_run_browser
+from download_pdf.auth_download import async_auth_download
+from download_pdf import pdf_cache
 from ai.analyse_pdf import analyse_pdf
-from ai.index import main_with_pdf
-from db.save_company_info import save_company_info
-from db.search_SQL import search_SQL
-from datetime import datetime
+from ai.index import amain_with_pdf, collect_metric_records, load_document
+from ai.pipeline import arun_pipeline
+from coalesce import shared_stream
+from monitoring.metrics import record_cache, record_error, record_tool_calls, timed
+from db.metrics import save_metrics_async
+from db.save_company_info import save_company_info_async
+from db.search_SQL import search_SQL_async
+import response_cache
 import logging
 import asyncio
 import os
@@ -23,72 +28,219 @@ PDF_DIR = os.path.join(SCRIPT_DIR, 'pdf')
 
 
 
-def main(exchange_code, stock_code, fiscal_year, company_name = '', period_type = 3) -> Generator:
+def _analysis_event(chunk: dict) -> dict:
+    """将分析流中的事件转换为对外的 SSE 事件，附带分析步骤和工具标注"""
+    chunk_type = chunk.get("type")
+    if chunk_type == "token":
+        # token 事件是增量文本，客户端需要拼接
+        step = "analysis_delta"
+    elif chunk_type == "tool_result":
+        step = "tool_result"
+    else:
+        step = "analysis_stream"
+
+    event = {
+        "status": "analyzing",
+        "step": step,
+        "data": chunk.get("content", "")
+    }
+    if "step" in chunk:
+        event["analysis_step"] = chunk["step"]
+    if chunk.get("tools"):
+        event["tools"] = chunk["tools"]
+        record_tool_calls(chunk["tools"])
+    if chunk.get("tool"):
+        event["tool"] = chunk["tool"]
+    return event
+
+
+async def record_metrics(exchange_code, stock_code, fiscal_year, period_type, company_name, pdf_path, pdf_hash=None):
     """
-    主函数 - 返回生成器用于流式处理
-    优化后的事件流：只保留关键节点，减少冗余事件
+    把报表的关键指标写入 financial_metrics（文档已在内存或磁盘缓存中，不会重复解析）
+    pdf_hash 为 acquire_report 得到的文件哈希，传入时不再读取整个文件计算
     """
     try:
-        # 1. 初始化并查询数据库
-        fiscal_year = datetime.now().year
-        period_type = (datetime.now().month - 1) // 3 + 1
-        logging.info(f"开始处理: exchange_code={exchange_code}, stock_code={stock_code}, fiscal_year={fiscal_year}, 季度={period_type}")
-        
+        records = await asyncio.to_thread(lambda: collect_metric_records(load_document(pdf_path, pdf_hash)))
+        await save_metrics_async(exchange_code, stock_code, fiscal_year, period_type, company_name, records)
+    except Exception as e:
+        # 指标入库失败不影响分析结果
+        logging.warning(f"财务指标保存失败: {str(e)}")
+
+
+def main(exchange_code, stock_code, fiscal_year, company_name = '', period_type = 3, mode = 'agent',
+         stream = 'values') -> Generator:
+    """
+    主函数 - 返回生成器用于流式处理（命令行等同步调用方使用）
+    在私有事件循环中驱动 amain，事件流与 amain 完全一致
+    """
+    loop = asyncio.new_event_loop()
+    events = amain(exchange_code, stock_code, fiscal_year, company_name, period_type, mode, stream)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(events.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(events.aclose())
+        loop.close()
+
+
+def acquire_report(exchange_code, stock_code, fiscal_year, period_type, report: dict) -> AsyncGenerator:
+    """
+    查询数据库 -> 爬取报告链接 -> 下载 PDF，产出进度事件
+    完成后在 report 中写入 company_name、pdf_path 和 pdf_hash（/analyze 与 /compare 共用）
+    同一公司同一报告期的并发请求只执行一次爬取和下载，进度事件分发给所有请求
+    """
+    key = (exchange_code, str(stock_code), fiscal_year, period_type)
+    return shared_stream(key, lambda result: _acquire_report(exchange_code, stock_code, fiscal_year, period_type, result),
+                         report)
+
+
+async def _acquire_report(exchange_code, stock_code, fiscal_year, period_type, report: dict) -> AsyncGenerator:
+    # 各阶段耗时（秒），随进度事件一起发送
+    timings = report["timings"] = {}
+
+    # 1. 查询数据库（按请求的财政年份和报告期）
+    logging.info(f"开始处理: exchange_code={exchange_code}, stock_code={stock_code}, fiscal_year={fiscal_year}, 季度={period_type}")
+
+    yield {
+        "status": "progress",
+        "step": "query",
+        "message": f"正在查询 {exchange_code}-{stock_code} 的财务数据..."
+    }
+
+    with timed("db_query", timings):
+        file = await search_SQL_async(exchange_code, stock_code, fiscal_year, period_type)
+    logging.info(f'数据库查询结果: {file}')
+
+    # 2. 如果数据库没有数据，爬取网站
+    if not file:
+        logging.info("数据库中无数据，启动浏览器爬取...")
         yield {
             "status": "progress",
-            "step": "query",
-            "message": f"正在查询 {exchange_code}-{stock_code} 的财务数据..."
+            "step": "crawl",
+            "message": "数据库中无数据，正在爬取财务报表（可能需要10-30秒）...",
+            "timings": dict(timings)
         }
-        
-        file = search_SQL(exchange_code, stock_code, fiscal_year, period_type)
-        logging.info(f'数据库查询结果: {file}')
-        
-        # 2. 如果数据库没有数据，爬取网站
+
+        with timed("crawl", timings):
+            file = await async_run_browser(exchange_code, stock_code, fiscal_year, period_type)
         if not file:
-            logging.info("数据库中无数据，启动浏览器爬取...")
-            yield {
-                "status": "progress",
-                "step": "crawl",
-                "message": "数据库中无数据，正在爬取财务报表（可能需要10-30秒）..."
-            }
-            
-            file = run_browser(exchange_code, stock_code, fiscal_year, period_type)
-            save_company_info(file[0]['file_url'], exchange_code, stock_code, fiscal_year, period_type, file[0]['company_name'])
-            logging.info(f"爬取并保存完成: {file[0]['company_name']}")
-        else:
-            logging.info(f"从数据库获取: {file[0]['company_name']}")
-        
-        # 3. 下载PDF文件
-        company_name = file[0]['company_name']
-        logging.info(f"开始下载PDF: {company_name}")
+            raise ValueError(f"未找到 {exchange_code}-{stock_code} 的定期报告，请检查交易所和股票代码")
+        await save_company_info_async(file[0]['file_url'], exchange_code, stock_code, fiscal_year, period_type, file[0]['company_name'])
+        logging.info(f"爬取并保存完成: {file[0]['company_name']}")
+    else:
+        logging.info(f"从数据库获取: {file[0]['company_name']}")
+
+    # 3. 下载PDF文件（本地缓存命中时跳过浏览器下载）
+    company_name = file[0]['company_name']
+    file_url = file[0]['file_url']
+    pdf_path = await pdf_cache.lookup_async(file_url)
+    record_cache("pdf", bool(pdf_path))
+    if pdf_path:
+        logging.info(f"PDF缓存命中: {pdf_path}")
         yield {
             "status": "progress",
             "step": "download",
-            "message": f"正在下载 {company_name} 的财务报表..."
+            "message": f"已从本地缓存获取 {company_name} 的财务报表",
+            "timings": dict(timings)
         }
-        
-        auth_download(file[0]['file_url'], company_name)
-        logging.info("PDF下载完成")
-
-        # 4. AI分析PDF（流式输出）
-        logging.info(f"开始AI分析: {company_name}")
+    else:
+        logging.info(f"开始下载PDF: {company_name}")
         yield {
             "status": "progress",
-            "step": "analyze_start",
-            "message": f"开始AI分析 {company_name} 的财务报表..."
+            "step": "download",
+            "message": f"正在下载 {company_name} 的财务报表...",
+            "timings": dict(timings)
         }
-        
 
-        pdf_path = os.path.join(PDF_DIR, f"{company_name}.pdf")
-        
-        # 流式输出AI分析结果
-        for analysis_chunk in main_with_pdf(pdf_path):
+        with timed("download", timings):
+            downloaded_path, validators = await async_auth_download(file_url, company_name)
+            pdf_path = await asyncio.to_thread(pdf_cache.store, file_url, downloaded_path, **validators)
+        logging.info("PDF下载完成")
+
+    # 报告期的 PDF 内容变化（如更正后的报告）时删除旧的分析结果缓存
+    report["pdf_hash"] = pdf_cache.cached_sha256(pdf_path)
+    await asyncio.to_thread(response_cache.invalidate_stale, exchange_code, stock_code, fiscal_year, period_type,
+                            report["pdf_hash"])
+    report["company_name"] = company_name
+    report["pdf_path"] = pdf_path
+
+
+async def amain(exchange_code, stock_code, fiscal_year, company_name = '', period_type = 3, mode = 'agent',
+                stream = 'values') -> AsyncGenerator:
+    """
+    主函数（异步）- 返回异步生成器用于流式处理
+    数据库、爬虫、下载和 agent 流全部使用异步接口，单个 worker 可以同时服务大量 SSE 连接
+    优化后的事件流：只保留关键节点，减少冗余事件
+
+    mode:
+        'agent': 由 ReAct agent 决定调用哪些工具
+        'pipeline': 确定性流水线，加载、提取和比率分析直接执行，只调用一次 LLM 生成结论
+    stream:
+        'values': agent 每次状态变化发送完整的最新消息
+        'tokens': agent 输出按 token 增量发送
+    """
+    try:
+        report = {}
+        async for event in acquire_report(exchange_code, stock_code, fiscal_year, period_type, report):
+            yield event
+        company_name, pdf_path = report["company_name"], report["pdf_path"]
+        timings = dict(report["timings"])
+
+        # 4. AI分析PDF（流式输出）
+        cache_args = ((exchange_code, str(stock_code), fiscal_year, period_type), report["pdf_hash"], mode, stream)
+        cached_events = await asyncio.to_thread(response_cache.lookup, *cache_args)
+        record_cache("response", cached_events is not None)
+        if cached_events is not None:
+            # 相同 PDF、提示词和模型的分析结果直接回放
+            logging.info(f"分析结果缓存命中: {company_name}")
             yield {
-                "status": "analyzing",
-                "step": "analysis_stream",
-                "data": analysis_chunk.get("content", "")
+                "status": "progress",
+                "step": "analyze_start",
+                "message": f"已从缓存获取 {company_name} 的分析结果",
+                "cached": True,
+                "timings": dict(timings)
             }
-        
+            for event in cached_events:
+                yield event
+        else:
+            logging.info(f"开始AI分析: {company_name}")
+            yield {
+                "status": "progress",
+                "step": "analyze_start",
+                "message": f"开始AI分析 {company_name} 的财务报表...",
+                "timings": dict(timings)
+            }
+
+            # 流式输出AI分析结果；PDF 解析、向量化和建索引在分析中执行，本次请求构建了文档时耗时写入 build_timings
+            build_timings = {}
+            if mode == 'pipeline':
+                analysis = arun_pipeline(pdf_path, company_name, report["pdf_hash"], build_timings)
+            else:
+                analysis = amain_with_pdf(pdf_path, stream_tokens=(stream == 'tokens'), pdf_hash=report["pdf_hash"],
+                                          build_timings=build_timings)
+            analysis_events = []
+            with timed("analysis", timings):
+                async for analysis_chunk in analysis:
+                    event = _analysis_event(analysis_chunk)
+                    analysis_events.append(event)
+                    yield event
+
+            # 只缓存成功结束的分析（工具报错或没有产出结论时不缓存）
+            if response_cache.is_cacheable(analysis_events):
+                try:
+                    await asyncio.to_thread(response_cache.store, *cache_args, analysis_events)
+                except OSError as e:
+                    logging.warning(f"分析结果缓存保存失败: {str(e)}")
+            else:
+                logging.warning(f"分析过程中有工具报错或没有产出结论，不缓存分析结果: {company_name}")
+
+            timings.update(build_timings)
+            await record_metrics(exchange_code, stock_code, fiscal_year, period_type, company_name, pdf_path,
+                                 report["pdf_hash"])
+
         # 5. 分析完成
         logging.info("财务报表分析完成")
         yield {
@@ -99,12 +251,16 @@ def main(exchange_code, stock_code, fiscal_year, company_name = '', period_type
                 "exchange_code": exchange_code,
                 "stock_code": stock_code,
                 "fiscal_year": fiscal_year,
-                "period_type": period_type
+                "period_type": period_type,
+                "mode": mode,
+                "cached": cached_events is not None,
+                "timings": timings
             }
         }
         
     except Exception as e:
         logging.error(f"执行出错: {str(e)}", exc_info=True)
+        record_error("request")
         yield {
             "status": "error",
             "message": str(e)
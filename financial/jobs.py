@@ -0,0 +1,234 @@
+"""
+分析任务
+/analyze 的每次分析作为后台任务运行，事件日志和最终结果写入磁盘：
+- 客户端断开不会中断任务，重连时带上 Last-Event-ID 从断点继续接收事件
+- 参数相同且仍在运行的请求加入同一个任务，不重复执行
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from typing import AsyncGenerator, Callable, Dict, Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# 事件日志目录
+JOBS_DIR = os.environ.get("ANALYSIS_JOBS_DIR", os.path.join(SCRIPT_DIR, 'jobs'))
+# 已结束的任务在内存中保留的时间（秒），之后从磁盘读取
+JOB_MEMORY_SECONDS = float(os.environ.get("JOB_MEMORY_SECONDS", "600"))
+# 事件日志在磁盘上保留的时间（秒）
+JOB_RETENTION_SECONDS = float(os.environ.get("JOB_RETENTION_SECONDS", "86400"))
+
+RUNNING, COMPLETE, ERROR, INTERRUPTED = "running", "complete", "error", "interrupted"
+
+
+class AnalysisJob:
+    """一次分析任务：按顺序编号的事件日志 + 状态 + 最终结果"""
+
+    def __init__(self, job_id: str, key: tuple, status: str = RUNNING, events: Optional[list] = None,
+                 result: Optional[dict] = None, created_at: Optional[float] = None,
+                 finished_at: Optional[float] = None):
+        self.job_id = job_id
+        self.key = key
+        self.status = status
+        self.events = events or []
+        self.result = result
+        self.created_at = created_at or time.time()
+        self.finished_at = finished_at
+        self.task = None
+        self._changed = asyncio.Condition()
+        self._log = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status != RUNNING
+
+    def event_id(self, seq: int) -> str:
+        """SSE 事件 id，重连时客户端原样放入 Last-Event-ID"""
+        return f"{self.job_id}:{seq}"
+
+    def summary(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "events": len(self.events),
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+        }
+
+    # ---------- 执行 ----------
+
+    async def run(self, events: AsyncGenerator) -> None:
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        self._write_meta()
+        self._log = open(_events_path(self.job_id), 'a', encoding='utf-8')
+        status = COMPLETE
+        try:
+            async for event in events:
+                if event.get("status") == "error":
+                    status = ERROR
+                elif event.get("status") == "complete":
+                    self.result = event
+                await self._append(event)
+        except asyncio.CancelledError:
+            # 服务退出时任务被取消
+            status = INTERRUPTED
+            raise
+        except Exception as e:
+            logging.error(f"分析任务 {self.job_id} 出错: {str(e)}", exc_info=True)
+            status = ERROR
+            await self._append({"status": "error", "message": str(e)})
+        finally:
+            self._log.close()
+            self.status = status
+            self.finished_at = time.time()
+            self._write_meta()
+            async with self._changed:
+                self._changed.notify_all()
+
+    async def _append(self, event: dict) -> None:
+        self.events.append(event)
+        self._log.write(json.dumps(event, ensure_ascii=False) + "\n")
+        if event.get("step") != "analysis_delta":
+            # token 增量事件很多，只在关键事件时刷盘
+            self._log.flush()
+        async with self._changed:
+            self._changed.notify_all()
+
+    def _write_meta(self) -> None:
+        meta = {
+            "job_id": self.job_id,
+            "key": list(self.key),
+            "status": self.status,
+            "result": self.result,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+        tmp_path = f"{_meta_path(self.job_id)}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, _meta_path(self.job_id))
+
+    # ---------- 订阅 ----------
+
+    async def subscribe(self, after: int = 0) -> AsyncGenerator:
+        """
+        按顺序产出 (事件序号, 事件)，序号从 1 开始
+
+        Args:
+            after: 已收到的最后一个事件序号，从下一个事件开始发送
+        """
+        seq = max(after, 0)
+        while True:
+            while seq < len(self.events):
+                seq += 1
+                yield seq, self.events[seq - 1]
+            if self.finished:
+                return
+            async with self._changed:
+                if seq >= len(self.events) and not self.finished:
+                    await self._changed.wait()
+
+
+def _meta_path(job_id: str) -> str:
+    return os.path.join(JOBS_DIR, f"{job_id}.json")
+
+
+def _events_path(job_id: str) -> str:
+    return os.path.join(JOBS_DIR, f"{job_id}.jsonl")
+
+
+_jobs: Dict[str, AnalysisJob] = {}
+# 请求参数 -> 正在运行的任务
+_running: Dict[tuple, AnalysisJob] = {}
+
+
+def _load_job(job_id: str) -> Optional[AnalysisJob]:
+    """从磁盘读取已结束的任务；上次进程退出时仍在运行的任务标记为 interrupted"""
+    if not os.path.exists(_meta_path(job_id)):
+        return None
+    with open(_meta_path(job_id), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    events = []
+    if os.path.exists(_events_path(job_id)):
+        with open(_events_path(job_id), 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    # 进程退出时最后一行可能写了一半
+                    break
+    status = meta["status"] if meta["status"] != RUNNING else INTERRUPTED
+    return AnalysisJob(job_id, tuple(meta["key"]), status, events, meta.get("result"),
+                       meta.get("created_at"), meta.get("finished_at"))
+
+
+def _cleanup() -> None:
+    now = time.time()
+    for job_id, job in list(_jobs.items()):
+        if job.finished and now - job.finished_at > JOB_MEMORY_SECONDS:
+            del _jobs[job_id]
+    if not os.path.isdir(JOBS_DIR):
+        return
+    for name in os.listdir(JOBS_DIR):
+        path = os.path.join(JOBS_DIR, name)
+        if name.split('.', 1)[0] not in _jobs and now - os.path.getmtime(path) > JOB_RETENTION_SECONDS:
+            os.remove(path)
+
+
+def get_job(job_id: str) -> Optional[AnalysisJob]:
+    """按 id 查找任务（内存中没有时从磁盘读取）"""
+    job = _jobs.get(job_id)
+    if job is None and job_id.isalnum():
+        job = _load_job(job_id)
+    return job
+
+
+def submit_job(key: tuple, factory: Callable[[], AsyncGenerator]) -> AnalysisJob:
+    """
+    提交分析任务，参数相同的任务仍在运行时直接返回该任务
+
+    Args:
+        key: 任务参数，相同的 key 视为相同的请求
+        factory: 创建事件异步生成器的函数（如 lambda: amain(...)）
+    """
+    job = _running.get(key)
+    if job is not None and not job.finished:
+        logging.info(f"加入正在运行的分析任务: {job.job_id}")
+        return job
+
+    _cleanup()
+    job = AnalysisJob(uuid.uuid4().hex[:16], key)
+    _jobs[job.job_id] = job
+    _running[key] = job
+
+    async def run():
+        try:
+            await job.run(factory())
+        finally:
+            if _running.get(key) is job:
+                del _running[key]
+
+    # 任务独立于请求连接运行，客户端断开不影响执行
+    job.task = asyncio.create_task(run())
+    logging.info(f"创建分析任务: {job.job_id} {key}")
+    return job
+
+
+def parse_last_event_id(last_event_id: Optional[str]) -> tuple:
+    """解析 Last-Event-ID（格式 job_id:seq），无效时返回 (None, 0)"""
+    if not last_event_id or ':' not in last_event_id:
+        return None, 0
+    job_id, _, seq = last_event_id.partition(':')
+    return job_id, int(seq) if seq.isdigit() else 0
+
+
+async def shutdown_jobs() -> None:
+    """取消仍在运行的任务（服务退出时调用）"""
+    tasks = [job.task for job in _running.values() if job.task and not job.task.done()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,9 +1,18 @@
-from fastapi import FastAPI
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
+from typing import List, Literal, Optional
+import asyncio
 import logging
 import json
-from index import main
+from index import amain
+from compare import acompare
+from jobs import get_job, parse_last_event_id, shutdown_jobs, submit_job
+from ai.embeddings import warm_up, embedding_stats
+from ai.extractor import METRIC_NAMES
+from db.metrics import get_metric_history_async
+from monitoring.metrics import render_metrics
+from browser.pool import browser_pool_health, close_browser_pool
 
 # 配置日志
 logging.basicConfig(
@@ -13,41 +22,52 @@ logging.basicConfig(
 
 app = FastAPI(title="财务报表分析系统")
 
+@app.on_event("startup")
+def warm_up_embedding_model():
+    """启动时预热 Embedding 模型，避免首个 /analyze 请求承担模型加载耗时"""
+    try:
+        warm_up()
+        logging.info(f"Embedding 模型预热完成: {embedding_stats()}")
+    except Exception as e:
+        # 预热失败不阻止服务启动，首个请求时会再次尝试加载
+        logging.error(f"Embedding 模型预热失败: {str(e)}", exc_info=True)
+
+@app.on_event("shutdown")
+async def shutdown_browser_pool():
+    """服务退出时关闭共享的浏览器（关闭过程会阻塞等待浏览器线程，放到线程中执行）"""
+    await asyncio.to_thread(close_browser_pool)
+
+@app.on_event("shutdown")
+async def interrupt_running_jobs():
+    """服务退出时取消仍在运行的分析任务，事件日志标记为 interrupted"""
+    await shutdown_jobs()
+
 class FinancialRequest(BaseModel):
     exchange_code: str  # 交易所代码 (如 'SH')
     stock_code: str     # 股票代码
     fiscal_year: int    # 财政年份
     company_name: str = ""
     period_type: int = 3
+    # 'agent': ReAct agent 自主调用工具；'pipeline': 确定性流水线，只调用一次 LLM
+    mode: Literal["agent", "pipeline"] = "agent"
+    # 'values': 每次状态变化发送完整消息；'tokens': 按 token 发送增量文本
+    stream: Literal["values", "tokens"] = "values"
 
-@app.get("/")
-def read_root():
-    return {"message": "财务报表分析系统 API"}
+class StockRef(BaseModel):
+    exchange_code: str  # 交易所代码 (如 'SH')
+    stock_code: str     # 股票代码
 
-@app.get("/get_company_info")
-def get_company_info():
-    url = "http://www.cninfo.com.cn/new/data/szse_stock.json"
-    response = requests.get(url)
-    data = response.json()
-    return data
+class CompareRequest(BaseModel):
+    stocks: List[StockRef]
+    fiscal_year: int    # 财政年份
+    period_type: int = 3
 
-@app.post("/analyze")
-def analyze_financial_report(request: FinancialRequest):
-    """
-    分析财务报表 - 流式响应
-    """
-    def event_generator():
+def _sse_response(events, request) -> StreamingResponse:
+    """将事件异步生成器包装为 SSE 响应"""
+    async def event_generator():
         try:
             logging.info(f"收到请求: {request}")
-            
-            # 从 main 函数获取生成器
-            for event in main(
-                request.exchange_code,
-                request.stock_code,
-                request.fiscal_year,
-                request.company_name,
-                request.period_type
-            ):
+            async for event in events:
                 # 转换为 JSON 并使用 SSE 格式发送
                 yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
                 
@@ -65,9 +85,136 @@ def analyze_financial_report(request: FinancialRequest):
         }
     )
 
+def _job_response(job, after: int, request) -> StreamingResponse:
+    """
+    将分析任务的事件日志包装为 SSE 响应
+    每个事件带 id（job_id:序号），客户端重连时通过 Last-Event-ID 从断点继续
+    """
+    async def event_generator():
+        logging.info(f"订阅分析任务 {job.job_id}（从第 {after + 1} 个事件开始）: {request}")
+        async for seq, event in job.subscribe(after):
+            yield f"id: {job.event_id(seq)}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "Connection": "keep-alive",
+            "X-Job-Id": job.job_id
+        }
+    )
+
+def _find_job(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"分析任务不存在或已过期: {job_id}")
+    return job
+
+@app.get("/")
+def read_root():
+    return {"message": "财务报表分析系统 API"}
+
+@app.get("/get_company_info")
+def get_company_info():
+    url = "http://www.cninfo.com.cn/new/data/szse_stock.json"
+    response = requests.get(url)
+    data = response.json()
+    return data
+
+@app.post("/analyze")
+async def analyze_financial_report(request: FinancialRequest,
+                                   last_event_id: Optional[str] = Header(default=None)):
+    """
+    分析财务报表 - 流式响应
+    分析作为后台任务运行，客户端断开不影响执行：
+    - 带 Last-Event-ID 请求且参数与该任务相同时，从该事件之后继续发送
+    - 参数相同的分析仍在运行时加入该任务，不重复执行
+    """
+    key = (request.exchange_code, request.stock_code, request.fiscal_year, request.period_type,
+           request.mode, request.stream)
+    job_id, after = parse_last_event_id(last_event_id)
+    job = get_job(job_id) if job_id else None
+    # 只续接参数相同的任务，Last-Event-ID 属于其他请求时按新请求处理
+    if job is None or job.key != key:
+        job = submit_job(key, lambda: amain(
+            request.exchange_code,
+            request.stock_code,
+            request.fiscal_year,
+            request.company_name,
+            request.period_type,
+            request.mode,
+            request.stream
+        ))
+        after = 0
+    return _job_response(job, after, request)
+
+@app.get("/jobs/{job_id}")
+def analysis_job(job_id: str):
+    """查询分析任务的状态和最终结果"""
+    return _find_job(job_id).summary()
+
+@app.get("/jobs/{job_id}/events")
+async def analysis_job_events(job_id: str, after: int = 0, last_event_id: Optional[str] = Header(default=None)):
+    """
+    重新订阅分析任务的事件流（任务结束后仍可回放）
+
+    Args:
+        after: 已收到的最后一个事件序号，Last-Event-ID 优先
+    """
+    job = _find_job(job_id)
+    resume_job_id, resume_after = parse_last_event_id(last_event_id)
+    if resume_job_id == job_id:
+        after = resume_after
+    return _job_response(job, after, job_id)
+
+@app.post("/compare")
+async def compare_financial_reports(request: CompareRequest):
+    """
+    对比分析多家公司的财务报表 - 流式响应
+    各公司的获取和解析并发执行，事件以 stock 字段区分公司，最后生成一份对比结论
+    """
+    return _sse_response(acompare(
+        [(stock.exchange_code, stock.stock_code) for stock in request.stocks],
+        request.fiscal_year,
+        request.period_type
+    ), request)
+
+@app.get("/companies/{exchange_code}/{stock_code}/metrics")
+async def company_metrics(exchange_code: str, stock_code: str, metric: Optional[List[str]] = Query(default=None)):
+    """
+    查询公司各报告期的财务指标（来自已分析过的财报，不会触发下载和解析）
+
+    Args:
+        metric: 指标键，可重复传入多个，不传表示全部
+    """
+    unknown = [m for m in metric or [] if m not in METRIC_NAMES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"未知的指标: {', '.join(unknown)}")
+
+    history = await get_metric_history_async(exchange_code, stock_code, metric)
+    return {
+        "exchange_code": exchange_code,
+        "stock_code": stock_code,
+        # 数据库中可能有旧版本写入、已不在 METRIC_NAMES 中的指标
+        "metric_names": {key: METRIC_NAMES.get(key, key) for key in history},
+        "metrics": history
+    }
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus 指标：各阶段耗时直方图，缓存命中、工具调用、token 用量和错误计数"""
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "embedding_model": embedding_stats(),
+        "browser_pool": browser_pool_health()
+    }
 
 if __name__ == "__main__":
     import uvicorn
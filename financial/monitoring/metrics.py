@@ -0,0 +1,98 @@
+"""
+Prometheus 指标
+记录分析流水线各阶段的耗时（数据库查询、爬取、下载、PDF 解析、向量化、FAISS 构建、LLM 调用），
+以及缓存命中、工具调用、LLM token 用量和错误次数，由 main.py 的 /metrics 暴露
+
+多 worker 部署时每个进程各自计数（未启用 prometheus_client 的多进程模式）
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Iterable, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+# 流水线阶段
+STAGES = ("db_query", "crawl", "download", "pdf_parse", "embedding", "faiss_build", "llm", "analysis")
+
+# 阶段耗时的分桶（秒）：数据库查询在毫秒级，爬取和整段分析可达数分钟
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+STAGE_SECONDS = Histogram(
+    "financial_stage_duration_seconds",
+    "分析流水线各阶段耗时（秒）",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+CACHE_LOOKUPS = Counter(
+    "financial_cache_lookups_total",
+    "缓存查询次数",
+    ["cache", "result"],
+)
+TOOL_CALLS = Counter(
+    "financial_tool_calls_total",
+    "分析过程中的工具调用次数",
+    ["tool"],
+)
+LLM_TOKENS = Counter(
+    "financial_llm_tokens_total",
+    "LLM token 用量",
+    ["type"],
+)
+ERRORS = Counter(
+    "financial_errors_total",
+    "各阶段的错误次数",
+    ["stage"],
+)
+
+
+@contextmanager
+def timed(stage: str, timings: Optional[dict] = None):
+    """
+    记录一个阶段的耗时，阶段内抛出异常时同时计入错误次数
+
+    Args:
+        stage: 阶段名（见 STAGES）
+        timings: 传入时把耗时（秒，保留 3 位小数）写入 timings[stage]，用于 SSE 进度事件
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        ERRORS.labels(stage).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        if timings is not None:
+            timings[stage] = round(elapsed, 3)
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """记录无法用 with 包裹的阶段耗时（如 LLM 回调）"""
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+def record_error(stage: str) -> None:
+    ERRORS.labels(stage).inc()
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_tool_calls(tools: Iterable[str]) -> None:
+    for tool in tools:
+        TOOL_CALLS.labels(tool).inc()
+
+
+def record_tokens(input_tokens: int = 0, output_tokens: int = 0) -> None:
+    if input_tokens:
+        LLM_TOKENS.labels("input").inc(input_tokens)
+    if output_tokens:
+        LLM_TOKENS.labels("output").inc(output_tokens)
+
+
+def render_metrics() -> tuple:
+    """返回 (Prometheus 文本格式的指标, Content-Type)"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,136 @@
+"""
+分析结果缓存
+以「PDF 内容哈希 + 提示词版本 + 对话模型名」为键保存 AI 分析阶段的事件流，
+同一份财报、相同提示词再次分析时直接回放，不再调用 LLM；
+同一报告期摄入了内容不同的新 PDF（如更正后的报告）时，旧哈希的缓存全部删除
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Optional
+
+from ai.index import AGENT_SYSTEM_PROMPT, ANALYSIS_QUERIES, LLM_MODEL_NAME, PROMPT_SET_VERSION
+from ai.pipeline import PIPELINE_SYSTEM_PROMPT
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# 缓存目录（可通过环境变量覆盖），按报告期分子目录
+RESPONSE_CACHE_DIR = os.environ.get("RESPONSE_CACHE_DIR", os.path.join(SCRIPT_DIR, 'response_cache'))
+
+# 工具返回的错误信息以此开头（如「❌ 请先使用 load_financial_pdf 工具加载PDF文件」）
+TOOL_ERROR_PREFIX = "❌"
+# 最终结论所在的分析步骤（agent 的第三个查询，流水线的 LLM 输出）
+FINAL_ANALYSIS_STEP = len(ANALYSIS_QUERIES)
+
+
+def prompt_fingerprint(mode: str) -> str:
+    """提示词指纹：版本号 + 该模式实际使用的提示词，修改提示词文本也会使缓存失效"""
+    prompts = [AGENT_SYSTEM_PROMPT, *ANALYSIS_QUERIES] if mode == 'agent' else [PIPELINE_SYSTEM_PROMPT]
+    payload = json.dumps([PROMPT_SET_VERSION, prompts], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def response_key(pdf_hash: str, mode: str, stream: str) -> str:
+    """
+    生成缓存键
+
+    Args:
+        pdf_hash: PDF 文件内容的 SHA-256
+        mode: 'agent' | 'pipeline'
+        stream: 'values' | 'tokens'（两种事件格式分别缓存）
+    """
+    variant = json.dumps({
+        "prompts": prompt_fingerprint(mode),
+        "model": LLM_MODEL_NAME,
+        "mode": mode,
+        "stream": stream,
+    }, sort_keys=True)
+    return f"{pdf_hash}-{hashlib.sha256(variant.encode('utf-8')).hexdigest()[:16]}"
+
+
+def _report_dir(exchange_code, stock_code, fiscal_year, period_type) -> str:
+    return os.path.join(RESPONSE_CACHE_DIR, f"{exchange_code}-{stock_code}-{fiscal_year}-{period_type}")
+
+
+def _cache_path(report: tuple, key: str) -> str:
+    return os.path.join(_report_dir(*report), f"{key}.json")
+
+
+def lookup(report: tuple, pdf_hash: str, mode: str, stream: str) -> Optional[list]:
+    """
+    查找缓存的分析事件
+
+    Args:
+        report: (exchange_code, stock_code, fiscal_year, period_type)
+
+    Returns:
+        缓存的事件列表，未命中返回 None
+    """
+    path = _cache_path(report, response_key(pdf_hash, mode, stream))
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)["events"]
+    except (OSError, ValueError, KeyError):
+        logging.warning(f"分析结果缓存损坏，已忽略: {path}")
+        return None
+
+
+def is_cacheable(events: list) -> bool:
+    """
+    只缓存成功的分析：没有工具返回错误，且最后一步产出了结论
+    （一次性的错误如果被缓存，会在 PDF 变化前一直被回放）
+
+    Args:
+        events: amain 产出的分析事件（index._analysis_event 的结果）
+    """
+    final_text = ''
+    for event in events:
+        data = event.get("data")
+        if not isinstance(data, str) or not data:
+            continue
+        if data.lstrip().startswith(TOOL_ERROR_PREFIX):
+            return False
+        if event.get("analysis_step") == FINAL_ANALYSIS_STEP and event.get("step") != "tool_result":
+            final_text = data if event.get("step") == "analysis_stream" else final_text + data
+    # values 模式下最后一步的第一条消息是用户的查询本身，不算结论
+    return bool(final_text.strip()) and final_text != ANALYSIS_QUERIES[-1]
+
+
+def store(report: tuple, pdf_hash: str, mode: str, stream: str, events: list) -> None:
+    """保存一次完整分析的事件流"""
+    path = _cache_path(report, response_key(pdf_hash, mode, stream))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "pdf_hash": pdf_hash,
+            "model": LLM_MODEL_NAME,
+            "prompt_version": PROMPT_SET_VERSION,
+            "mode": mode,
+            "stream": stream,
+            "created_at": time.time(),
+            "events": events,
+        }, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def invalidate_stale(exchange_code, stock_code, fiscal_year, period_type, pdf_hash: str) -> None:
+    """
+    登记报告期当前的 PDF，删除基于其他 PDF 内容生成的缓存
+
+    Args:
+        pdf_hash: 当前 PDF 的 SHA-256（pdf_cache.cached_sha256，不重新读取文件）
+    """
+    report_dir = _report_dir(exchange_code, stock_code, fiscal_year, period_type)
+    if not os.path.isdir(report_dir):
+        return
+    stale = [name for name in os.listdir(report_dir) if not name.startswith(f"{pdf_hash}-")]
+    for name in stale:
+        os.remove(os.path.join(report_dir, name))
+    if stale:
+        logging.info(f"报告 PDF 已更新，删除 {len(stale)} 条旧的分析结果缓存: "
+                     f"{exchange_code}-{stock_code} {fiscal_year}/{period_type}")
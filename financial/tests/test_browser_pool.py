@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("playwright")
+
+from browser import pool as browser_pool
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.pages = []
+        self.closed = False
+
+    def set_default_timeout(self, timeout):
+        pass
+
+    def set_default_navigation_timeout(self, timeout):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **kwargs):
+        context = FakeContext(self)
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.connected = False
+
+
+class FakeChromium:
+    def __init__(self):
+        self.browsers = []
+
+    async def launch(self, **kwargs):
+        browser = FakeBrowser()
+        self.browsers.append(browser)
+        return browser
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.chromium = FakeChromium()
+
+    async def stop(self):
+        pass
+
+
+@pytest.fixture
+def pool():
+    pool = browser_pool.BrowserPool(max_contexts=2)
+    pool._playwright = FakePlaywright()
+    yield pool
+    pool.close()
+
+
+async def _context_of(context):
+    return context
+
+
+def test_context_is_reused(pool):
+    first = pool.run_sync(_context_of, timeout=5)
+    second = pool.run_sync(_context_of, timeout=5)
+
+    assert first is second
+    assert len(pool._playwright.chromium.browsers[0].contexts) == 1
+    assert pool.health()["jobs"] == 2
+
+
+def test_failed_job_discards_context(pool):
+    async def fail(context):
+        raise RuntimeError("boom")
+
+    first = pool.run_sync(_context_of, timeout=5)
+    with pytest.raises(RuntimeError):
+        pool.run_sync(fail, timeout=5)
+
+    assert first.closed
+    assert pool.run_sync(_context_of, timeout=5) is not first
+    assert pool.health()["failures"] == 1
+
+
+def test_semaphore_limits_open_contexts(pool):
+    active, peak = 0, 0
+
+    async def job(context):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+        return context
+
+    async def run():
+        return await asyncio.gather(*(pool.run(job) for _ in range(5)))
+
+    contexts = asyncio.run(run())
+
+    assert peak == 2
+    assert len({id(context) for context in contexts}) == 2
+
+
+def test_reconnects_after_browser_disconnect(pool):
+    first = pool.run_sync(_context_of, timeout=5)
+    first.browser.connected = False
+
+    second = pool.run_sync(_context_of, timeout=5)
+
+    assert second.browser is not first.browser
+    assert second.browser.is_connected()
+    assert pool.health()["launches"] == 2
+
+
+def test_health_does_not_start_pool(monkeypatch):
+    monkeypatch.setattr(browser_pool, '_pool', None)
+
+    assert browser_pool.browser_pool_health() == {"status": "not started"}
+    assert browser_pool._pool is None
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+import coalesce
+
+
+@pytest.fixture(autouse=True)
+def inflight(monkeypatch):
+    monkeypatch.setattr(coalesce, '_inflight', {})
+
+
+def _factory(calls, gate=None, error=None):
+    def factory(result):
+        async def produce():
+            calls.append(1)
+            yield {"step": "start"}
+            if gate is not None:
+                await gate.wait()
+            if error is not None:
+                raise error
+            yield {"step": "done"}
+            result["value"] = 42
+        return produce()
+    return factory
+
+
+async def _collect(key, factory):
+    result = {}
+    events = [event async for event in coalesce.shared_stream(key, factory, result)]
+    return events, result
+
+
+def test_concurrent_calls_share_one_producer():
+    calls = []
+
+    async def run():
+        gate = asyncio.Event()
+        factory = _factory(calls, gate)
+        first = asyncio.create_task(_collect(('k',), factory))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(_collect(('k',), factory))
+        await asyncio.sleep(0)
+        gate.set()
+        return await asyncio.gather(first, second)
+
+    (events1, result1), (events2, result2) = asyncio.run(run())
+    assert len(calls) == 1
+    assert events1 == events2 == [{"step": "start"}, {"step": "done"}]
+    assert result1 == result2 == {"value": 42}
+
+
+def test_each_subscriber_gets_its_own_error():
+    async def run():
+        gate = asyncio.Event()
+        factory = _factory([], gate, ValueError("下载失败"))
+        tasks = [asyncio.create_task(_collect(('k',), factory)) for _ in range(2)]
+        await asyncio.sleep(0)
+        gate.set()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    first, second = asyncio.run(run())
+    assert isinstance(first, coalesce.SharedStreamError)
+    assert isinstance(second, coalesce.SharedStreamError)
+    assert first is not second
+    assert str(first) == "下载失败"
+    assert first.__cause__ is second.__cause__
+
+
+def test_producer_cancelled_when_last_subscriber_leaves():
+    calls = []
+
+    async def run():
+        gate = asyncio.Event()
+        stream = coalesce.shared_stream(('k',), _factory(calls, gate), {})
+        assert await stream.__anext__() == {"step": "start"}
+        flight = coalesce._inflight[('k',)]
+        await stream.aclose()
+        await asyncio.sleep(0)
+        # 取消后相同 key 的调用重新执行
+        gate.set()
+        events, _ = await _collect(('k',), _factory(calls, gate))
+        return flight, events
+
+    flight, events = asyncio.run(run())
+    assert flight.task.cancelled()
+    assert len(calls) == 2
+    assert events[-1] == {"step": "done"}
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("fitz")
+pytest.importorskip("faiss")
+pytest.importorskip("langchain_openai")
+pytest.importorskip("langgraph")
+pytest.importorskip("playwright")
+
+import compare
+
+
+class FakeChunk:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    async def astream(self, messages):
+        for text in ("对比", "结论"):
+            yield FakeChunk(text)
+
+
+@pytest.fixture
+def acquired(monkeypatch):
+    """替换报表获取和解析，返回每家公司被获取的次数；stock_code 为 'fail' 时获取失败"""
+    calls = []
+
+    async def acquire_report(exchange_code, stock_code, fiscal_year, period_type, report):
+        calls.append(stock_code)
+        yield {"status": "progress", "step": "db_query", "message": stock_code}
+        await asyncio.sleep(0)
+        if stock_code == 'fail':
+            raise ValueError("未找到定期报告")
+        yield {"status": "progress", "step": "download", "message": stock_code}
+        report.update(company_name=f"公司{stock_code}", pdf_path=f"{stock_code}.pdf", pdf_hash=stock_code)
+
+    async def record_metrics(*args):
+        pass
+
+    monkeypatch.setattr(compare, 'acquire_report', acquire_report)
+    monkeypatch.setattr(compare, 'load_document', lambda pdf_path, pdf_hash: pdf_path)
+    monkeypatch.setattr(compare, 'analysis_inputs', lambda ctx: (f"{ctx} 的数据", []))
+    monkeypatch.setattr(compare, 'format_ratio_results', lambda results: "")
+    monkeypatch.setattr(compare, 'record_metrics', record_metrics)
+    monkeypatch.setattr(compare, 'create_llm', lambda streaming=False: FakeLLM())
+    return calls
+
+
+def _run(stocks):
+    async def collect():
+        return [event async for event in compare.acompare(stocks, 2024, 4)]
+    return asyncio.run(collect())
+
+
+def test_progress_of_all_companies_is_merged(acquired):
+    events = _run([('SZ', '000001'), ('SH', '600000'), ('SZ', '000001')])
+
+    assert sorted(acquired) == ['000001', '600000']
+    for stock in ('SZ-000001', 'SH-600000'):
+        steps = [event["step"] for event in events if event.get("stock") == stock]
+        assert steps == ['db_query', 'download', 'extract', 'extracted']
+    assert "".join(event["data"] for event in events if event.get("step") == "analysis_delta") == "对比结论"
+    complete = events[-1]
+    assert complete["status"] == "complete"
+    assert [c["stock"] for c in complete["data"]["companies"]] == ['SZ-000001', 'SH-600000']
+    assert complete["data"]["failed"] == []
+
+
+def test_too_many_stocks_rejected(acquired, monkeypatch):
+    monkeypatch.setattr(compare, 'MAX_COMPARE_STOCKS', 2)
+
+    events = _run([('SZ', '000001'), ('SZ', '000002'), ('SZ', '000003')])
+
+    assert events == [{"status": "error", "message": "单次最多对比 2 家公司"}]
+    assert acquired == []
+
+
+def test_failed_company_does_not_stop_others(acquired):
+    events = _run([('SZ', '000001'), ('SZ', 'fail')])
+
+    assert {"status": "error", "stock": 'SZ-fail', "message": "未找到定期报告"} in events
+    complete = events[-1]
+    assert complete["status"] == "complete"
+    assert [c["stock"] for c in complete["data"]["companies"]] == ['SZ-000001']
+    assert complete["data"]["failed"] == ['SZ-fail']
+
+
+def test_all_companies_failed(acquired):
+    events = _run([('SZ', 'fail')])
+
+    assert events[-1] == {"status": "error", "message": "没有可用于对比的财务报表"}
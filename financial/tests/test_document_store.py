@@ -0,0 +1,27 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("langchain_community")
+
+from ai import document_store
+
+
+def test_concurrent_loads_run_loader_once():
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.1)
+        return document_store.DocumentContext('concurrent', 'a.pdf', None, [], 0)
+
+    threads = [threading.Thread(target=document_store.get_or_load_document, args=('concurrent', loader))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert 'concurrent' not in document_store._loading_locks
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("requests")
+
+from download_pdf import download_pdf
+from download_pdf.download_pdf import (
+    DownloadError,
+    NotPdfError,
+    _check_content_type,
+    _expected_total,
+    finalize_download,
+)
+
+
+def test_expected_total_from_content_range():
+    assert _expected_total(206, {'Content-Range': 'bytes 100-999/1000'}, 100) == 1000
+    assert _expected_total(206, {'Content-Range': 'bytes 100-999/*'}, 100) is None
+
+
+def test_expected_total_from_content_length():
+    assert _expected_total(200, {'Content-Length': '1000'}, 0) == 1000
+    assert _expected_total(200, {}, 0) is None
+
+
+def test_html_response_is_not_pdf():
+    with pytest.raises(NotPdfError):
+        _check_content_type({'Content-Type': 'text/html; charset=utf-8'})
+    _check_content_type({'Content-Type': 'application/pdf; charset=binary'})
+
+
+def _part(tmp_path, content):
+    part_path = tmp_path / 'a.pdf.part'
+    part_path.write_bytes(content)
+    return str(part_path), str(tmp_path / 'a.pdf')
+
+
+def test_finalize_moves_valid_pdf(tmp_path):
+    part_path, pdf_path = _part(tmp_path, b'%PDF-1.7 body')
+    sha256 = finalize_download(part_path, pdf_path, 13)
+    assert len(sha256) == 64
+    assert os.path.exists(pdf_path) and not os.path.exists(part_path)
+
+
+def test_finalize_keeps_incomplete_part_for_resume(tmp_path):
+    part_path, pdf_path = _part(tmp_path, b'%PDF-1.7')
+    with pytest.raises(DownloadError):
+        finalize_download(part_path, pdf_path, 100)
+    assert os.path.exists(part_path) and not os.path.exists(pdf_path)
+
+
+@pytest.mark.parametrize('content, total, expected_sha256', [
+    (b'<html>blocked</html>', None, None),
+    (b'%PDF-1.7 body', 5, None),
+    (b'%PDF-1.7 body', None, '0' * 64),
+])
+def test_finalize_discards_invalid_file(tmp_path, content, total, expected_sha256):
+    part_path, pdf_path = _part(tmp_path, content)
+    with pytest.raises(DownloadError):
+        finalize_download(part_path, pdf_path, total, expected_sha256)
+    assert not os.path.exists(part_path) and not os.path.exists(pdf_path)
+
+
+def test_not_pdf_response_is_not_retried(tmp_path, monkeypatch):
+    calls = []
+
+    def download_to_part(url, part_path, cookies):
+        calls.append(url)
+        raise NotPdfError("响应不是 PDF: text/html")
+
+    monkeypatch.setattr(download_pdf, 'PDF_DIR', str(tmp_path))
+    monkeypatch.setattr(download_pdf, '_download_to_part', download_to_part)
+    assert download_pdf.download_pdf('https://x/a.pdf', 'a', cookies={}) == (None, {})
+    assert len(calls) == 1
+
+
+def test_media_type_ignores_parameters_and_case():
+    assert download_pdf.media_type({'content-type': 'Application/PDF; charset=binary'}) == 'application/pdf'
+    assert download_pdf.media_type({}) == ''
@@ -0,0 +1,53 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("langchain_huggingface")
+
+from ai import embeddings
+
+
+class FakeEmbeddings:
+    instances = 0
+
+    def __init__(self, **kwargs):
+        FakeEmbeddings.instances += 1
+        time.sleep(0.05)
+        self.queries = []
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return [0.0]
+
+
+@pytest.fixture(autouse=True)
+def fake_model(monkeypatch):
+    FakeEmbeddings.instances = 0
+    monkeypatch.setattr(embeddings, 'HuggingFaceEmbeddings', FakeEmbeddings)
+    monkeypatch.setattr(embeddings, '_embeddings', None)
+    monkeypatch.setattr(embeddings, '_stats', {**embeddings._stats, "loaded": False, "load_seconds": None,
+                                               "loaded_at": None})
+
+
+def test_concurrent_callers_load_model_once():
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(embeddings.get_embeddings())) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert FakeEmbeddings.instances == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_warm_up_records_stats():
+    assert embeddings.embedding_stats()["loaded"] is False
+
+    embeddings.warm_up()
+
+    stats = embeddings.embedding_stats()
+    assert stats["loaded"] is True
+    assert stats["load_seconds"] >= 0
+    assert embeddings.get_embeddings().queries == ["预热"]
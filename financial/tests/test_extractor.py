@@ -0,0 +1,30 @@
+from ai.extractor import extract_metrics
+
+
+def test_extracts_values_and_pages():
+    pages = [
+        "公司简介\n营业收入：1,000.50 万元",
+        "资产总计：8,000\n流动负债合计：300\n负债合计：500",
+    ]
+    metrics = extract_metrics(pages)
+    assert metrics['revenue'].value == 1000.5
+    assert metrics['revenue'].page == 1
+    assert metrics['total_assets'].page == 2
+    # 「流动负债合计」包含「负债合计」，两个锚点都要尝试；结果与逐个模式 re.search 一致
+    assert metrics['current_liabilities'].value == 300
+    assert metrics['total_liabilities'].value == 300
+
+
+def test_higher_priority_pattern_wins_over_earlier_match():
+    pages = ["营业总收入：900\n营业收入：800"]
+    assert extract_metrics(pages)['revenue'].value == 800
+
+
+def test_first_match_wins_within_same_pattern():
+    pages = ["存货：10", "存货：20"]
+    match = extract_metrics(pages)['inventory']
+    assert (match.value, match.page) == (10, 1)
+
+
+def test_unmatched_metrics_are_absent():
+    assert extract_metrics(["没有财务数据"]) == {}
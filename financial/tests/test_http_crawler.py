@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("requests")
+
+from crawler_website import http_crawler
+from crawler_website.reports import make_report
+
+
+def test_report_date_range_covers_following_year():
+    assert http_crawler.report_date_range(2023) == ('2023-01-01', '2024-12-31')
+    assert http_crawler.report_date_range(None) == ('', '')
+
+
+def test_fetch_reports_pages_until_empty(monkeypatch):
+    # 目标报告在第 2 页（第一页都是更新的披露）
+    pages = {
+        1: [make_report('x', f'new{i}', '2024年第三季度报告', '2024-10-25') for i in range(http_crawler.PAGE_SIZE)],
+        2: [make_report('x', 'target', '2023年年度报告', '2024-03-20')],
+    }
+    calls = []
+
+    def request_reports(exchange_code, stock_code, begin_date, end_date, page):
+        calls.append((begin_date, end_date, page))
+        return pages.get(page, [])
+
+    monkeypatch.setattr(http_crawler, '_request_reports', request_reports)
+    reports = http_crawler.fetch_reports('SZ', '000001', 2023, 4)
+    assert [report['url'] for report in reports] == ['target']
+    assert calls == [('2023-01-01', '2024-12-31', page) for page in (1, 2, 3)]
+
+
+def _disclosure(url, publish_date):
+    return make_report('x', url, '2024年第一季度报告', publish_date, '000001')
+
+
+def _paged(disclosures):
+    """按日期区间过滤、每页一条的披露接口"""
+    async def request_reports(client, exchange_code, stock_code, begin_date, end_date, page):
+        rows = [r for r in disclosures if begin_date <= r['publish_date'] <= end_date]
+        return rows[page - 1:page]
+    return request_reports
+
+
+def test_fetch_disclosures_narrows_window_when_page_limit_reached(monkeypatch):
+    # 从新到旧：04-30 两条、04-29 两条，每个区间最多翻 3 页
+    disclosures = [_disclosure('a', '2024-04-30'), _disclosure('b', '2024-04-30'),
+                   _disclosure('c', '2024-04-29'), _disclosure('d', '2024-04-29')]
+    monkeypatch.setattr(http_crawler, '_request_reports_async', _paged(disclosures))
+    reports, incomplete_date = asyncio.run(
+        http_crawler.fetch_disclosures_async('SZ', '2024-04-29', '2024-04-30', 3))
+    assert [r['url'] for r in reports] == ['a', 'b', 'c', 'd']
+    assert incomplete_date is None
+
+
+def test_fetch_disclosures_pages_through_overflowing_day(monkeypatch):
+    # 04-30 单日超过每个区间的页数上限，单独查询该日取完，再继续取更早日期
+    disclosures = [_disclosure(f'u{i}', '2024-04-30') for i in range(3)] + [_disclosure('old', '2024-04-29')]
+    monkeypatch.setattr(http_crawler, '_request_reports_async', _paged(disclosures))
+    reports, incomplete_date = asyncio.run(
+        http_crawler.fetch_disclosures_async('SZ', '2024-04-29', '2024-04-30', 2))
+    assert [r['url'] for r in reports] == ['u0', 'u1', 'u2', 'old']
+    assert incomplete_date is None
+
+
+def test_fetch_disclosures_reports_day_over_day_limit(monkeypatch):
+    disclosures = [_disclosure(f'u{i}', '2024-04-30') for i in range(3)] + [_disclosure('old', '2024-04-29')]
+    monkeypatch.setattr(http_crawler, '_request_reports_async', _paged(disclosures))
+    monkeypatch.setattr(http_crawler, 'MAX_DAY_PAGES', 2)
+    reports, incomplete_date = asyncio.run(
+        http_crawler.fetch_disclosures_async('SZ', '2024-04-29', '2024-04-30', 2))
+    assert [r['url'] for r in reports] == ['u0', 'u1', 'old']
+    assert incomplete_date == '2024-04-30'
@@ -0,0 +1,88 @@
+import asyncio
+import json
+
+import pytest
+
+import jobs
+
+
+@pytest.fixture(autouse=True)
+def jobs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, 'JOBS_DIR', str(tmp_path))
+    monkeypatch.setattr(jobs, '_jobs', {})
+    monkeypatch.setattr(jobs, '_running', {})
+    return tmp_path
+
+
+async def _events(n, gate=None):
+    for i in range(n):
+        if gate is not None and i == 1:
+            await gate.wait()
+        yield {"status": "progress", "step": str(i)}
+    yield {"status": "complete", "data": {"n": n}}
+
+
+async def _collect(job, after=0):
+    return [(seq, event) async for seq, event in job.subscribe(after)]
+
+
+def test_parse_last_event_id():
+    assert jobs.parse_last_event_id('abc:3') == ('abc', 3)
+    assert jobs.parse_last_event_id('abc:x') == ('abc', 0)
+    assert jobs.parse_last_event_id(None) == (None, 0)
+    assert jobs.parse_last_event_id('abc') == (None, 0)
+
+
+def test_resume_after_last_event_id():
+    async def run():
+        job = jobs.submit_job(('k',), lambda: _events(3))
+        await job.task
+        return job, await _collect(job, after=2)
+
+    job, resumed = asyncio.run(run())
+    assert job.status == jobs.COMPLETE
+    assert [seq for seq, _ in resumed] == [3, 4]
+    assert resumed[-1][1]["status"] == "complete"
+    assert job.event_id(3) == f"{job.job_id}:3"
+
+
+def test_same_key_joins_running_job():
+    async def run():
+        gate = asyncio.Event()
+        first = jobs.submit_job(('k',), lambda: _events(2, gate))
+        second = jobs.submit_job(('k',), lambda: _events(2))
+        gate.set()
+        await first.task
+        third = jobs.submit_job(('k',), lambda: _events(2))
+        await third.task
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert first is second
+    assert third is not first
+
+
+def test_finished_job_is_loaded_from_disk(jobs_dir):
+    key = ('SZ', '000001', 2024, 4, 'agent', 'values')
+
+    async def run():
+        job = jobs.submit_job(key, lambda: _events(2))
+        await job.task
+        return job
+
+    job = asyncio.run(run())
+    jobs._jobs.clear()
+    loaded = jobs.get_job(job.job_id)
+    assert loaded.status == jobs.COMPLETE
+    # /analyze 按 key 判断 Last-Event-ID 是否属于同一请求，从磁盘读取后仍需相等
+    assert loaded.key == key
+    assert loaded.events == job.events
+    assert loaded.result == {"status": "complete", "data": {"n": 2}}
+
+
+def test_job_left_running_is_interrupted_and_truncated_line_ignored(jobs_dir):
+    (jobs_dir / 'abc.json').write_text(json.dumps({"job_id": 'abc', "key": ['k'], "status": jobs.RUNNING}))
+    (jobs_dir / 'abc.jsonl').write_text('{"status": "progress"}\n{"status": "comp')
+    loaded = jobs.get_job('abc')
+    assert loaded.status == jobs.INTERRUPTED
+    assert loaded.events == [{"status": "progress"}]
@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip("prometheus_client")
+
+from prometheus_client import REGISTRY
+
+from monitoring import metrics
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_timed_records_duration():
+    before = _sample("financial_stage_duration_seconds_count", stage="db_query")
+    timings = {}
+    with metrics.timed("db_query", timings):
+        pass
+
+    assert timings["db_query"] >= 0
+    assert _sample("financial_stage_duration_seconds_count", stage="db_query") == before + 1
+
+
+def test_timed_counts_errors():
+    before = _sample("financial_errors_total", stage="crawl")
+    timings = {}
+    with pytest.raises(ValueError):
+        with metrics.timed("crawl", timings):
+            raise ValueError("boom")
+
+    assert _sample("financial_errors_total", stage="crawl") == before + 1
+    # 失败的阶段同样记录耗时
+    assert "crawl" in timings
+
+
+def test_counters():
+    hits = _sample("financial_cache_lookups_total", cache="response", result="hit")
+    tokens = _sample("financial_llm_tokens_total", type="output")
+    metrics.record_cache("response", True)
+    metrics.record_tokens(input_tokens=0, output_tokens=7)
+
+    assert _sample("financial_cache_lookups_total", cache="response", result="hit") == hits + 1
+    assert _sample("financial_llm_tokens_total", type="output") == tokens + 7
+
+
+def test_render_metrics():
+    metrics.record_tool_calls(["load_financial_pdf"])
+    content, content_type = metrics.render_metrics()
+
+    assert content_type.startswith("text/plain")
+    assert b'financial_tool_calls_total{tool="load_financial_pdf"}' in content
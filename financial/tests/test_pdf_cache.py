@@ -0,0 +1,85 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("requests")
+
+from download_pdf import pdf_cache
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_cache, 'CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(pdf_cache, 'INDEX_PATH', str(tmp_path / 'cache' / 'index.json'))
+    return tmp_path
+
+
+def _lookup(url):
+    return asyncio.run(pdf_cache.lookup_async(url))
+
+
+def _download(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_store_is_content_addressed(tmp_path):
+    first = pdf_cache.store('https://x/a.pdf', _download(tmp_path, 'a.pdf', b'%PDF-same'))
+    second = pdf_cache.store('https://x/b.pdf', _download(tmp_path, 'b.pdf', b'%PDF-same'))
+    assert first == second
+    assert len(pdf_cache.cached_sha256(first)) == 64
+    assert _lookup('https://x/a.pdf') == first
+    assert _lookup('https://x/unknown.pdf') is None
+
+
+def test_lookup_misses_when_file_removed(tmp_path):
+    path = pdf_cache.store('https://x/a.pdf', _download(tmp_path, 'a.pdf', b'%PDF-a'))
+    os.remove(path)
+    assert _lookup('https://x/a.pdf') is None
+
+
+def test_changed_content_length_invalidates():
+    entry = {'size': 10}
+    assert pdf_cache._is_fresh(dict(entry), 304, {})
+    assert pdf_cache._is_fresh(dict(entry), 200, {'Content-Length': '10'})
+    assert not pdf_cache._is_fresh(dict(entry), 200, {'Content-Length': '11'})
+    assert not pdf_cache._is_fresh({'size': 10, 'etag': '"a"'}, 200, {'ETag': '"b"'})
+
+
+def test_evicts_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_cache, 'MAX_CACHE_BYTES', 10)
+    old = pdf_cache.store('https://x/old.pdf', _download(tmp_path, 'old.pdf', b'%PDF-old'))
+    time.sleep(0.01)
+    new = pdf_cache.store('https://x/new.pdf', _download(tmp_path, 'new.pdf', b'%PDF-new'))
+    assert not os.path.exists(old)
+    assert os.path.exists(new)
+    assert _lookup('https://x/old.pdf') is None
+
+
+def test_invalidated_entry_removes_unshared_file(tmp_path):
+    path = pdf_cache.store('https://x/a.pdf', _download(tmp_path, 'a.pdf', b'%PDF-a'), etag='"v1"')
+    entry = pdf_cache._cached_entry('https://x/a.pdf')
+    assert entry['etag'] == '"v1"'
+    assert pdf_cache._touch('https://x/a.pdf', entry, fresh=False, changed=True) is None
+    assert not os.path.exists(path)
+
+
+def test_invalidated_entry_keeps_file_shared_by_other_url(tmp_path):
+    path = pdf_cache.store('https://x/a.pdf', _download(tmp_path, 'a.pdf', b'%PDF-same'))
+    pdf_cache.store('https://x/b.pdf', _download(tmp_path, 'b.pdf', b'%PDF-same'))
+    entry = pdf_cache._cached_entry('https://x/a.pdf')
+    pdf_cache._touch('https://x/a.pdf', entry, fresh=False, changed=True)
+    assert os.path.exists(path)
+    assert _lookup('https://x/b.pdf') == path
+
+
+def test_recent_hit_does_not_rewrite_index(tmp_path, monkeypatch):
+    pdf_cache.store('https://x/a.pdf', _download(tmp_path, 'a.pdf', b'%PDF-a'))
+    writes = []
+    monkeypatch.setattr(pdf_cache, '_save_index', lambda index: writes.append(index))
+    assert _lookup('https://x/a.pdf')
+    assert writes == []
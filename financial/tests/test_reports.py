@@ -0,0 +1,41 @@
+from crawler_website.reports import is_full_report, make_report, parse_report_title, select_report
+
+
+def _urls(reports):
+    return [report['url'] for report in reports]
+
+
+def test_parse_report_title():
+    assert parse_report_title('平安银行：2024年第三季度报告') == (2024, 3)
+    assert parse_report_title('2024年半年度报告') == (2024, 2)
+    assert parse_report_title('2023年年度报告摘要') == (2023, 4)
+    assert parse_report_title('关于召开股东大会的通知') == (None, None)
+
+
+def test_corrected_report_ranks_before_original():
+    reports = [
+        make_report('x', 'u_orig', '2023年年度报告', '2024-03-20'),
+        make_report('x', 'u_fix', '2023年年度报告（更正后）', '2024-05-10'),
+        make_report('x', 'u_sum', '2023年年度报告摘要', '2024-03-20'),
+        make_report('x', 'u_notice', '关于2023年年度报告的更正公告', '2024-05-10'),
+    ]
+    assert _urls(select_report(reports, 2023, 4))[:2] == ['u_fix', 'u_orig']
+
+
+def test_correction_notice_is_not_full_report():
+    assert not is_full_report({'title': '关于2023年年度报告的更正公告'})
+    assert not is_full_report({'title': '关于2023年年度报告部分内容更正的公告'})
+    assert not is_full_report({'title': '2023年年度报告（更正前）'})
+    assert is_full_report({'title': '2023年年度报告（更正后）'})
+    assert is_full_report({'title': '2024年半年度报告（修订版）'})
+
+
+def test_select_report_filters_period_and_orders_by_date():
+    reports = [
+        make_report('x', 'q3_2024', '2024年第三季度报告', '2024-10-25'),
+        make_report('x', 'h1_2024', '2024年半年度报告', '2024-08-20'),
+        make_report('x', 'q3_2023', '2023年第三季度报告', '2023-10-26'),
+        make_report('x', 'q3_2024_en', '2024年第三季度报告（英文版）', '2024-10-26'),
+    ]
+    assert _urls(select_report(reports, 2024, 3)) == ['q3_2024', 'q3_2024_en']
+    assert _urls(select_report(reports, 2022, 3)) == []
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from db.sqlite_repository import SQLiteReportRepository
+
+KEY = ('sz', '000001', 2024, 4)
+
+
+def _row(url):
+    return {"file_url": url, "exchange_code": 'sz', "stock_code": '000001', "fiscal_year": 2024,
+            "period_type": 4, "company_name": '平安银行'}
+
+
+@pytest.fixture
+def repository(tmp_path):
+    return SQLiteReportRepository(str(tmp_path / 'financial.db'))
+
+
+def test_progress_recorded_without_report_row(repository, monkeypatch):
+    from db import progress
+
+    monkeypatch.setattr(progress, 'get_repository', lambda: repository)
+    asyncio.run(progress.record_progress_async(*KEY, 'failed', error='未找到定期报告'))
+
+    assert repository.find(KEY) == []
+    row = asyncio.run(progress.find_progress_many_async([KEY]))[KEY]
+    assert (row["status"], row["file_url"], row["error"]) == ('failed', None, '未找到定期报告')
+
+
+def test_progress_upsert_overwrites(repository):
+    progress_row = {"exchange_code": 'sz', "stock_code": '000001', "fiscal_year": 2024, "period_type": 4}
+    repository.upsert_progress([{**progress_row, "status": 'failed', "error": 'timeout'}])
+    repository.upsert_progress([{**progress_row, "file_url": 'a.pdf', "status": 'indexed'}])
+
+    [row] = repository.find_progress_many([KEY, ('sz', '000002', 2024, 4)])
+    assert (row["file_url"], row["status"], row["error"]) == ('a.pdf', 'indexed', None)
+
+
+def test_report_upsert_keeps_progress(repository):
+    repository.upsert([_row('a.pdf')])
+    repository.upsert_progress([{**_row('a.pdf'), "status": 'indexed'}])
+    repository.upsert([_row('b.pdf')])
+
+    [row] = repository.find_progress_many([KEY])
+    # 进度记录处理时的 file_url，批量任务据此判断更正后的报告需要重新处理
+    assert (row["file_url"], row["status"]) == ('a.pdf', 'indexed')
+
+
+def test_async_methods_use_sync_implementation(repository):
+    async def run():
+        await repository.aupsert([_row('a.pdf')])
+        return await repository.afind(KEY)
+
+    [row] = asyncio.run(run())
+    assert row["file_url"] == 'a.pdf'
+
+
+def test_save_company_info_twice_does_not_conflict(repository, monkeypatch):
+    from db import save_company_info
+
+    monkeypatch.setattr(save_company_info, 'get_repository', lambda: repository)
+    save_company_info.save_company_info('a.pdf', *KEY, '平安银行')
+    [row] = asyncio.run(save_company_info.save_company_info_async('b.pdf', *KEY, '平安银行'))
+    assert row["file_url"] == 'b.pdf'
@@ -0,0 +1,67 @@
+import pytest
+
+pytest.importorskip("fitz")
+pytest.importorskip("langchain_community")
+
+import response_cache
+
+REPORT = ('sh', '600000', 2024, 4)
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(response_cache, 'RESPONSE_CACHE_DIR', str(tmp_path))
+    return tmp_path
+
+
+def _event(step, data, analysis_step):
+    return {"status": "analyzing", "step": step, "data": data, "analysis_step": analysis_step}
+
+
+def test_key_separates_pdf_mode_and_stream():
+    keys = {
+        response_cache.response_key('a' * 64, 'agent', 'values'),
+        response_cache.response_key('a' * 64, 'agent', 'tokens'),
+        response_cache.response_key('a' * 64, 'pipeline', 'values'),
+        response_cache.response_key('b' * 64, 'agent', 'values'),
+    }
+    assert len(keys) == 4
+    assert response_cache.response_key('a' * 64, 'agent', 'values').startswith('a' * 64 + '-')
+
+
+def test_key_changes_with_prompt_version(monkeypatch):
+    before = response_cache.response_key('a' * 64, 'agent', 'values')
+    monkeypatch.setattr(response_cache, 'PROMPT_SET_VERSION', 'changed')
+    assert response_cache.response_key('a' * 64, 'agent', 'values') != before
+
+
+def test_store_lookup_and_invalidate_stale():
+    events = [_event("analysis_stream", "结论", 3)]
+    response_cache.store(REPORT, 'a' * 64, 'agent', 'values', events)
+    assert response_cache.lookup(REPORT, 'a' * 64, 'agent', 'values') == events
+    assert response_cache.lookup(REPORT, 'a' * 64, 'agent', 'tokens') is None
+
+    response_cache.invalidate_stale(*REPORT, 'a' * 64)
+    assert response_cache.lookup(REPORT, 'a' * 64, 'agent', 'values') == events
+    response_cache.invalidate_stale(*REPORT, 'b' * 64)
+    assert response_cache.lookup(REPORT, 'a' * 64, 'agent', 'values') is None
+
+
+def test_cacheable_requires_final_analysis():
+    assert response_cache.is_cacheable([
+        _event("tool_result", "已加载", 1),
+        _event("analysis_delta", "整体", 3),
+        _event("analysis_delta", "良好", 3),
+    ])
+    assert not response_cache.is_cacheable([_event("tool_result", "已加载", 1)])
+    # values 模式下只回显了最后一步的查询
+    assert not response_cache.is_cacheable([
+        _event("analysis_stream", response_cache.ANALYSIS_QUERIES[-1], 3),
+    ])
+
+
+def test_tool_error_is_not_cacheable():
+    assert not response_cache.is_cacheable([
+        _event("tool_result", "❌ 请先使用 load_financial_pdf 工具加载PDF文件", 2),
+        _event("analysis_stream", "无法分析", 3),
+    ])
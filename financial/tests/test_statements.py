@@ -0,0 +1,65 @@
+from ai.statements import (
+    _rows_from_text,
+    find_statement_pages,
+    parse_amount,
+    statement_metrics,
+    statements_from_json,
+    statements_to_json,
+)
+
+BALANCE_SHEET = """合并资产负债表
+2024年12月31日
+项目
+附注
+期末余额
+期初余额
+货币资金
+七、1
+1,000.00
+800.00
+存货
+-
+50.00
+资产总计
+5,000.00
+4,000.00
+"""
+
+
+def test_parse_amount():
+    assert parse_amount('1,234.50') == 1234.5
+    assert parse_amount('(1,000)') == -1000
+    assert parse_amount('-12') == -12
+    assert parse_amount('七、1') is None
+    assert parse_amount('-') is None
+
+
+def test_find_statement_pages_skips_table_of_contents():
+    pages = [
+        "目录\n合并资产负债表......12",
+        BALANCE_SHEET,
+        "负债合计\n100\n90",
+        "合并利润表\n营业收入\n10\n9",
+        "母公司资产负债表\n货币资金\n1\n1",
+    ]
+    result = find_statement_pages(pages)
+    assert result['balance_sheet'] == [1, 2]
+    assert result['income_statement'] == [3]
+    assert 'cash_flow' not in result
+
+
+def test_rows_from_text_keeps_column_order():
+    rows = {row.label: row for row in _rows_from_text(BALANCE_SHEET, 2)}
+    assert (rows['货币资金'].current, rows['货币资金'].prior) == (1000.0, 800.0)
+    assert (rows['存货'].current, rows['存货'].prior) == (None, 50.0)
+    assert rows['资产总计'].page == 2
+
+
+def test_statement_metrics_and_json_roundtrip():
+    statements = {'balance_sheet': {row.label: row for row in _rows_from_text(BALANCE_SHEET, 2)}}
+    assert statements_from_json(statements_to_json(statements)) == statements
+    metrics = statement_metrics(statements)
+    assert metrics['total_assets'].current == 5000.0
+    assert metrics['cash'].current == 1000.0
+    # 本期为空的项目不作为指标
+    assert 'inventory' not in metrics
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("httpx")
+
+import watcher
+from crawler_website.reports import make_report
+from db.report_cache import report_key
+from watcher import _next_state
+
+
+def _report(url, publish_date):
+    return make_report('x', url, '2024年第一季度报告', publish_date, '000001')
+
+
+def test_watermark_advances_to_latest_date():
+    reports = [_report('a', '2024-04-30'), _report('b', '2024-04-29')]
+    state = _next_state(reports, {'a', 'b'}, [], {})
+    assert state == {'last_publish_date': '2024-04-30', 'seen_urls': ['a']}
+
+
+def test_watermark_does_not_pass_failed_date():
+    reports = [_report('a', '2024-04-30'), _report('b', '2024-04-29')]
+    state = _next_state(reports, {'a'}, ['2024-04-29'], {})
+    assert state['last_publish_date'] == '2024-04-29'
+    assert state['seen_urls'] == ['a']
+
+
+def test_incomplete_listing_holds_watermark_at_that_date():
+    # 2024-04-29 的披露没有取完，不能推进到最新日期
+    reports = [_report('a', '2024-04-30'), _report('b', '2024-04-29')]
+    state = _next_state(reports, {'a', 'b'}, [], {}, incomplete_date='2024-04-29')
+    assert state == {'last_publish_date': '2024-04-29', 'seen_urls': ['a', 'b']}
+
+
+def test_same_day_keeps_previously_seen_urls():
+    previous = {'last_publish_date': '2024-04-30', 'seen_urls': ['a']}
+    state = _next_state([_report('c', '2024-04-30')], {'c'}, [], previous)
+    assert state == {'last_publish_date': '2024-04-30', 'seen_urls': ['a', 'c']}
+
+
+def _poll(monkeypatch, reports, existing, incomplete_date=None, previous=None):
+    written = []
+
+    async def fetch_disclosures(exchange_code, begin_date, end_date, max_pages):
+        return reports, incomplete_date
+
+    async def search_many(keys):
+        return existing
+
+    async def upsert(rows):
+        written.extend(rows)
+        return rows
+
+    monkeypatch.setattr(watcher, 'fetch_disclosures_async', fetch_disclosures)
+    monkeypatch.setattr(watcher, 'search_SQL_many_async', search_many)
+    monkeypatch.setattr(watcher, 'upsert_company_infos_async', upsert)
+    state = {'SZ': previous} if previous else {}
+    asyncio.run(watcher.poll_exchange('SZ', state))
+    return written, state['SZ']
+
+
+def test_poll_writes_corrected_report_for_existing_period(monkeypatch):
+    original = make_report('x', 'orig', '2024年第一季度报告', '2024-04-20', '000001')
+    corrected = make_report('x', 'fixed', '2024年第一季度报告（更正后）', '2024-04-30', '000001')
+    existing = {report_key('SZ', '000001', 2024, 1): [{'file_url': 'orig'}]}
+    written, state = _poll(monkeypatch, [corrected], existing)
+    assert [row['file_url'] for row in written] == ['fixed']
+    assert state['seen_urls'] == ['fixed']
+
+    # 文件没有变化的报告期不重复写入
+    written, _ = _poll(monkeypatch, [original], existing)
+    assert written == []
+
+
+def test_poll_prefers_revised_report_within_period(monkeypatch):
+    original = make_report('x', 'orig', '2024年第一季度报告', '2024-04-30', '000001')
+    corrected = make_report('x', 'fixed', '2024年第一季度报告（更正后）', '2024-04-30', '000001')
+    written, _ = _poll(monkeypatch, [original, corrected], {})
+    assert [row['file_url'] for row in written] == ['fixed']
+
+
+def test_poll_moves_past_day_that_stays_incomplete(monkeypatch):
+    reports = [_report('a', '2024-04-30'), _report('b', '2024-04-29')]
+    _, state = _poll(monkeypatch, reports, {}, incomplete_date='2024-04-29')
+    assert state['last_publish_date'] == '2024-04-29'
+    # 下次轮询从该日期开始仍然没有取完，不再停留
+    _, state = _poll(monkeypatch, reports, {}, incomplete_date='2024-04-29', previous=state)
+    assert state['last_publish_date'] == '2024-04-30'
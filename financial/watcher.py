@@ -0,0 +1,199 @@
+"""
+定期报告披露监听
+定时查询交易所自上次看到的披露日期以来新发布的定期报告，写入 financial_reports，
+可选地提前下载并建立索引，使 /analyze 的数据库查询在报告发布后即可命中
+
+用法:
+    python watcher.py                    # 每 10 分钟轮询一次
+    python watcher.py --once --index     # 只轮询一次，并为新报告建立索引
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+from datetime import date, timedelta
+
+import httpx
+
+from crawler_website.http_crawler import fetch_disclosures_async
+from crawler_website.reports import is_full_report, is_revised_report
+from db.report_cache import report_key
+from db.save_company_info import _report_row, upsert_company_infos_async
+from db.search_SQL import search_SQL_many_async
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# 每个交易所最后看到的披露日期及当天已处理的报告
+STATE_PATH = os.environ.get("WATCHER_STATE_PATH", os.path.join(SCRIPT_DIR, 'watcher_state.json'))
+# 轮询间隔（秒）
+POLL_INTERVAL = int(os.environ.get("WATCHER_POLL_INTERVAL", "600"))
+EXCHANGES = ('SH', 'SZ', 'BJ')
+
+
+def load_state() -> dict:
+    if not os.path.exists(STATE_PATH):
+        return {}
+    with open(STATE_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(state: dict) -> None:
+    tmp_path = f"{STATE_PATH}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def _next_state(reports: list, processed: set, failed_dates: list, previous: dict,
+                incomplete_date: str = None) -> dict:
+    """
+    计算新的监听位置：推进到最新的披露日期，但不越过处理失败的报告（下次轮询重试），
+    也不越过列表没有取完的日期（incomplete_date）；
+    同一天的报告可能分多次发布，记录该日期起已处理的 URL 用于去重
+    """
+    dates = [r['publish_date'] for r in reports if r['publish_date']]
+    if not dates:
+        return previous
+    held_dates = [*failed_dates, incomplete_date] if incomplete_date else failed_dates
+    last_date = min([max(dates), *held_dates])
+    seen_urls = set(previous.get('seen_urls', [])) if previous.get('last_publish_date') == last_date else set()
+    seen_urls |= {r['url'] for r in reports if r['url'] in processed and (r['publish_date'] or '') >= last_date}
+    return {'last_publish_date': last_date, 'seen_urls': sorted(seen_urls)}
+
+
+def _needs_write(report: dict, rows) -> bool:
+    """
+    报告期尚未入库，或入库的不是这一份文件时需要写入：
+    新披露的报告（尤其是更正、修订后的报告）取代该报告期之前入库的文件，
+    写入时重置处理进度，预建索引会重新下载并使旧的分析结果缓存失效
+    """
+    return not rows or rows[0].get('file_url') != report['url']
+
+
+async def poll_exchange(exchange_code: str, state: dict, since_days: int = 1, max_pages: int = 50) -> list:
+    """
+    轮询一个交易所的新披露
+
+    Args:
+        exchange_code: 交易所代码
+        state: 全部交易所的监听状态（原地更新）
+        since_days: 首次运行时回溯的天数
+        max_pages: 单次轮询最多翻页数
+
+    Returns:
+        新写入数据库的报告条目
+    """
+    previous = state.get(exchange_code) or {}
+    begin_date = previous.get('last_publish_date') or (date.today() - timedelta(days=since_days)).isoformat()
+    reports, incomplete_date = await fetch_disclosures_async(exchange_code, begin_date, date.today().isoformat(),
+                                                             max_pages)
+    if incomplete_date == begin_date:
+        # 上次轮询已停在该日期重试过，同样的页数上限下再次查询也取不完，记录后继续推进
+        logging.error(f"{exchange_code} {incomplete_date} 的披露仍然没有取完，跳过该日剩余的披露")
+        incomplete_date = None
+    elif incomplete_date:
+        logging.warning(f"{exchange_code} {incomplete_date} 的披露没有取完，监听位置停在该日期，下次轮询重试")
+
+    seen_urls = set(previous.get('seen_urls', []))
+    processed, failed_dates, candidates = set(), [], {}
+    for report in reports:
+        if report['url'] in seen_urls:
+            continue
+        # 摘要、英文版或无法识别报告期的公告不入库
+        if not (is_full_report(report) and report['fiscal_year'] and report['period_type'] and report['stock_code']):
+            processed.add(report['url'])
+            continue
+        key = report_key(exchange_code, report['stock_code'], report['fiscal_year'], report['period_type'])
+        # 同一报告期有多份时优先更正、修订后的报告，其次保留最先返回（最新）的一份
+        current = candidates.get(key)
+        if current is not None and not (is_revised_report(report) and not is_revised_report(current)):
+            processed.add(report['url'])
+            continue
+        if current is not None:
+            processed.add(current['url'])
+        candidates[key] = report
+
+    inserted = []
+    if candidates:
+        try:
+            # 一次批量查询 + 一次批量写入：新的报告期，以及已入库但文件变化的报告期（如更正后的报告）
+            existing = await search_SQL_many_async(list(candidates))
+            inserted = [report for key, report in candidates.items() if _needs_write(report, existing.get(key))]
+            await upsert_company_infos_async([
+                _report_row(r['url'], exchange_code, r['stock_code'], r['fiscal_year'], r['period_type'],
+                            r['company_name'])
+                for r in inserted
+            ])
+        except Exception as e:
+            logging.error(f"{exchange_code} 写入披露失败，下次轮询重试: {e}")
+            inserted = []
+            failed_dates = [r['publish_date'] for r in candidates.values() if r['publish_date']]
+        else:
+            processed |= {report['url'] for report in candidates.values()}
+
+    state[exchange_code] = _next_state(reports, processed, failed_dates, previous, incomplete_date)
+    logging.info(f"{exchange_code} 披露轮询完成: 自 {begin_date} 起 {len(reports)} 条，写入 {len(inserted)} 条")
+    return inserted
+
+
+async def pre_index(exchange_code: str, reports: list) -> None:
+    """为新披露的报告提前下载并建立索引"""
+    # 只有需要建立索引时才加载模型和浏览器相关模块
+    from batch import RateLimiter, prefetch_report, DEFAULT_EXCHANGE_INTERVAL
+
+    limiter = RateLimiter(DEFAULT_EXCHANGE_INTERVAL)
+    for report in reports:
+        try:
+            await prefetch_report(exchange_code, report['stock_code'], report['fiscal_year'], report['period_type'],
+                                  limiter)
+        except Exception as e:
+            logging.error(f"预建索引失败 {exchange_code}-{report['stock_code']}: {e}")
+
+
+async def watch(exchanges=EXCHANGES, interval: int = POLL_INTERVAL, once: bool = False, index: bool = False,
+                since_days: int = 1, max_pages: int = 50) -> None:
+    """按间隔轮询各交易所；once=True 时只轮询一次"""
+    state = load_state()
+    while True:
+        for exchange_code in exchanges:
+            try:
+                inserted = await poll_exchange(exchange_code, state, since_days, max_pages)
+            except (httpx.HTTPError, ValueError) as e:
+                logging.error(f"{exchange_code} 披露查询失败: {e}")
+                continue
+            save_state(state)
+            if index and inserted:
+                await pre_index(exchange_code, inserted)
+        if once:
+            return
+        await asyncio.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="监听交易所定期报告披露并写入数据库")
+    parser.add_argument('--exchanges', nargs='*', choices=EXCHANGES, default=list(EXCHANGES), help="监听的交易所")
+    parser.add_argument('--interval', type=int, default=POLL_INTERVAL, help="轮询间隔（秒）")
+    parser.add_argument('--once', action='store_true', help="只轮询一次")
+    parser.add_argument('--index', action='store_true', help="为新报告下载 PDF 并建立向量索引")
+    parser.add_argument('--since-days', type=int, default=1, help="首次运行时回溯的天数")
+    parser.add_argument('--max-pages', type=int, default=50, help="单次轮询最多翻页数")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(watch(args.exchanges, args.interval, args.once, args.index, args.since_days, args.max_pages))
+    except KeyboardInterrupt:
+        logging.info("披露监听已停止")
+    finally:
+        if args.index:
+            from browser.pool import close_browser_pool
+            close_browser_pool()
+
+
+if __name__ == "__main__":
+    main()